@@ -0,0 +1,126 @@
+"""
+Caché de respuestas para los endpoints de catálogo (maestros, materias,
+planes de estudio y grupos).
+
+Guarda el JSON ya serializado con su ETag, así que una lectura repetida se
+responde sin tocar la base (o con 304 si el cliente ya tiene esa versión).
+Cada respuesta pertenece a un espacio ("maestros", "materias", ...) y los
+endpoints que escriben invalidan los espacios que afectan.
+
+El almacenamiento es intercambiable (configurar_backend); por defecto es
+un LRU en memoria del proceso.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# Espacios de la caché
+CACHE_MAESTROS = "maestros"
+CACHE_MATERIAS = "materias"
+CACHE_PLANES = "planes"
+CACHE_GRUPOS = "grupos"
+
+# Respuestas que se conservan en el LRU en memoria
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "256"))
+
+
+class CacheMemoria:
+    """
+    LRU en memoria. Otro backend (p. ej. Redis) solo necesita los mismos
+    tres métodos: obtener, guardar y borrar_espacio.
+    """
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[tuple]:
+        """(cuerpo, etag) guardado para la clave, o None"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+            return entrada
+
+    def guardar(self, clave: str, entrada: tuple):
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def borrar_espacio(self, espacio: str):
+        """Quita todas las respuestas de un espacio"""
+        prefijo = f"{espacio}:"
+        with self._lock:
+            for clave in [c for c in self._entradas if c.startswith(prefijo)]:
+                del self._entradas[clave]
+
+
+_backend = CacheMemoria()
+# Versión de cada espacio: sube con cada invalidación. Una lectura que empezó
+# antes de una escritura no guarda su resultado (ya podría estar viejo).
+_versiones = {}
+_versiones_lock = threading.Lock()
+
+
+def configurar_backend(backend):
+    """Reemplaza el almacenamiento de la caché"""
+    global _backend
+    _backend = backend
+
+
+def invalidar(*espacios: str):
+    """Descarta las respuestas guardadas de los espacios (llamar después del commit)"""
+    with _versiones_lock:
+        for espacio in espacios:
+            _versiones[espacio] = _versiones.get(espacio, 0) + 1
+            _backend.borrar_espacio(espacio)
+
+
+def _clave(request: Request, espacio: str) -> str:
+    consulta = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return f"{espacio}:{request.url.path}?{consulta}"
+
+
+def _responder(request: Request, cuerpo: bytes, etag: str, estado_cache: str) -> Response:
+    encabezados = {"ETag": etag, "Cache-Control": "no-cache", "X-Cache": estado_cache}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=encabezados)
+    return Response(content=cuerpo, media_type="application/json", headers=encabezados)
+
+
+def buscar_en_cache(request: Request, espacio: str) -> tuple:
+    """
+    (respuesta, version): la respuesta guardada (o 304 si coincide
+    If-None-Match) o None si hay que armarla; `version` se pasa después a
+    guardar_en_cache.
+    """
+    with _versiones_lock:
+        version = _versiones.get(espacio, 0)
+    entrada = _backend.obtener(_clave(request, espacio))
+    if entrada is None:
+        return None, version
+    cuerpo, etag = entrada
+    return _responder(request, cuerpo, etag, "HIT"), version
+
+
+def guardar_en_cache(request: Request, espacio: str, datos, version: int) -> Response:
+    """Serializa `datos`, los guarda (si no hubo escrituras mientras tanto) y responde"""
+    cuerpo = json.dumps(
+        jsonable_encoder(datos), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = f'"{hashlib.sha1(cuerpo).hexdigest()}"'
+
+    with _versiones_lock:
+        if _versiones.get(espacio, 0) == version:
+            _backend.guardar(_clave(request, espacio), (cuerpo, etag))
+    return _responder(request, cuerpo, etag, "MISS")
@@ -0,0 +1,163 @@
+"""
+Generación de horarios con varios intentos en paralelo (multi-arranque).
+
+Cada intento corre su propio SchedulerEngine con una semilla distinta en un
+proceso del pool; se califica cada resultado y solo se conserva el mejor.
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Agregar el directorio scheduler al path (también en los procesos del pool)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scheduler"))
+
+# Pool compartido entre peticiones (se crea al primer uso)
+_pool = None
+_pool_procesos = 0
+_pool_lock = threading.Lock()
+
+
+def obtener_pool(procesos: int) -> ProcessPoolExecutor:
+    """Regresa el pool de procesos, recreándolo si cambia el número de procesos"""
+    global _pool, _pool_procesos
+    with _pool_lock:
+        if _pool is None or _pool_procesos != procesos:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=procesos)
+            _pool_procesos = procesos
+        return _pool
+
+
+def cerrar_pool():
+    """Detiene los procesos del pool (al apagar la API)"""
+    global _pool, _pool_procesos
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_procesos = 0
+
+
+def calificar(resumen: dict) -> tuple:
+    """
+    Calificación de un intento (menor es mejor): primero las horas
+    requeridas cubiertas y después el costo de las penalizaciones suaves
+    (huecos, materias repetidas o partidas, carga de maestros).
+    Los empalmes no cuentan: el motor nunca los produce.
+    """
+    return (-resumen["horas_cubiertas"], resumen["costo"])
+
+
+def desempaquetar(buffer) -> list:
+    """Convierte el buffer empaquetado del motor en la lista de asignaciones"""
+    import scheduler
+
+    campos = scheduler.CAMPOS_ASIGNACION
+    return [
+        {
+            "maestro_id": buffer[i],
+            "materia_id": buffer[i + 1],
+            "grupo_id": buffer[i + 2],
+            "dia_semana": buffer[i + 3],
+            "hora_inicio": buffer[i + 4],
+            "hora_fin": buffer[i + 5],
+        }
+        for i in range(0, len(buffer), campos)
+    ]
+
+
+def generar_intento(
+    maestros_data: list,
+    cuatrimestres_data: list,
+    hora_min: int,
+    hora_max: int,
+    semilla: int,
+    opciones: dict,
+    ocupadas: Optional[list] = None,
+) -> dict:
+    """
+    Corre un intento completo del motor (se ejecuta dentro del pool).
+    `ocupadas` son asignaciones existentes que el motor debe respetar.
+    """
+    import scheduler
+
+    total_materias = sum(len(c["materias"]) for c in cuatrimestres_data)
+    total_grupos = sum(len(c["grupos"]) for c in cuatrimestres_data)
+    engine = scheduler.SchedulerEngine(
+        len(maestros_data), total_materias, total_grupos, hora_min, hora_max, semilla=semilla
+    )
+    if ocupadas:
+        engine.ocupar(ocupadas)
+    buffer = engine.generar_horario_plan(
+        maestros_data, cuatrimestres_data, empaquetado=True, **opciones
+    )
+    resumen = engine.resumen_generacion()
+    return {
+        "semilla": semilla,
+        "buffer": buffer,
+        "resumen": resumen,
+        "calificacion": calificar(resumen),
+    }
+
+
+def generar_mejor_horario(
+    maestros_data: list,
+    cuatrimestres_data: list,
+    hora_min: int,
+    hora_max: int,
+    reinicios: int = 1,
+    procesos: int = 1,
+    opciones: Optional[dict] = None,
+    semilla: Optional[int] = None,
+    ocupadas: Optional[list] = None,
+) -> dict:
+    """
+    Corre `reinicios` intentos con semillas distintas, repartidos en
+    `procesos` procesos, y regresa el mejor:
+    {"asignaciones", "resumen", "semilla", "intentos"}.
+    Con un solo intento o un solo proceso corre en el proceso actual.
+
+    Los intentos usan las semillas semilla, semilla + 1, ...; con la misma
+    semilla y los mismos datos el resultado se repite (si no se corta por
+    tiempo). Sin semilla se elige una al azar.
+
+    Con `ocupadas` (asignaciones ya guardadas de otros grupos) cada intento
+    parte de esa ocupación: solo se generan los grupos de cuatrimestres_data.
+    """
+    opciones = opciones or {}
+    semilla_base = (
+        semilla if semilla is not None else int.from_bytes(os.urandom(4), "little")
+    )
+    semillas = [semilla_base + i for i in range(reinicios)]
+    argumentos = (maestros_data, cuatrimestres_data, hora_min, hora_max)
+
+    if reinicios == 1 or procesos == 1:
+        resultados = [
+            generar_intento(*argumentos, s, opciones, ocupadas) for s in semillas
+        ]
+    else:
+        pool = obtener_pool(procesos)
+        futuros = [
+            pool.submit(generar_intento, *argumentos, s, opciones, ocupadas)
+            for s in semillas
+        ]
+        resultados = [f.result() for f in futuros]
+
+    mejor = min(resultados, key=lambda r: r["calificacion"])
+    return {
+        "asignaciones": desempaquetar(mejor["buffer"]),
+        "resumen": mejor["resumen"],
+        "semilla": mejor["semilla"],
+        "intentos": [
+            {
+                "semilla": r["semilla"],
+                "horas_cubiertas": r["resumen"]["horas_cubiertas"],
+                "costo": r["resumen"]["costo"],
+            }
+            for r in resultados
+        ],
+    }
@@ -0,0 +1,288 @@
+"""
+Importación masiva de maestros desde CSV.
+
+El catálogo de materias se carga una sola vez en un índice por nombre
+normalizado y los nombres del CSV se resuelven en Python; maestros,
+maestro_materias y disponibilidad_maestros se escriben con INSERT masivos
+por lotes dentro de una sola transacción.
+
+Las filas se consumen conforme llegan (el archivo nunca se carga completo)
+y la memoria usada depende del tamaño del lote, no del archivo.
+"""
+
+import codecs
+import unicodedata
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database.models import DisponibilidadMaestro, Maestro, MaestroMateria, Materia
+
+# Filas por INSERT masivo
+TAMANO_LOTE = 1000
+# Bytes que se leen del archivo en cada bloque
+TAMANO_BLOQUE = 64 * 1024
+# Nombres de maestros creados que se incluyen en el reporte (el total siempre va)
+MAX_NOMBRES_REPORTE = 1000
+
+HORAS_MAX_POR_DEFECTO = 15
+DIAS_POR_DEFECTO = [0, 1, 2, 3, 4, 5]
+# Rango de la disponibilidad que se registra para cada día
+HORA_INICIO_DISPONIBLE = 7
+HORA_FIN_DISPONIBLE = 22
+
+COLUMNAS_REQUERIDAS = ["nombre", "email"]
+
+
+def leer_lineas(archivo, tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[str]:
+    """
+    Líneas de un archivo binario UTF-8 leído por bloques (para csv.reader).
+    Quita el BOM que agrega Excel y lanza UnicodeDecodeError si el archivo
+    no es UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pendiente = ""
+    while True:
+        bloque = archivo.read(tamano_bloque)
+        lineas = (pendiente + decoder.decode(bloque, final=not bloque)).split("\n")
+        pendiente = lineas.pop()
+        for linea in lineas:
+            yield linea + "\n"
+        if not bloque:
+            break
+    if pendiente:
+        yield pendiente
+
+
+def normalizar(nombre: str) -> str:
+    """Mayúsculas, sin acentos y con espacios simples ("Ingles  V" == "INGLÉS V")"""
+    sin_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", nombre) if not unicodedata.combining(c)
+    )
+    return " ".join(sin_acentos.upper().split())
+
+
+class CatalogoMaterias:
+    """Índice en memoria de las materias por nombre normalizado"""
+
+    def __init__(self, db: Session):
+        self.nombres = []  # (nombre normalizado, id) en orden de id
+        self.exactos = {}
+        for materia_id, nombre in db.execute(
+            select(Materia.id, Materia.nombre).order_by(Materia.id)
+        ):
+            clave = normalizar(nombre)
+            self.nombres.append((clave, materia_id))
+            self.exactos.setdefault(clave, materia_id)
+        self._resueltos = {}
+
+    def buscar(self, nombre: str) -> Optional[int]:
+        """
+        Id de la materia: primero por nombre exacto y si no, la primera cuyo
+        nombre contenga al buscado (lo que hacía el ILIKE '%nombre%').
+        """
+        clave = normalizar(nombre)
+        if clave not in self._resueltos:
+            materia_id = self.exactos.get(clave)
+            if materia_id is None:
+                materia_id = next(
+                    (i for n, i in self.nombres if clave in n), None
+                )
+            self._resueltos[clave] = materia_id
+        return self._resueltos[clave]
+
+
+def leer_fila(row: dict, catalogo: CatalogoMaterias) -> dict:
+    """
+    Valida una fila del CSV y resuelve sus materias y días.
+    Lanza ValueError con el motivo si la fila no se puede importar.
+    """
+    nombre = (row.get("nombre") or "").strip()
+    email = (row.get("email") or "").strip()
+    if not nombre:
+        raise ValueError("falta el nombre")
+    if not email:
+        raise ValueError("falta el email")
+
+    try:
+        horas_max_semana = int(row.get("horas_max_semana") or HORAS_MAX_POR_DEFECTO)
+    except ValueError:
+        horas_max_semana = HORAS_MAX_POR_DEFECTO
+
+    materias = []
+    no_encontradas = []
+    for nombre_materia in (row.get("materias") or "").split("|"):
+        if not nombre_materia.strip():
+            continue
+        materia_id = catalogo.buscar(nombre_materia)
+        if materia_id is None:
+            no_encontradas.append(nombre_materia.strip())
+        elif materia_id not in materias:
+            materias.append(materia_id)
+
+    dias = []
+    for d in (row.get("dias_disponibles") or "").split("|"):
+        try:
+            dia = int(d.strip())
+        except ValueError:
+            continue
+        if 0 <= dia <= 5 and dia not in dias:
+            dias.append(dia)
+
+    return {
+        "nombre": nombre,
+        "email": email,
+        "numero": (row.get("numero") or "").strip(),
+        "horas_max_semana": horas_max_semana,
+        "materias": materias,
+        "dias": dias or DIAS_POR_DEFECTO,
+        "no_encontradas": no_encontradas,
+    }
+
+
+def guardar_lote(db: Session, lote: list, reporte: dict):
+    """
+    Inserta un lote de maestros ya validados con sus materias y días.
+    Los emails ya registrados (en la base o en lotes anteriores del mismo
+    archivo, que ya están insertados en la transacción) o repetidos dentro
+    del lote se reportan como error y no se insertan.
+    """
+    registrados = {
+        e.lower()
+        for e in db.scalars(
+            select(Maestro.email).where(Maestro.email.in_([m["email"] for m in lote]))
+        )
+    }
+    nuevos = []
+    for m in lote:
+        email = m["email"].lower()
+        if email in registrados:
+            reporte["errores"].append(
+                {"fila": m["fila"], "error": f"el email {m['email']} ya está registrado"}
+            )
+            continue
+        registrados.add(email)
+        nuevos.append(m)
+
+    if not nuevos:
+        return
+
+    db.execute(
+        insert(Maestro),
+        [
+            {
+                "nombre": m["nombre"],
+                "email": m["email"],
+                "numero": m["numero"],
+                "horas_max_semana": m["horas_max_semana"],
+            }
+            for m in nuevos
+        ],
+    )
+
+    # Los ids se recuperan por email (único) para no depender de RETURNING
+    ids = dict(
+        db.execute(
+            select(Maestro.email, Maestro.id).where(
+                Maestro.email.in_([m["email"] for m in nuevos])
+            )
+        ).all()
+    )
+
+    materias = [
+        {"maestro_id": ids[m["email"]], "materia_id": materia_id}
+        for m in nuevos
+        for materia_id in m["materias"]
+    ]
+    if materias:
+        db.execute(insert(MaestroMateria), materias)
+
+    db.execute(
+        insert(DisponibilidadMaestro),
+        [
+            {
+                "maestro_id": ids[m["email"]],
+                "dia_semana": dia,
+                "hora_inicio": HORA_INICIO_DISPONIBLE,
+                "hora_fin": HORA_FIN_DISPONIBLE,
+            }
+            for m in nuevos
+            for dia in m["dias"]
+        ],
+    )
+
+    for m in nuevos:
+        reporte["total_creados"] += 1
+        if len(reporte["creados"]) < MAX_NOMBRES_REPORTE:
+            reporte["creados"].append(m["nombre"])
+        if m["no_encontradas"]:
+            reporte["advertencias"].append(
+                {"fila": m["fila"], "materias_no_encontradas": m["no_encontradas"]}
+            )
+
+
+def nuevo_reporte() -> dict:
+    """
+    Reporte de una importación:
+    {"procesadas", "total_creados", "creados": [primeros nombres],
+     "errores": [{"fila", "error"}],
+     "advertencias": [{"fila", "materias_no_encontradas"}]}
+    """
+    return {
+        "procesadas": 0,
+        "total_creados": 0,
+        "creados": [],
+        "errores": [],
+        "advertencias": [],
+    }
+
+
+def avance(reporte: dict) -> dict:
+    """Conteos parciales de una importación en curso"""
+    return {
+        "procesadas": reporte["procesadas"],
+        "creados": reporte["total_creados"],
+        "errores": len(reporte["errores"]),
+    }
+
+
+def importar_por_lotes(db: Session, filas: Iterable, reporte: dict) -> Iterator[dict]:
+    """
+    Importa las filas (diccionarios de csv.DictReader; la primera es la fila
+    2 del archivo) llenando `reporte` y regresa el avance después de cada
+    lote guardado (el último puede ser incompleto). No hace commit: eso le
+    toca a quien llama.
+    """
+    catalogo = CatalogoMaterias(db)
+    lote = []
+
+    for idx, row in enumerate(filas, start=2):
+        reporte["procesadas"] += 1
+        try:
+            maestro = leer_fila(row, catalogo)
+        except ValueError as e:
+            reporte["errores"].append({"fila": idx, "error": str(e)})
+            continue
+
+        maestro["fila"] = idx
+        lote.append(maestro)
+        if len(lote) >= TAMANO_LOTE:
+            guardar_lote(db, lote, reporte)
+            lote = []
+            yield avance(reporte)
+
+    if lote:
+        guardar_lote(db, lote, reporte)
+    reporte["errores"].sort(key=lambda e: e["fila"])
+    # El avance de un lote completo ya se envió: solo falta el incompleto
+    if lote:
+        yield avance(reporte)
+
+
+def importar_maestros(db: Session, filas: Iterable) -> dict:
+    """Importa todas las filas en una sola transacción y regresa el reporte"""
+    reporte = nuevo_reporte()
+    for _ in importar_por_lotes(db, filas, reporte):
+        pass
+    return reporte
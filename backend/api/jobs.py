@@ -0,0 +1,151 @@
+"""
+Jobs en segundo plano para tareas largas (generación de horarios).
+
+El job se registra en memoria y corre en un ejecutor propio; el cliente
+consulta su estado y progreso con el id que recibe al crearlo.
+"""
+
+import contextvars
+import copy
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+# Estados de un job
+JOB_PENDIENTE = "pendiente"
+JOB_EN_PROCESO = "en_proceso"
+JOB_COMPLETADO = "completado"
+JOB_ERROR = "error"
+
+# Jobs terminados que se conservan para consulta (los más viejos se descartan)
+MAX_JOBS_GUARDADOS = 100
+
+# Un solo trabajador: cada generación reemplaza todos los horarios, así que
+# los jobs se atienden en orden y nunca dos a la vez
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs")
+_jobs = {}
+_lock = threading.Lock()
+
+
+def crear_job(tipo: str, funcion: Callable, *args) -> dict:
+    """
+    Registra un job y lo manda al ejecutor. `funcion` recibe como primer
+    argumento una función avisar(fase, cuatrimestre=None, estado=None) para
+    reportar su progreso, seguida de `args`; lo que regrese queda como
+    resultado del job.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "tipo": tipo,
+        "estado": JOB_PENDIENTE,
+        "creado": datetime.now().isoformat(),
+        "iniciado": None,
+        "terminado": None,
+        "progreso": {"fase": None, "cuatrimestres": {}},
+        "resultado": None,
+        "error": None,
+    }
+    with _lock:
+        _descartar_terminados()
+        _jobs[job_id] = job
+        registrado = copy.deepcopy(job)
+
+    _executor.submit(_ejecutar, job_id, funcion, args)
+    return registrado
+
+
+def ejecutar_en_orden(funcion: Callable, *args):
+    """
+    Corre funcion(*args) en el mismo trabajador que los jobs y espera su
+    resultado (o su excepción). Así una generación síncrona espera a los
+    jobs en la cola y nunca borra e inserta horarios al mismo tiempo que uno.
+    Corre con el contexto de quien llama (la medición de la petición).
+    """
+    contexto = contextvars.copy_context()
+    return _executor.submit(contexto.run, funcion, *args).result()
+
+
+def obtener_job(job_id: str) -> Optional[dict]:
+    """Copia del estado actual de un job (None si no existe)"""
+    with _lock:
+        job = _jobs.get(job_id)
+        return copy.deepcopy(job) if job else None
+
+
+def listar_jobs() -> list:
+    """Resumen de los jobs registrados, del más reciente al más viejo"""
+    with _lock:
+        return [
+            {
+                "id": job["id"],
+                "tipo": job["tipo"],
+                "estado": job["estado"],
+                "creado": job["creado"],
+                "terminado": job["terminado"],
+            }
+            for job in sorted(_jobs.values(), key=lambda j: j["creado"], reverse=True)
+        ]
+
+
+def actualizar_progreso(
+    job_id: str, fase: str, cuatrimestre: Optional[int] = None, estado: Optional[str] = None
+):
+    """
+    Registra la fase actual del job y, si se da, el estado de un cuatrimestre
+    (que sigue a la fase: ver get_job_generacion en api/main.py)
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job["progreso"]["fase"] = fase
+        if cuatrimestre is not None:
+            job["progreso"]["cuatrimestres"][cuatrimestre] = estado
+
+
+def cerrar_jobs():
+    """Espera a que terminen los jobs en curso (al apagar la API)"""
+    _executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _ejecutar(job_id: str, funcion: Callable, args: tuple):
+    """Corre el job y guarda su resultado o su error"""
+    with _lock:
+        _jobs[job_id]["estado"] = JOB_EN_PROCESO
+        _jobs[job_id]["iniciado"] = datetime.now().isoformat()
+
+    def avisar(fase, cuatrimestre=None, estado=None):
+        actualizar_progreso(job_id, fase, cuatrimestre, estado)
+
+    try:
+        resultado = funcion(avisar, *args)
+        cambios = {"estado": JOB_COMPLETADO, "resultado": resultado}
+    except HTTPException as e:
+        cambios = {
+            "estado": JOB_ERROR,
+            "error": {"status_code": e.status_code, "detail": e.detail},
+        }
+    except Exception as e:
+        cambios = {
+            "estado": JOB_ERROR,
+            "error": {"status_code": 500, "detail": str(e)},
+        }
+
+    with _lock:
+        _jobs[job_id].update(cambios)
+        _jobs[job_id]["terminado"] = datetime.now().isoformat()
+
+
+def _descartar_terminados():
+    """Quita los jobs terminados más viejos si se pasa de MAX_JOBS_GUARDADOS"""
+    terminados = sorted(
+        (j for j in _jobs.values() if j["estado"] in (JOB_COMPLETADO, JOB_ERROR)),
+        key=lambda j: j["terminado"],
+    )
+    while len(_jobs) >= MAX_JOBS_GUARDADOS and terminados:
+        del _jobs[terminados.pop(0)["id"]]
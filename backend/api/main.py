@@ -1,16 +1,78 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import csv
-import io
+import json
 import sys
 import os
-from typing import Optional, List
+from typing import Optional, List, Callable, Iterator
 
 # Agregar el directorio scheduler al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scheduler"))
 
-from database.connection import get_db, engine, Base
+from database.connection import (
+    get_db,
+    get_async_db,
+    cerrar_async_engine,
+    engine,
+    Base,
+    SessionLocal,
+)
+from database.migraciones import asegurar_esquema
+from database.consultas import (
+    asignaciones_de_grupo,
+    asignaciones_de_horario,
+    asignaciones_de_maestro,
+    dias_de_maestros,
+    horarios_con_conteo,
+    listar_maestros,
+    listar_planes,
+    materias_de_maestros,
+    materias_de_planes,
+)
+from api.generacion import generar_mejor_horario, cerrar_pool
+from api.jobs import crear_job, ejecutar_en_orden, obtener_job, listar_jobs, cerrar_jobs
+from api.snapshots import (
+    SNAPSHOT_GRUPO,
+    SNAPSHOT_HORARIO,
+    SNAPSHOT_MAESTRO,
+    borrar_snapshots,
+    leer_snapshot,
+    reconstruir_snapshots,
+    refrescar_snapshots,
+    vistas_afectadas,
+    vista_grupo,
+    vista_horario,
+    vista_maestro,
+)
+from api.cache import (
+    CACHE_GRUPOS,
+    CACHE_MAESTROS,
+    CACHE_MATERIAS,
+    CACHE_PLANES,
+    buscar_en_cache,
+    guardar_en_cache,
+    invalidar,
+)
+from api.metricas import (
+    Fases,
+    MedicionPeticiones,
+    exportar as exportar_metricas,
+    medir_sql,
+    metricas_por_ruta,
+)
+from api.perfilado import FORMATOS_PERFIL, archivo_perfil, perfilar
+from api.importacion import (
+    COLUMNAS_REQUERIDAS,
+    importar_maestros,
+    importar_por_lotes,
+    leer_lineas,
+    nuevo_reporte,
+)
 from database.models import (
     Maestro,
     Materia,
@@ -22,8 +84,9 @@ from database.models import (
     PlanEstudios,
 )
 
-# Crear tablas si no existen
+# Crear tablas si no existen (y los índices nuevos en tablas ya creadas)
 Base.metadata.create_all(bind=engine)
+asegurar_esquema(engine)
 
 # Inicializar FastAPI
 app = FastAPI(title="Generador de Horarios Universitarios")
@@ -35,17 +98,100 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
+# Tiempo, consultas SQL y tiempo en la base de cada petición (Server-Timing
+# y GET /api/admin/rutas)
+medir_sql()
+app.add_middleware(MedicionPeticiones)
+
+
+@app.on_event("shutdown")
+def detener_procesos():
+    """Detiene los jobs y el pool de procesos de generación de horarios"""
+    cerrar_jobs()
+    cerrar_pool()
+
+
+@app.on_event("shutdown")
+async def cerrar_conexiones_async():
+    """Cierra el pool del motor asíncrono"""
+    await cerrar_async_engine()
+
 
 @app.get("/")
 def read_root():
     return {"message": "API de Generador de Horarios Universitarios"}
 
 
+@app.get("/metrics")
+def get_metricas():
+    """Métricas de la API en el formato de texto de Prometheus"""
+    return Response(
+        content=exportar_metricas(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/api/admin/rutas")
+def get_metricas_rutas():
+    """Tiempo y consultas SQL por ruta desde que arrancó el proceso"""
+    return {"rutas": metricas_por_ruta()}
+
+
+MENSAJE_CSV_NO_UTF8 = "El archivo CSV debe estar codificado en UTF-8"
+
+
+def resultado_importacion(reporte: dict) -> dict:
+    """Respuesta de la carga de maestros a partir del reporte de importación"""
+    result = {
+        "message": f"Se cargaron {reporte['total_creados']} maestros exitosamente",
+        "procesadas": reporte["procesadas"],
+        "total_creados": reporte["total_creados"],
+        "maestros": reporte["creados"],
+    }
+
+    if reporte["errores"]:
+        result["errores"] = [
+            f"Fila {e['fila']}: {e['error']}" for e in reporte["errores"]
+        ]
+        result["errores_por_fila"] = reporte["errores"]
+    if reporte["advertencias"]:
+        result["advertencias"] = reporte["advertencias"]
+
+    return result
+
+
+def importar_con_progreso(csv_reader) -> Iterator[str]:
+    """
+    Importación para ?progreso=true: una línea NDJSON con los conteos
+    parciales por cada lote guardado y una última con el resultado.
+    Usa su propia sesión porque corre mientras se envía la respuesta.
+    """
+    db = SessionLocal()
+    reporte = nuevo_reporte()
+    try:
+        for parcial in importar_por_lotes(db, csv_reader, reporte):
+            yield json.dumps({"fase": "importando", **parcial}) + "\n"
+        db.commit()
+        invalidar(CACHE_MAESTROS)
+        yield json.dumps({"fase": "terminado", **resultado_importacion(reporte)}) + "\n"
+    except UnicodeDecodeError:
+        db.rollback()
+        yield json.dumps({"fase": "error", "detail": MENSAJE_CSV_NO_UTF8}) + "\n"
+    except Exception as e:
+        db.rollback()
+        yield json.dumps(
+            {"fase": "error", "detail": f"Error al procesar CSV: {str(e)}"}
+        ) + "\n"
+    finally:
+        db.close()
+
+
 @app.post("/api/maestros/upload-csv")
 async def upload_maestros_csv(
-    file: UploadFile = File(...), db: Session = Depends(get_db)
+    file: UploadFile = File(...),
+    progreso: bool = False,
 ):
     """
     Carga maestros desde un archivo CSV
@@ -58,148 +204,147 @@ async def upload_maestros_csv(
     Ejemplo:
     nombre,email,horas_max_semana,materias,dias_disponibles
     Dr. Juan Perez,juan@upv.edu.mx,15,INGLES I|INGLES II|INGLES III,0|1|2|3|4|5
-    """
-    try:
-        # Leer archivo CSV
-        contents = await file.read()
-        decoded_content = contents.decode("utf-8")
-        csv_reader = csv.DictReader(io.StringIO(decoded_content))
 
-        # Validar columnas requeridas
-        required_columns = ["nombre", "email"]
-        fieldnames = csv_reader.fieldnames
+    El archivo se lee por bloques y las filas se insertan por lotes conforme
+    se leen, sin cargarlo completo en memoria. Con ?progreso=true la
+    respuesta es NDJSON con el avance de cada lote y el resultado al final.
+    """
+    # Leer el CSV por bloques (el archivo se lee fuera del event loop)
+    csv_reader = csv.DictReader(leer_lineas(file.file))
 
-        if not fieldnames or not all(col in fieldnames for col in required_columns):
-            raise HTTPException(
-                status_code=400,
-                detail=f"El CSV debe contener las columnas: {', '.join(required_columns)}",
-            )
+    # Validar columnas requeridas
+    try:
+        fieldnames = await run_in_threadpool(lambda: csv_reader.fieldnames)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=MENSAJE_CSV_NO_UTF8)
 
-        maestros_creados = []
-        errores = []
-
-        # Insertar maestros en la base de datos
-        for idx, row in enumerate(csv_reader, start=2):
-            try:
-                # Obtener horas_max_semana, usar 15 por defecto si no existe
-                horas_max_semana = row.get("horas_max_semana", "15")
-                try:
-                    horas_max_semana = int(horas_max_semana)
-                except ValueError:
-                    horas_max_semana = 15
-
-                maestro = Maestro(
-                    nombre=row["nombre"].strip(),
-                    email=row["email"].strip(),
-                    numero=row.get("numero", "").strip(),
-                    horas_max_semana=horas_max_semana,
-                )
-                db.add(maestro)
-                db.flush()  # Para obtener el ID
-
-                # Procesar materias (separadas por |)
-                materias_str = row.get("materias", "")
-                if materias_str:
-                    nombres_materias = [
-                        m.strip().upper() for m in materias_str.split("|") if m.strip()
-                    ]
-                    for nombre_materia in nombres_materias:
-                        # Buscar materia por nombre (case insensitive)
-                        materia = (
-                            db.query(Materia)
-                            .filter(Materia.nombre.ilike(f"%{nombre_materia}%"))
-                            .first()
-                        )
-                        if materia:
-                            maestro_materia = MaestroMateria(
-                                maestro_id=maestro.id, materia_id=materia.id
-                            )
-                            db.add(maestro_materia)
-
-                # Procesar dias disponibles (separados por |)
-                dias_str = row.get("dias_disponibles", "0|1|2|3|4|5")
-                if dias_str:
-                    dias = []
-                    for d in dias_str.split("|"):
-                        try:
-                            dia = int(d.strip())
-                            if 0 <= dia <= 5:
-                                dias.append(dia)
-                        except ValueError:
-                            pass
-
-                    if not dias:
-                        dias = [0, 1, 2, 3, 4, 5]  # Por defecto todos los dias
-
-                    for dia in dias:
-                        disponibilidad = DisponibilidadMaestro(
-                            maestro_id=maestro.id,
-                            dia_semana=dia,
-                            hora_inicio=7,
-                            hora_fin=22,
-                        )
-                        db.add(disponibilidad)
+    if not fieldnames or not all(col in fieldnames for col in COLUMNAS_REQUERIDAS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"El CSV debe contener las columnas: {', '.join(COLUMNAS_REQUERIDAS)}",
+        )
 
-                maestros_creados.append(maestro.nombre)
-            except Exception as e:
-                errores.append(f"Fila {idx}: {str(e)}")
+    if progreso:
+        return StreamingResponse(
+            importar_con_progreso(csv_reader), media_type="application/x-ndjson"
+        )
 
+    # La sesión se abre aquí y no con Depends(get_db): con ?progreso=true
+    # la importación usa la suya
+    db = SessionLocal()
+    try:
+        # Materias resueltas en memoria e inserts masivos, todo en una transacción
+        reporte = await run_in_threadpool(importar_maestros, db, csv_reader)
         db.commit()
+        invalidar(CACHE_MAESTROS)
+        return resultado_importacion(reporte)
 
-        result = {
-            "message": f"Se cargaron {len(maestros_creados)} maestros exitosamente",
-            "maestros": maestros_creados,
-        }
-
-        if errores:
-            result["errores"] = errores
-
-        return result
-
-    except HTTPException:
-        raise
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=MENSAJE_CSV_NO_UTF8)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al procesar CSV: {str(e)}")
+    finally:
+        db.close()
+
+
+# Campos que se pueden pedir con ?campos=... en los listados
+CAMPOS_MAESTRO = (
+    "id",
+    "nombre",
+    "email",
+    "numero",
+    "horas_max_semana",
+    "materias",
+    "dias_disponibles",
+)
+CAMPOS_PLAN = (
+    "id",
+    "nombre",
+    "descripcion",
+    "total_cuatrimestres",
+    "total_materias",
+    "materias_por_cuatrimestre",
+)
+MAX_LIMIT_LISTADO = 1000
+
+
+def elegir_campos(campos: Optional[str], permitidos: tuple) -> tuple:
+    """Campos pedidos como "id,nombre,..." (todos si no se indica ninguno)"""
+    if not campos:
+        return permitidos
+    elegidos = tuple(c.strip() for c in campos.split(",") if c.strip())
+    invalidos = [c for c in elegidos if c not in permitidos]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos: {', '.join(invalidos)}. "
+            f"Disponibles: {', '.join(permitidos)}",
+        )
+    return elegidos
+
+
+def siguiente_cursor(filas: list, limit: Optional[int]) -> Optional[int]:
+    """Id para pedir la siguiente página (None si ya no hay más)"""
+    if limit is None or len(filas) < limit:
+        return None
+    return filas[-1].id
 
 
 @app.get("/api/maestros")
-def get_maestros(db: Session = Depends(get_db)):
-    """Obtiene todos los maestros registrados"""
-    maestros = db.query(Maestro).all()
-    total = len(maestros)
+async def get_maestros(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT_LISTADO),
+    cursor: Optional[int] = None,
+    campos: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene los maestros registrados. Opcional: `limit` y `cursor` (id del
+    último maestro recibido) para paginar, y `campos` para elegir columnas.
+    Cuesta un número fijo de consultas sin importar cuántos maestros haya.
+    """
+    elegidos = elegir_campos(campos, CAMPOS_MAESTRO)
+    cacheada, version = buscar_en_cache(request, CACHE_MAESTROS)
+    if cacheada:
+        return cacheada
 
-    return {
+    total = await db.scalar(select(func.count()).select_from(Maestro))
+    maestros = await db.run_sync(listar_maestros, limit, cursor)
+
+    # Sin paginar se traen las relaciones de todos los maestros de una vez
+    ids = [m.id for m in maestros] if limit is not None or cursor is not None else None
+    materias = (
+        await db.run_sync(materias_de_maestros, ids) if "materias" in elegidos else {}
+    )
+    dias = (
+        await db.run_sync(dias_de_maestros, ids) if "dias_disponibles" in elegidos else {}
+    )
+
+    def armar(m) -> dict:
+        valores = {
+            "id": m.id,
+            "nombre": m.nombre,
+            "email": m.email,
+            "numero": m.numero,
+            "horas_max_semana": m.horas_max_semana,
+            "materias": materias.get(m.id, []),
+            "dias_disponibles": dias.get(m.id, []),
+        }
+        return {c: valores[c] for c in elegidos}
+
+    resultado = {
         "total": total,
         "minimo_maestros": MINIMO_MAESTROS,
         "puede_eliminar": total > MINIMO_MAESTROS,
         "grupos_base_por_cuatrimestre": GRUPOS_BASE,
         "maestros_por_grupo_extra": MAESTROS_POR_GRUPO_EXTRA,  # 3 maestros por grupo extra
         "mensaje_grupos": f"Para agregar 1 grupo extra a cualquier cuatrimestre, necesitas aproximadamente {MAESTROS_POR_GRUPO_EXTRA} maestros adicionales.",
-        "maestros": [
-            {
-                "id": m.id,
-                "nombre": m.nombre,
-                "email": m.email,
-                "numero": m.numero if hasattr(m, "numero") else "",
-                "horas_max_semana": m.horas_max_semana,
-                "materias": (
-                    [
-                        {"id": mm.materia_id, "nombre": mm.materia.nombre}
-                        for mm in m.materias
-                    ]
-                    if hasattr(m, "materias")
-                    else []
-                ),
-                "dias_disponibles": (
-                    [d.dia_semana for d in m.disponibilidades]
-                    if hasattr(m, "disponibilidades")
-                    else []
-                ),
-            }
-            for m in maestros
-        ],
+        "siguiente_cursor": siguiente_cursor(maestros, limit),
+        "maestros": [armar(m) for m in maestros],
     }
+    return guardar_en_cache(request, CACHE_MAESTROS, resultado, version)
 
 
 from pydantic import BaseModel
@@ -258,6 +403,7 @@ def crear_maestro(maestro_data: MaestroCreate, db: Session = Depends(get_db)):
         )
         db.add(maestro)
         db.commit()
+        invalidar(CACHE_MAESTROS)
         db.refresh(maestro)
 
         # Agregar materias que puede impartir
@@ -275,6 +421,7 @@ def crear_maestro(maestro_data: MaestroCreate, db: Session = Depends(get_db)):
             db.add(disponibilidad)
 
         db.commit()
+        invalidar(CACHE_MAESTROS)
 
         return {
             "message": "Maestro creado exitosamente",
@@ -303,6 +450,9 @@ def actualizar_maestro(
         if not maestro:
             raise HTTPException(status_code=404, detail="Maestro no encontrado")
 
+        # Vistas donde aparece su nombre: las suyas, sus grupos y sus horarios
+        vistas = vistas_afectadas(db, Asignacion.maestro_id == maestro_id)
+
         # Actualizar datos básicos
         maestro.nombre = maestro_data.nombre.strip()
         maestro.email = maestro_data.email.strip()
@@ -333,7 +483,9 @@ def actualizar_maestro(
             )
             db.add(disponibilidad)
 
+        refrescar_snapshots(db, **vistas)
         db.commit()
+        invalidar(CACHE_MAESTROS)
         db.refresh(maestro)
 
         return {
@@ -380,8 +532,11 @@ def eliminar_maestro(maestro_id: int, db: Session = Depends(get_db)):
         if not maestro:
             raise HTTPException(status_code=404, detail="Maestro no encontrado")
 
+        vistas = vistas_afectadas(db, Asignacion.maestro_id == maestro_id)
         db.delete(maestro)
+        refrescar_snapshots(db, **vistas)
         db.commit()
+        invalidar(CACHE_MAESTROS)
 
         return {"message": f"Maestro {maestro.nombre} eliminado exitosamente"}
     except HTTPException:
@@ -408,6 +563,7 @@ def crear_plan_estudios(plan_data: PlanEstudiosCreate, db: Session = Depends(get
         )
         db.add(plan)
         db.commit()
+        invalidar(CACHE_PLANES, CACHE_MATERIAS)
         db.refresh(plan)
 
         # Agregar las materias del plan
@@ -429,6 +585,7 @@ def crear_plan_estudios(plan_data: PlanEstudiosCreate, db: Session = Depends(get
             )
 
         db.commit()
+        invalidar(CACHE_PLANES, CACHE_MATERIAS)
 
         return {
             "message": f"Plan de estudios '{plan.nombre}' creado exitosamente con {len(materias_creadas)} materias",
@@ -447,79 +604,80 @@ def crear_plan_estudios(plan_data: PlanEstudiosCreate, db: Session = Depends(get
         )
 
 
+def armar_plan(plan, materias_por_cuatrimestre: dict, elegidos: tuple = CAMPOS_PLAN) -> dict:
+    """Respuesta de un plan de estudios a partir de sus columnas y sus materias"""
+    valores = {
+        "id": plan.id,
+        "nombre": plan.nombre,
+        "descripcion": plan.descripcion,
+        "total_cuatrimestres": plan.total_cuatrimestres,
+        "total_materias": sum(len(m) for m in materias_por_cuatrimestre.values()),
+        "materias_por_cuatrimestre": materias_por_cuatrimestre,
+    }
+    return {c: valores[c] for c in elegidos}
+
+
 @app.get("/api/planes-estudios")
-def get_planes_estudios(db: Session = Depends(get_db)):
-    """Obtiene todos los planes de estudio con sus materias"""
-    planes = db.query(PlanEstudios).all()
+async def get_planes_estudios(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT_LISTADO),
+    cursor: Optional[int] = None,
+    campos: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene todos los planes de estudio con sus materias. Opcional: `limit`,
+    `cursor` y `campos`, igual que /api/maestros.
+    """
+    elegidos = elegir_campos(campos, CAMPOS_PLAN)
+    cacheada, version = buscar_en_cache(request, CACHE_PLANES)
+    if cacheada:
+        return cacheada
 
-    result = []
-    for plan in planes:
-        materias_por_cuatrimestre = {}
-        for materia in plan.materias:
-            cuatri = materia.cuatrimestre
-            if cuatri not in materias_por_cuatrimestre:
-                materias_por_cuatrimestre[cuatri] = []
-            materias_por_cuatrimestre[cuatri].append(
-                {
-                    "id": materia.id,
-                    "nombre": materia.nombre,
-                    "horas_semanales": materia.horas_semanales,
-                }
-            )
+    total = await db.scalar(select(func.count()).select_from(PlanEstudios))
+    planes = await db.run_sync(listar_planes, limit, cursor)
 
-        result.append(
-            {
-                "id": plan.id,
-                "nombre": plan.nombre,
-                "descripcion": plan.descripcion,
-                "total_cuatrimestres": plan.total_cuatrimestres,
-                "total_materias": len(plan.materias),
-                "materias_por_cuatrimestre": materias_por_cuatrimestre,
-            }
-        )
+    materias = {}
+    if "total_materias" in elegidos or "materias_por_cuatrimestre" in elegidos:
+        ids = [p.id for p in planes] if limit is not None or cursor is not None else None
+        materias = await db.run_sync(materias_de_planes, ids)
 
-    return {
-        "total": len(planes),
-        "planes": result,
+    resultado = {
+        "total": total,
+        "siguiente_cursor": siguiente_cursor(planes, limit),
+        "planes": [armar_plan(p, materias.get(p.id, {}), elegidos) for p in planes],
     }
+    return guardar_en_cache(request, CACHE_PLANES, resultado, version)
 
 
 @app.get("/api/planes-estudios/{plan_id}")
-def get_plan_estudios(plan_id: int, db: Session = Depends(get_db)):
+async def get_plan_estudios(
+    plan_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """Obtiene un plan de estudios especifico con sus materias"""
-    plan = db.query(PlanEstudios).filter(PlanEstudios.id == plan_id).first()
+    cacheada, version = buscar_en_cache(request, CACHE_PLANES)
+    if cacheada:
+        return cacheada
 
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan de estudios no encontrado")
+    planes = await db.run_sync(listar_planes, None, None, plan_id)
 
-    materias_por_cuatrimestre = {}
-    for materia in plan.materias:
-        cuatri = materia.cuatrimestre
-        if cuatri not in materias_por_cuatrimestre:
-            materias_por_cuatrimestre[cuatri] = []
-        materias_por_cuatrimestre[cuatri].append(
-            {
-                "id": materia.id,
-                "nombre": materia.nombre,
-                "horas_semanales": materia.horas_semanales,
-            }
-        )
+    if not planes:
+        raise HTTPException(status_code=404, detail="Plan de estudios no encontrado")
 
-    return {
-        "id": plan.id,
-        "nombre": plan.nombre,
-        "descripcion": plan.descripcion,
-        "total_cuatrimestres": plan.total_cuatrimestres,
-        "total_materias": len(plan.materias),
-        "materias_por_cuatrimestre": materias_por_cuatrimestre,
-    }
+    materias = await db.run_sync(materias_de_planes, [plan_id])
+    resultado = armar_plan(planes[0], materias.get(plan_id, {}))
+    return guardar_en_cache(request, CACHE_PLANES, resultado, version)
 
 
 @app.get("/api/planes-estudios/{plan_id}/cuatrimestre/{cuatrimestre}")
 def get_materias_cuatrimestre(
-    plan_id: int, cuatrimestre: int, db: Session = Depends(get_db)
+    plan_id: int, cuatrimestre: int, request: Request, db: Session = Depends(get_db)
 ):
     """Obtiene las materias de un cuatrimestre especifico de un plan"""
+    cacheada, version = buscar_en_cache(request, CACHE_PLANES)
+    if cacheada:
+        return cacheada
+
     plan = db.query(PlanEstudios).filter(PlanEstudios.id == plan_id).first()
 
     if not plan:
@@ -533,7 +691,7 @@ def get_materias_cuatrimestre(
         .all()
     )
 
-    return {
+    resultado = {
         "plan": plan.nombre,
         "cuatrimestre": cuatrimestre,
         "materias": [
@@ -545,6 +703,7 @@ def get_materias_cuatrimestre(
             for m in materias
         ],
     }
+    return guardar_en_cache(request, CACHE_PLANES, resultado, version)
 
 
 @app.delete("/api/planes-estudios/{plan_id}")
@@ -557,8 +716,16 @@ def eliminar_plan_estudios(plan_id: int, db: Session = Depends(get_db)):
                 status_code=404, detail="Plan de estudios no encontrado"
             )
 
+        vistas = vistas_afectadas(
+            db,
+            Asignacion.materia_id.in_(
+                select(Materia.id).where(Materia.plan_estudios_id == plan_id)
+            ),
+        )
         db.delete(plan)
+        refrescar_snapshots(db, **vistas)
         db.commit()
+        invalidar(CACHE_PLANES, CACHE_MATERIAS, CACHE_MAESTROS)
 
         return {"message": f"Plan de estudios '{plan.nombre}' eliminado exitosamente"}
     except HTTPException:
@@ -590,6 +757,7 @@ def actualizar_plan_estudios(
             plan.total_cuatrimestres = plan_data.total_cuatrimestres
 
         db.commit()
+        invalidar(CACHE_PLANES)
         db.refresh(plan)
 
         return {
@@ -640,6 +808,7 @@ def agregar_materias_plan(
             )
 
         db.commit()
+        invalidar(CACHE_PLANES, CACHE_MATERIAS)
 
         return {
             "message": f"Se agregaron {len(materias_creadas)} materias al plan '{plan.nombre}'",
@@ -669,8 +838,11 @@ def eliminar_materia_plan(plan_id: int, materia_id: int, db: Session = Depends(g
             )
 
         nombre = materia.nombre
+        vistas = vistas_afectadas(db, Asignacion.materia_id == materia_id)
         db.delete(materia)
+        refrescar_snapshots(db, **vistas)
         db.commit()
+        invalidar(CACHE_PLANES, CACHE_MATERIAS, CACHE_MAESTROS)
 
         return {"message": f"Materia '{nombre}' eliminada exitosamente"}
     except HTTPException:
@@ -695,6 +867,7 @@ def crear_materia(materia_data: MateriaCreate, db: Session = Depends(get_db)):
         )
         db.add(materia)
         db.commit()
+        invalidar(CACHE_MATERIAS)
         db.refresh(materia)
         return {
             "message": "Materia creada exitosamente",
@@ -710,10 +883,14 @@ def crear_materia(materia_data: MateriaCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/api/materias")
-def get_materias(db: Session = Depends(get_db)):
+def get_materias(request: Request, db: Session = Depends(get_db)):
     """Obtiene todas las materias"""
+    cacheada, version = buscar_en_cache(request, CACHE_MATERIAS)
+    if cacheada:
+        return cacheada
+
     materias = db.query(Materia).all()
-    return {
+    resultado = {
         "total": len(materias),
         "materias": [
             {
@@ -726,6 +903,7 @@ def get_materias(db: Session = Depends(get_db)):
             for m in materias
         ],
     }
+    return guardar_en_cache(request, CACHE_MATERIAS, resultado, version)
 
 
 @app.put("/api/materias/{materia_id}")
@@ -741,7 +919,9 @@ def actualizar_materia(
         materia.nombre = materia_data.nombre.strip()
         materia.horas_semanales = materia_data.horas_semanales
 
+        refrescar_snapshots(db, **vistas_afectadas(db, Asignacion.materia_id == materia_id))
         db.commit()
+        invalidar(CACHE_MATERIAS, CACHE_PLANES, CACHE_MAESTROS)
         db.refresh(materia)
 
         return {
@@ -769,8 +949,11 @@ def eliminar_materia(materia_id: int, db: Session = Depends(get_db)):
         if not materia:
             raise HTTPException(status_code=404, detail="Materia no encontrada")
 
+        vistas = vistas_afectadas(db, Asignacion.materia_id == materia_id)
         db.delete(materia)
+        refrescar_snapshots(db, **vistas)
         db.commit()
+        invalidar(CACHE_MATERIAS, CACHE_PLANES, CACHE_MAESTROS)
 
         return {"message": f"Materia {materia.nombre} eliminada exitosamente"}
     except HTTPException:
@@ -788,20 +971,28 @@ def crear_grupo(nombre: str, semestre: int, db: Session = Depends(get_db)):
     grupo = Grupo(nombre=nombre, semestre=semestre)
     db.add(grupo)
     db.commit()
+    invalidar(CACHE_GRUPOS)
     db.refresh(grupo)
     return {"id": grupo.id, "nombre": grupo.nombre, "semestre": grupo.semestre}
 
 
 @app.get("/api/grupos")
-def get_grupos(db: Session = Depends(get_db)):
+async def get_grupos(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Obtiene todos los grupos"""
-    grupos = db.query(Grupo).all()
-    return {
+    cacheada, version = buscar_en_cache(request, CACHE_GRUPOS)
+    if cacheada:
+        return cacheada
+
+    grupos = (
+        await db.execute(select(Grupo.id, Grupo.nombre, Grupo.semestre).order_by(Grupo.id))
+    ).all()
+    resultado = {
         "total": len(grupos),
         "grupos": [
             {"id": g.id, "nombre": g.nombre, "semestre": g.semestre} for g in grupos
         ],
     }
+    return guardar_en_cache(request, CACHE_GRUPOS, resultado, version)
 
 
 # Modelo para generar horario
@@ -813,19 +1004,180 @@ class GenerarHorarioRequest(BaseModel):
     )  # {cuatrimestre: num_grupos} ej: {1: 2, 2: 3, 3: 2}
     grupos_generar: int = 2  # Valor por defecto si no se especifica por cuatrimestre
     turno: str = "matutino"
+    modo: str = "voraz"  # "voraz" (rápido) o "exacto" (cubre todas las horas o prueba que no se puede)
+    max_nodos: int = 200000  # Presupuesto del modo exacto
+    max_segundos: float = 5.0
+    optimizar_iteraciones: int = 0  # Búsqueda local después de generar (0 = sin ella)
+    optimizar_segundos: float = 1.0
+    reinicios: int = 1  # Intentos con semillas distintas; se guarda el mejor
+    procesos: int = 1  # Procesos en paralelo para los intentos
+    semilla: Optional[int] = None  # Para repetir una generación (None = al azar)
+    # Regeneración incremental: solo los grupos del plan afectados por estos
+    # cambios (ver ejecutar_regeneracion); el resto se conserva
+    incremental: bool = False
+    maestros_cambiados: list[int] = []
+    materias_cambiadas: list[int] = []
+    grupos_cambiados: list[int] = []
 
 
 # Cuatrimestres de estadía (no tienen horario de clases)
 CUATRIMESTRES_ESTADIA = [6, 10]
 
+# Modos del motor de horarios
+MODOS_GENERACION = ["voraz", "exacto"]
 
-@app.post("/api/generar-horario")
-def generar_horario(
-    request: GenerarHorarioRequest,
-    db: Session = Depends(get_db),
-):
+MENSAJE_CYTHON_NO_COMPILADO = "El módulo Cython no está compilado. Ejecuta: cd backend/scheduler && python setup.py build_ext --inplace"
+
+
+def validar_generacion(request: GenerarHorarioRequest):
+    """Valida los parámetros de una generación (antes de tocar la base de datos)"""
+    if not request.maestro_ids:
+        raise HTTPException(
+            status_code=400, detail="Debe seleccionar al menos un docente"
+        )
+
+    if request.modo not in MODOS_GENERACION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Modo inválido. Usa uno de: {', '.join(MODOS_GENERACION)}",
+        )
+
+    if request.reinicios < 1 or request.procesos < 1:
+        raise HTTPException(
+            status_code=400,
+            detail="reinicios y procesos deben ser al menos 1",
+        )
+
+    if request.incremental and not (
+        request.maestros_cambiados or request.materias_cambiadas or request.grupos_cambiados
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="La regeneración incremental necesita maestros_cambiados, materias_cambiadas o grupos_cambiados",
+        )
+
+
+def datos_maestros(maestros: list) -> list:
+    """Datos de los maestros en el formato del motor"""
+    maestros_data = []
+    for m in maestros:
+        materias_puede_impartir = [mm.materia_id for mm in m.materias]
+        dias_disponibles = [d.dia_semana for d in m.disponibilidades]
+
+        if not dias_disponibles:
+            dias_disponibles = [0, 1, 2, 3, 4]  # Lunes a Viernes (sin Sabado)
+
+        maestros_data.append(
+            {
+                "id": m.id,
+                "nombre": m.nombre,
+                "horas_max_semana": m.horas_max_semana,  # Máximo 15 horas por semana
+                "materias_ids": materias_puede_impartir,
+                "dias_disponibles": dias_disponibles,
+            }
+        )
+    return maestros_data
+
+
+def rango_turno(turno: str) -> tuple:
+    """(hora_min, hora_max) del turno"""
+    if turno.lower() == "matutino":
+        return 7, 14  # 7:00 AM a 2:00 PM
+    return 14, 22  # vespertino: 2:00 PM a 10:00 PM
+
+
+def opciones_motor(request: GenerarHorarioRequest) -> dict:
+    return {
+        "modo": request.modo,
+        "max_nodos": request.max_nodos,
+        "max_segundos": request.max_segundos,
+        "optimizar_iteraciones": request.optimizar_iteraciones,
+        "optimizar_segundos": request.optimizar_segundos,
+    }
+
+
+def insertar_con_ids(db: Session, modelo, filas: list) -> list:
+    """
+    Inserta `filas` en un solo INSERT (executemany) y regresa sus ids en el
+    mismo orden. MySQL no tiene INSERT ... RETURNING (el flush del ORM haría
+    un INSERT por fila para leer lastrowid): se bloquea el final de la tabla
+    (SELECT ... FOR UPDATE del id mayor) para que nadie más inserte antes
+    del commit y los ids nuevos se leen con un solo SELECT.
+    """
+    if not filas:
+        return []
+    ultimo = db.scalar(
+        select(modelo.id).order_by(modelo.id.desc()).limit(1).with_for_update()
+    )
+    db.execute(insert(modelo), filas)
+    ids = db.scalars(
+        select(modelo.id).where(modelo.id > (ultimo or 0)).order_by(modelo.id)
+    ).all()
+    if len(ids) != len(filas):
+        raise RuntimeError(
+            f"Se insertaron {len(filas)} filas en {modelo.__tablename__} pero hay {len(ids)} ids nuevos"
+        )
+    return ids
+
+
+def guardar_asignaciones(db: Session, asignaciones: list, turno: str) -> tuple:
     """
-    Genera horarios para TODOS los cuatrimestres de un plan de estudios.
+    Crea un horario por cada grupo con asignaciones y guarda todas las
+    asignaciones en un solo INSERT (executemany), sin commit.
+    Regresa (horarios_por_grupo, asignaciones_por_grupo); horarios_por_grupo
+    es {grupo_id: horario_id}.
+    """
+    # Separar las asignaciones por grupo
+    asignaciones_por_grupo = {}
+    for asig in asignaciones:
+        asignaciones_por_grupo.setdefault(asig["grupo_id"], []).append(asig)
+
+    # Un horario por cada grupo con asignaciones (un INSERT y un SELECT para los ids)
+    ids = insertar_con_ids(
+        db,
+        HorarioGenerado,
+        [{"estado": "generado", "turno": turno.lower()} for _ in asignaciones_por_grupo],
+    )
+    horarios_por_grupo = dict(zip(asignaciones_por_grupo, ids))
+
+    filas = [
+        {"horario_id": horarios_por_grupo[asig["grupo_id"]], **asig}
+        for asig in asignaciones
+    ]
+    if filas:
+        db.execute(insert(Asignacion), filas)
+    return horarios_por_grupo, asignaciones_por_grupo
+
+
+def horas_por_grupo(cuatrimestres_data: list, asignaciones: list) -> dict:
+    """
+    {grupo_id: {"horas_requeridas", "horas_colocadas"}}: horas semanales que
+    piden las materias del grupo y cuántas quedaron en el horario (sin
+    contar las que pasen de lo que pide cada materia)
+    """
+    colocadas = {}
+    for asig in asignaciones:
+        clave = (asig["grupo_id"], asig["materia_id"])
+        colocadas[clave] = colocadas.get(clave, 0) + asig["hora_fin"] - asig["hora_inicio"]
+
+    horas = {}
+    for datos in cuatrimestres_data:
+        for grupo in datos["grupos"]:
+            horas[grupo["id"]] = {
+                "horas_requeridas": sum(m["horas_semanales"] for m in datos["materias"]),
+                "horas_colocadas": sum(
+                    min(colocadas.get((grupo["id"], m["id"]), 0), m["horas_semanales"])
+                    for m in datos["materias"]
+                ),
+            }
+    return horas
+
+
+def ejecutar_generacion(
+    request: GenerarHorarioRequest, db: Session, avisar: Optional[Callable] = None
+) -> dict:
+    """
+    Genera y guarda los horarios de TODOS los cuatrimestres de un plan de estudios.
     Excluye automaticamente los cuatrimestres de estadia (5 y 10).
     Formato de grupos: NOMBRE_PLAN CUATRIMESTRE-N (ej: LITI 1-1, LITI 2-1, etc.)
 
@@ -835,28 +1187,44 @@ def generar_horario(
     - Las materias que cada docente puede impartir
     - Las horas maximas por dia de cada docente (creditos = horas semanales)
     - Los dias disponibles de cada docente (Lunes a Sabado)
-    """
-    try:
-        # Importar el modulo Cython compilado
-        import scheduler
 
-        # Extraer datos del request
-        plan_id = request.plan_id
-        maestro_ids = request.maestro_ids
-        grupos_por_cuatrimestre = (
-            request.grupos_por_cuatrimestre
-        )  # Dict con grupos específicos por cuatrimestre
-        grupos_default = (
-            request.grupos_generar
-        )  # Valor por defecto si no está en el dict
-        turno = request.turno
-
-        # Validaciones
-        if not maestro_ids:
-            raise HTTPException(
-                status_code=400, detail="Debe seleccionar al menos un docente"
-            )
+    Con modo="exacto" el motor busca un horario que cubra todas las horas de
+    todas las materias; si no existe lo indica en "resumen" (estado "imposible")
+    y guarda el mejor horario parcial encontrado.
+
+    Con optimizar_iteraciones > 0 el horario pasa por una búsqueda local que
+    reduce huecos, materias repetidas en un día y horas sin cubrir.
 
+    Si se da `avisar`, se llama como avisar(fase, cuatrimestre, estado) para
+    reportar el avance (ver /api/generar-horario/jobs).
+
+    Con incremental=True no se borra nada: ver ejecutar_regeneracion.
+    """
+    if request.incremental:
+        validar_generacion(request)
+        return ejecutar_regeneracion(request, db, avisar)
+
+    def avisar_progreso(fase, cuatrimestre=None, estado=None):
+        if avisar:
+            avisar(fase, cuatrimestre, estado)
+
+    # Extraer datos del request
+    plan_id = request.plan_id
+    maestro_ids = request.maestro_ids
+    grupos_por_cuatrimestre = (
+        request.grupos_por_cuatrimestre
+    )  # Dict con grupos específicos por cuatrimestre
+    grupos_default = (
+        request.grupos_generar
+    )  # Valor por defecto si no está en el dict
+    turno = request.turno
+
+    # Validaciones
+    validar_generacion(request)
+    avisar_progreso("preparando")
+    fases = Fases("completa")
+
+    with fases.medir("carga_datos"):
         # Obtener el plan de estudios
         plan = db.query(PlanEstudios).filter(PlanEstudios.id == plan_id).first()
         if not plan:
@@ -874,47 +1242,37 @@ def generar_horario(
                 status_code=400, detail="No se encontraron los docentes seleccionados"
             )
 
-        # ELIMINAR TODOS LOS HORARIOS Y GRUPOS ANTERIORES
+    # ELIMINAR TODOS LOS HORARIOS Y GRUPOS ANTERIORES
+    # (en la misma transacción que lo nuevo: si algo falla no se pierde nada)
+    with fases.medir("borrado"):
+        borrar_snapshots(db)
         db.query(Asignacion).delete()
         db.query(HorarioGenerado).delete()
         db.query(Grupo).delete()
-        db.commit()
 
-        # Preparar datos de maestros (se reutiliza para todos los cuatrimestres)
-        maestros_data = []
-        for m in maestros:
-            materias_puede_impartir = [mm.materia_id for mm in m.materias]
-            dias_disponibles = [d.dia_semana for d in m.disponibilidades]
+    # Preparar datos de maestros (se reutiliza para todos los cuatrimestres)
+    with fases.medir("maestros_data"):
+        maestros_data = datos_maestros(maestros)
 
-            if not dias_disponibles:
-                dias_disponibles = [0, 1, 2, 3, 4]  # Lunes a Viernes (sin Sabado)
-
-            maestros_data.append(
-                {
-                    "id": m.id,
-                    "nombre": m.nombre,
-                    "horas_max_semana": m.horas_max_semana,  # Máximo 15 horas por semana
-                    "materias_ids": materias_puede_impartir,
-                    "dias_disponibles": dias_disponibles,
-                }
-            )
+    horarios_creados = []
+    cuatrimestres_generados = []
 
-        total_asignaciones = 0
-        horarios_creados = []
-        cuatrimestres_generados = []
+    # Determinar horas segun el turno
+    hora_min, hora_max = rango_turno(turno)
 
-        # Determinar horas segun el turno
-        if turno.lower() == "matutino":
-            hora_min, hora_max = 7, 14  # 7:00 AM a 2:00 PM
-        else:  # vespertino
-            hora_min, hora_max = 14, 22  # 2:00 PM a 10:00 PM
+    # ITERAR POR TODOS LOS CUATRIMESTRES (excepto estadias)
+    # Primero se crean los grupos de cada cuatrimestre y despues se genera
+    # TODO el plan con un solo motor, para que la ocupacion de los maestros
+    # se comparta entre grupos (sin empalmes ni exceso de horas semanales)
+    cuatrimestres_data = []
+    grupos_creados = []  # (grupo, cuatrimestre) en orden de generacion
 
-        # ITERAR POR TODOS LOS CUATRIMESTRES (excepto estadias)
-        for cuatrimestre in range(1, plan.total_cuatrimestres + 1):
-            # Saltar cuatrimestres de estadia
-            if cuatrimestre in CUATRIMESTRES_ESTADIA:
-                continue
+    for cuatrimestre in range(1, plan.total_cuatrimestres + 1):
+        # Saltar cuatrimestres de estadia
+        if cuatrimestre in CUATRIMESTRES_ESTADIA:
+            continue
 
+        with fases.medir("cuatrimestre", cuatrimestre=cuatrimestre):
             # Obtener materias del cuatrimestre
             materias_cuatrimestre = (
                 db.query(Materia)
@@ -942,95 +1300,448 @@ def generar_horario(
                 cuatrimestre, grupos_default
             )
 
-            # GENERAR UN HORARIO POR CADA GRUPO DE ESTE CUATRIMESTRE
+            # CREAR LOS GRUPOS DE ESTE CUATRIMESTRE (los ids llegan al insertarlos)
+            grupos_cuatrimestre = []
             for grupo_num in range(1, num_grupos_cuatri + 1):
                 nombre_grupo = f"{nombre_carrera} {cuatrimestre}-{grupo_num}"
 
-                grupo = Grupo(
-                    nombre=nombre_grupo,
-                    semestre=cuatrimestre,
-                )
-                db.add(grupo)
-                db.commit()
-                db.refresh(grupo)
+                grupo = {
+                    "nombre": nombre_grupo,
+                    "semestre": cuatrimestre,
+                    "plan_estudios_id": plan_id,
+                }
+                grupos_cuatrimestre.append(grupo)
+                grupos_creados.append((grupo, cuatrimestre))
 
-                grupos_data = [{"id": grupo.id, "nombre": grupo.nombre}]
+            cuatrimestres_data.append(
+                {
+                    "cuatrimestre": cuatrimestre,
+                    "materias": materias_data,
+                    "grupos": grupos_cuatrimestre,
+                }
+            )
 
-                # Crear instancia del motor de horarios
-                engine = scheduler.SchedulerEngine(
-                    len(maestros), len(materias_cuatrimestre), 1, hora_min, hora_max
-                )
+    # Insertar todos los grupos con un solo INSERT y leer sus ids con un SELECT
+    with fases.medir("grupos"):
+        ids = insertar_con_ids(db, Grupo, [grupo for grupo, _ in grupos_creados])
+    for (grupo, _), grupo_id in zip(grupos_creados, ids):
+        grupo["id"] = grupo_id
+    for datos in cuatrimestres_data:
+        datos["grupos"] = [{"id": g["id"], "nombre": g["nombre"]} for g in datos["grupos"]]
+        avisar_progreso("creando_grupos", datos["cuatrimestre"], "grupos_creados")
+
+    # Generar horario de todos los grupos: cada intento usa UN motor para
+    # todo el plan; con varios reinicios se reparten en procesos y se
+    # conserva el mejor
+    avisar_progreso("generando")
+    procesos = min(request.procesos, request.reinicios, os.cpu_count() or 1)
+    with fases.medir("motor"):
+        generacion = generar_mejor_horario(
+            maestros_data,
+            cuatrimestres_data,
+            hora_min,
+            hora_max,
+            reinicios=request.reinicios,
+            procesos=procesos,
+            opciones=opciones_motor(request),
+            semilla=request.semilla,
+        )
+    asignaciones_plan = generacion["asignaciones"]
+    # Una sola llamada al motor: todos los cuatrimestres quedan generados a la vez
+    for cuatrimestre in cuatrimestres_generados:
+        avisar_progreso("guardando", cuatrimestre, "generado")
+
+    with fases.medir("guardado"):
+        horarios_por_grupo, asignaciones_por_grupo = guardar_asignaciones(
+            db, asignaciones_plan, turno
+        )
 
-                # Generar horario
-                asignaciones = engine.generar_horario(
-                    maestros_data, materias_data, grupos_data
-                )
+    # Vistas precalculadas de los horarios nuevos (por horario, grupo y maestro)
+    with fases.medir("snapshots"):
+        reconstruir_snapshots(db)
 
-                if len(asignaciones) > 0:
-                    horario = HorarioGenerado(estado="generado", turno=turno.lower())
-                    db.add(horario)
-                    db.commit()
-                    db.refresh(horario)
-
-                    for asig in asignaciones:
-                        asignacion_db = Asignacion(
-                            horario_id=horario.id,
-                            maestro_id=asig["maestro_id"],
-                            materia_id=asig["materia_id"],
-                            grupo_id=grupo.id,
-                            dia_semana=asig["dia_semana"],
-                            hora_inicio=asig["hora_inicio"],
-                            hora_fin=asig["hora_fin"],
-                        )
-                        db.add(asignacion_db)
-
-                    db.commit()
-                    total_asignaciones += len(asignaciones)
-                    horarios_creados.append(
-                        {
-                            "horario_id": horario.id,
-                            "grupo": grupo.nombre,
-                            "cuatrimestre": cuatrimestre,
-                            "asignaciones": len(asignaciones),
-                        }
-                    )
-                else:
-                    horarios_creados.append(
-                        {
-                            "horario_id": None,
-                            "grupo": grupo.nombre,
-                            "cuatrimestre": cuatrimestre,
-                            "asignaciones": 0,
-                        }
-                    )
+    # Una sola transacción por generación: borrado, grupos, horarios y asignaciones
+    with fases.medir("commit"):
+        db.commit()
+    invalidar(CACHE_GRUPOS)
+    total_asignaciones = len(asignaciones_plan)
 
-        # Calcular total de grupos generados
-        total_grupos = sum(
-            grupos_por_cuatrimestre.get(c, grupos_default)
+    horas = horas_por_grupo(cuatrimestres_data, asignaciones_plan)
+    for grupo, cuatrimestre in grupos_creados:
+        horarios_creados.append(
+            {
+                "horario_id": horarios_por_grupo.get(grupo["id"]),
+                "grupo": grupo["nombre"],
+                "cuatrimestre": cuatrimestre,
+                "asignaciones": len(asignaciones_por_grupo.get(grupo["id"], [])),
+                **horas.get(grupo["id"], {"horas_requeridas": 0, "horas_colocadas": 0}),
+            }
+        )
+    fases.terminar(
+        generacion["resumen"],
+        sum(h["horas_requeridas"] for h in horas.values()),
+        sum(h["horas_colocadas"] for h in horas.values()),
+    )
+    for cuatrimestre in cuatrimestres_generados:
+        avisar_progreso("guardando", cuatrimestre, "guardado")
+
+    avisar_progreso("terminado")
+
+    # Calcular total de grupos generados
+    total_grupos = sum(
+        grupos_por_cuatrimestre.get(c, grupos_default)
+        for c in cuatrimestres_generados
+    )
+
+    return {
+        "message": f"Se generaron horarios para {len(cuatrimestres_generados)} cuatrimestres de {nombre_carrera}",
+        "plan": nombre_carrera,
+        "cuatrimestres_generados": cuatrimestres_generados,
+        "cuatrimestres_estadia": [
+            c for c in CUATRIMESTRES_ESTADIA if c <= plan.total_cuatrimestres
+        ],
+        "grupos_por_cuatrimestre": {
+            c: grupos_por_cuatrimestre.get(c, grupos_default)
             for c in cuatrimestres_generados
+        },
+        "total_grupos": total_grupos,
+        "turno": turno,
+        "total_asignaciones": total_asignaciones,
+        "horarios": horarios_creados,
+        # Horas requeridas/cubiertas y, en modo exacto, si el plan es factible
+        "resumen": generacion["resumen"],
+        "semilla": generacion["semilla"],
+        "intentos": generacion["intentos"],
+        # Tiempo por fase, horas y contadores del motor (también en /metrics)
+        "metricas": fases.resumen(),
+    }
+
+
+def grupos_del_plan(db: Session, plan: PlanEstudios) -> list:
+    """
+    Grupos generados para un plan: los que tienen su plan_estudios_id y, los
+    de antes de esa columna (NULL), los que tienen clases de sus materias
+    """
+    de_materias_del_plan = (
+        select(Asignacion.grupo_id)
+        .join(Materia, Materia.id == Asignacion.materia_id)
+        .where(Materia.plan_estudios_id == plan.id)
+    )
+    return (
+        db.query(Grupo)
+        .filter(
+            or_(
+                Grupo.plan_estudios_id == plan.id,
+                Grupo.plan_estudios_id.is_(None) & Grupo.id.in_(de_materias_del_plan),
+            )
         )
+        .order_by(Grupo.id)
+        .all()
+    )
 
-        return {
-            "message": f"Se generaron horarios para {len(cuatrimestres_generados)} cuatrimestres de {nombre_carrera}",
-            "plan": nombre_carrera,
-            "cuatrimestres_generados": cuatrimestres_generados,
-            "cuatrimestres_estadia": [
-                c for c in CUATRIMESTRES_ESTADIA if c <= plan.total_cuatrimestres
-            ],
-            "grupos_por_cuatrimestre": {
-                c: grupos_por_cuatrimestre.get(c, grupos_default)
-                for c in cuatrimestres_generados
-            },
-            "total_grupos": total_grupos,
-            "turno": turno,
-            "total_asignaciones": total_asignaciones,
-            "horarios": horarios_creados,
-        }
 
+def ejecutar_regeneracion(
+    request: GenerarHorarioRequest, db: Session, avisar: Optional[Callable] = None
+) -> dict:
+    """
+    Regenera solo los grupos de un plan afectados por un cambio:
+    - los de grupos_cambiados
+    - aquellos donde da clase algún maestro de maestros_cambiados, también
+      los de otros planes (cada uno con las materias de su plan; sus
+      maestros actuales se suman a los seleccionados)
+    - los del cuatrimestre de cada materia de materias_cambiadas
+
+    Los demás grupos (de este y de otros planes) no se tocan: sus
+    asignaciones se cargan como ocupación del motor, así que los maestros no
+    se empalman con ellas ni pasan su máximo semanal. Los grupos regenerados
+    conservan su id y su nombre; los de un cuatrimestre sin materias (o de
+    otro plan que no se puede saber) se conservan y se regresan en
+    grupos_sin_materias.
+    """
+
+    def avisar_progreso(fase, cuatrimestre=None, estado=None):
+        if avisar:
+            avisar(fase, cuatrimestre, estado)
+
+    avisar_progreso("preparando")
+    fases = Fases("incremental")
+
+    with fases.medir("carga_datos"):
+        plan = db.query(PlanEstudios).filter(PlanEstudios.id == request.plan_id).first()
+        if not plan:
+            raise HTTPException(status_code=404, detail="Plan de estudios no encontrado")
+
+        maestros = db.query(Maestro).filter(Maestro.id.in_(request.maestro_ids)).all()
+        if not maestros:
+            raise HTTPException(
+                status_code=400, detail="No se encontraron los docentes seleccionados"
+            )
+
+        grupos = grupos_del_plan(db, plan)
+    if not grupos:
+        raise HTTPException(
+            status_code=400,
+            detail="El plan no tiene grupos generados; genera primero el horario completo",
+        )
+    ids_plan = [g.id for g in grupos]
+    plan_de_grupo = {g.id: plan.id for g in grupos}
+
+    with fases.medir("seleccion"):
+        # Grupos afectados por los cambios
+        afectados = set(request.grupos_cambiados) & set(ids_plan)
+        if request.materias_cambiadas:
+            cuatrimestres = set(
+                db.scalars(
+                    select(Materia.cuatrimestre).where(
+                        Materia.id.in_(request.materias_cambiadas),
+                        Materia.plan_estudios_id == plan.id,
+                    )
+                )
+            )
+            afectados.update(g.id for g in grupos if g.semestre in cuatrimestres)
+        grupos_otros = []
+        if request.maestros_cambiados:
+            de_maestros = set(
+                db.scalars(
+                    select(Asignacion.grupo_id)
+                    .distinct()
+                    .where(Asignacion.maestro_id.in_(request.maestros_cambiados))
+                )
+            )
+            afectados.update(de_maestros & set(ids_plan))
+
+            # Sus grupos de otros planes también se regeneran: si se quedaran
+            # como ocupación fija conservarían horas que el cambio ya no permite
+            otros = de_maestros - set(ids_plan)
+            if otros:
+                grupos_otros = db.query(Grupo).filter(Grupo.id.in_(otros)).order_by(Grupo.id).all()
+                plan_de_grupo.update(
+                    (g.id, g.plan_estudios_id) for g in grupos_otros if g.plan_estudios_id
+                )
+                # Grupos de antes de plan_estudios_id: el plan de sus materias
+                plan_de_grupo.update(
+                    db.execute(
+                        select(Asignacion.grupo_id, func.min(Materia.plan_estudios_id))
+                        .join(Materia, Materia.id == Asignacion.materia_id)
+                        .where(
+                            Asignacion.grupo_id.in_(
+                                [g.id for g in grupos_otros if not g.plan_estudios_id]
+                            )
+                        )
+                        .group_by(Asignacion.grupo_id)
+                    ).all()
+                )
+        grupos_afectados = [
+            g
+            for g in [g for g in grupos if g.id in afectados] + grupos_otros
+            if g.semestre not in CUATRIMESTRES_ESTADIA
+        ]
+
+        # Materias de los cuatrimestres afectados de cada plan (en una sola consulta)
+        claves = {(plan_de_grupo.get(g.id), g.semestre) for g in grupos_afectados}
+        materias_por_cuatrimestre = {}
+        for m in (
+            db.query(Materia)
+            .filter(
+                Materia.plan_estudios_id.in_({plan_id for plan_id, _ in claves}),
+                Materia.cuatrimestre.in_({cuatrimestre for _, cuatrimestre in claves}),
+            )
+            .order_by(Materia.id)
+        ):
+            if (m.plan_estudios_id, m.cuatrimestre) in claves:
+                materias_por_cuatrimestre.setdefault((m.plan_estudios_id, m.cuatrimestre), []).append(
+                    {"id": m.id, "nombre": m.nombre, "horas_semanales": m.horas_semanales}
+                )
+
+        # Un grupo cuyo cuatrimestre ya no tiene materias no se puede
+        # regenerar: se conserva tal cual y se reporta aparte
+        def clave_grupo(g):
+            return (plan_de_grupo.get(g.id), g.semestre)
+
+        grupos_sin_materias = [
+            g for g in grupos_afectados if clave_grupo(g) not in materias_por_cuatrimestre
+        ]
+        grupos_afectados = [
+            g for g in grupos_afectados if clave_grupo(g) in materias_por_cuatrimestre
+        ]
+    ids_afectados = [g.id for g in grupos_afectados]
+    regenerados_otros = [g for g in grupos_afectados if g in grupos_otros]
+
+    # Los grupos de otros planes conservan a los maestros que ya les daban clase
+    if regenerados_otros:
+        maestros_otros = db.scalars(
+            select(Asignacion.maestro_id)
+            .distinct()
+            .where(Asignacion.grupo_id.in_([g.id for g in regenerados_otros]))
+        ).all()
+        nuevos = set(maestros_otros) - {m.id for m in maestros}
+        if nuevos:
+            maestros += db.query(Maestro).filter(Maestro.id.in_(nuevos)).all()
+    maestro_ids = [m.id for m in maestros]
+
+    # Quitar lo anterior de los grupos afectados (misma transacción que lo nuevo)
+    with fases.medir("borrado"):
+        # Vistas que cambian: los grupos afectados, sus horarios y sus maestros
+        vistas = vistas_afectadas(db, Asignacion.grupo_id.in_(ids_afectados))
+        horarios_viejos = list(vistas["horario_ids"])
+        db.query(Asignacion).filter(Asignacion.grupo_id.in_(ids_afectados)).delete(
+            synchronize_session=False
+        )
+        db.query(HorarioGenerado).filter(HorarioGenerado.id.in_(horarios_viejos)).delete(
+            synchronize_session=False
+        )
+
+    with fases.medir("carga_ocupacion"):
+        # Lo que se conserva de los maestros (de cualquier plan) es la
+        # ocupación inicial del motor
+        ocupadas = [
+            dict(f._mapping)
+            for f in db.execute(
+                select(
+                    Asignacion.maestro_id,
+                    Asignacion.grupo_id,
+                    Asignacion.dia_semana,
+                    Asignacion.hora_inicio,
+                    Asignacion.hora_fin,
+                ).where(Asignacion.maestro_id.in_(maestro_ids))
+            )
+        ]
+
+        cuatrimestres_data = [
+            {
+                "cuatrimestre": cuatrimestre,
+                "materias": materias_por_cuatrimestre[(plan_id, cuatrimestre)],
+                "grupos": [
+                    {"id": g.id, "nombre": g.nombre}
+                    for g in grupos_afectados
+                    if clave_grupo(g) == (plan_id, cuatrimestre)
+                ],
+            }
+            for plan_id, cuatrimestre in sorted(materias_por_cuatrimestre)
+        ]
+
+    generacion = {"asignaciones": [], "resumen": None, "semilla": None, "intentos": []}
+    if cuatrimestres_data:
+        avisar_progreso("generando")
+        hora_min, hora_max = rango_turno(request.turno)
+        with fases.medir("maestros_data"):
+            maestros_data = datos_maestros(maestros)
+        with fases.medir("motor"):
+            generacion = generar_mejor_horario(
+                maestros_data,
+                cuatrimestres_data,
+                hora_min,
+                hora_max,
+                reinicios=request.reinicios,
+                procesos=min(request.procesos, request.reinicios, os.cpu_count() or 1),
+                opciones=opciones_motor(request),
+                semilla=request.semilla,
+                ocupadas=ocupadas,
+            )
+
+    avisar_progreso("guardando")
+    with fases.medir("guardado"):
+        horarios_por_grupo, asignaciones_por_grupo = guardar_asignaciones(
+            db, generacion["asignaciones"], request.turno
+        )
+    with fases.medir("snapshots"):
+        # Solo las vistas de lo que cambió (más los horarios y maestros nuevos)
+        refrescar_snapshots(
+            db,
+            horario_ids=vistas["horario_ids"] | set(horarios_por_grupo.values()),
+            grupo_ids=ids_afectados,
+            maestro_ids=vistas["maestro_ids"]
+            | {a["maestro_id"] for a in generacion["asignaciones"]},
+        )
+    with fases.medir("commit"):
+        db.commit()
+    avisar_progreso("terminado")
+
+    horas = horas_por_grupo(cuatrimestres_data, generacion["asignaciones"])
+    fases.terminar(
+        generacion["resumen"],
+        sum(h["horas_requeridas"] for h in horas.values()),
+        sum(h["horas_colocadas"] for h in horas.values()),
+    )
+    horarios = []
+    for grupo in grupos_afectados:
+        horarios.append(
+            {
+                "horario_id": horarios_por_grupo.get(grupo.id),
+                "grupo": grupo.nombre,
+                "cuatrimestre": grupo.semestre,
+                "asignaciones": len(asignaciones_por_grupo.get(grupo.id, [])),
+                **horas.get(grupo.id, {"horas_requeridas": 0, "horas_colocadas": 0}),
+            }
+        )
+
+    del_plan = len(grupos_afectados) - len(regenerados_otros)
+    mensaje = f"Se regeneraron {del_plan} grupos de {plan.nombre}"
+    if regenerados_otros:
+        mensaje += f" y {len(regenerados_otros)} de otros planes"
+    return {
+        "message": mensaje,
+        "plan": plan.nombre,
+        "incremental": True,
+        "grupos_regenerados": len(grupos_afectados),
+        "grupos_conservados": len(grupos) - del_plan,
+        # Grupos de otros planes donde daba clase un maestro de maestros_cambiados
+        "grupos_otros_planes": [
+            {
+                "id": g.id,
+                "grupo": g.nombre,
+                "cuatrimestre": g.semestre,
+                "plan_estudios_id": plan_de_grupo[g.id],
+            }
+            for g in regenerados_otros
+        ],
+        "grupos_sin_materias": [
+            {"id": g.id, "grupo": g.nombre, "cuatrimestre": g.semestre}
+            for g in grupos_sin_materias
+        ],
+        "turno": request.turno,
+        "total_asignaciones": len(generacion["asignaciones"]),
+        "horarios": horarios,
+        "resumen": generacion["resumen"],
+        "semilla": generacion["semilla"],
+        "intentos": generacion["intentos"],
+        "metricas": fases.resumen(),
+    }
+
+
+@app.post("/api/generar-horario")
+def generar_horario(
+    request: GenerarHorarioRequest,
+    perfilar_generacion: bool = Query(False, alias="profile"),
+    db: Session = Depends(get_db),
+):
+    """
+    Genera horarios para TODOS los cuatrimestres de un plan de estudios y
+    responde cuando terminan (ver ejecutar_generacion). Para planes grandes o
+    el modo exacto conviene /api/generar-horario/jobs. Corre en el mismo
+    trabajador que los jobs, después de los que estén en la cola.
+
+    Con ?profile=true la generación corre con cProfile (y los intentos en
+    este proceso, sin el pool); la respuesta incluye "perfil" con las
+    funciones más costosas y las urls del .prof y de las pilas colapsadas.
+    """
+    try:
+        # Importar el modulo Cython compilado
+        import scheduler
+
+        if not perfilar_generacion:
+            return ejecutar_en_orden(ejecutar_generacion, request, db)
+
+        request = request.model_copy(update={"procesos": 1})
+        resultado, perfil = ejecutar_en_orden(perfilar, ejecutar_generacion, request, db)
+        return {**resultado, "perfil": perfil}
+
+    except HTTPException:
+        raise
     except ImportError:
         raise HTTPException(
             status_code=500,
-            detail="El módulo Cython no está compilado. Ejecuta: cd backend/scheduler && python setup.py build_ext --inplace",
+            detail=MENSAJE_CYTHON_NO_COMPILADO,
         )
     except Exception as e:
         db.rollback()
@@ -1039,15 +1750,80 @@ def generar_horario(
         )
 
 
-@app.get("/api/horarios")
-def get_horarios(db: Session = Depends(get_db)):
-    """Obtiene todos los horarios generados"""
-    horarios = (
-        db.query(HorarioGenerado)
-        .order_by(HorarioGenerado.fecha_generacion.desc())
-        .all()
+def generar_horario_job(avisar: Callable, request: GenerarHorarioRequest) -> dict:
+    """Corre la generación de un job con su propia sesión de base de datos"""
+    db = SessionLocal()
+    try:
+        import scheduler
+
+        return ejecutar_generacion(request, db, avisar)
+    except ImportError:
+        raise HTTPException(status_code=500, detail=MENSAJE_CYTHON_NO_COMPILADO)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@app.post("/api/generar-horario/jobs", status_code=202)
+def crear_job_generacion(request: GenerarHorarioRequest):
+    """
+    Inicia la generación en segundo plano y responde de inmediato con el id
+    del job. El avance y el resultado se consultan en
+    GET /api/generar-horario/jobs/{job_id}.
+    """
+    validar_generacion(request)
+    job = crear_job("generar_horario", generar_horario_job, request)
+    return {
+        "job_id": job["id"],
+        "estado": job["estado"],
+        "url": f"/api/generar-horario/jobs/{job['id']}",
+    }
+
+
+@app.get("/api/perfiles/{perfil_id}.{formato}")
+def descargar_perfil(perfil_id: str, formato: str):
+    """Descarga un perfil de /api/generar-horario?profile=true (prof o collapsed)"""
+    ruta = archivo_perfil(perfil_id, formato)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(
+        ruta, media_type=FORMATOS_PERFIL[formato], filename=f"{perfil_id}.{formato}"
     )
 
+
+@app.get("/api/generar-horario/jobs")
+def get_jobs_generacion():
+    """Lista los jobs de generación registrados"""
+    jobs = listar_jobs()
+    return {"total": len(jobs), "jobs": jobs}
+
+
+@app.get("/api/generar-horario/jobs/{job_id}")
+def get_job_generacion(job_id: str):
+    """
+    Estado de un job: pendiente, en_proceso, completado o error, con la fase
+    actual (preparando, creando_grupos, generando, guardando, terminado) y el
+    estado de cada cuatrimestre (grupos_creados -> generado -> guardado). Al
+    completarse incluye el mismo resumen que /api/generar-horario.
+
+    El avance es por fase, no por cuatrimestre: el motor genera todo el plan
+    en una sola llamada y todo se guarda en una sola transacción, así que
+    todos los cuatrimestres pasan juntos a generado y después a guardado. La
+    regeneración incremental solo reporta la fase.
+    """
+    job = obtener_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+
+@app.get("/api/horarios")
+async def get_horarios(db: AsyncSession = Depends(get_async_db)):
+    """Obtiene todos los horarios generados (conteo de asignaciones con GROUP BY)"""
+    horarios = await db.run_sync(horarios_con_conteo)
+
     return {
         "total": len(horarios),
         "horarios": [
@@ -1055,8 +1831,8 @@ def get_horarios(db: Session = Depends(get_db)):
                 "id": h.id,
                 "fecha_generacion": h.fecha_generacion,
                 "estado": h.estado,
-                "turno": h.turno if hasattr(h, "turno") else "matutino",
-                "total_asignaciones": len(h.asignaciones),
+                "turno": h.turno or "matutino",
+                "total_asignaciones": h.total_asignaciones,
             }
             for h in horarios
         ],
@@ -1067,7 +1843,8 @@ def get_horarios(db: Session = Depends(get_db)):
 def eliminar_todos_horarios(db: Session = Depends(get_db)):
     """Elimina todos los horarios generados"""
     try:
-        # Eliminar todas las asignaciones primero
+        # Eliminar los snapshots y las asignaciones primero
+        borrar_snapshots(db)
         db.query(Asignacion).delete()
         # Eliminar todos los horarios
         db.query(HorarioGenerado).delete()
@@ -1081,38 +1858,67 @@ def eliminar_todos_horarios(db: Session = Depends(get_db)):
         )
 
 
+def respuesta_snapshot(contenido: str) -> Response:
+    """Regresa el JSON de un snapshot tal cual está guardado"""
+    return Response(content=contenido, media_type="application/json")
+
+
 @app.get("/api/horarios/{horario_id}")
-def get_horario(horario_id: int, db: Session = Depends(get_db)):
-    """Obtiene un horario específico con todas sus asignaciones"""
-    horario = db.query(HorarioGenerado).filter(HorarioGenerado.id == horario_id).first()
+async def get_horario(horario_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Obtiene un horario específico con todas sus asignaciones (desde su snapshot)"""
+    contenido = await db.run_sync(leer_snapshot, SNAPSHOT_HORARIO, horario_id)
+    if contenido is not None:
+        return respuesta_snapshot(contenido)
+
+    # Sin snapshot (horario anterior a los snapshots): una consulta con JOIN
+    horario = await db.get(HorarioGenerado, horario_id)
 
     if not horario:
         raise HTTPException(status_code=404, detail="Horario no encontrado")
 
-    asignaciones = (
-        db.query(Asignacion).filter(Asignacion.horario_id == horario_id).all()
-    )
+    asignaciones = await db.run_sync(asignaciones_de_horario, horario_id)
+    return vista_horario(horario, asignaciones)
 
-    dias = ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes", "Sabado"]
 
-    return {
-        "id": horario.id,
-        "fecha_generacion": horario.fecha_generacion,
-        "estado": horario.estado,
-        "turno": horario.turno if hasattr(horario, "turno") else "matutino",
-        "asignaciones": [
-            {
-                "id": a.id,
-                "maestro": db.query(Maestro).get(a.maestro_id).nombre,
-                "materia": db.query(Materia).get(a.materia_id).nombre,
-                "grupo": db.query(Grupo).get(a.grupo_id).nombre,
-                "dia": dias[a.dia_semana],
-                "hora_inicio": f"{a.hora_inicio}:00",
-                "hora_fin": f"{a.hora_fin}:00",
-            }
-            for a in asignaciones
-        ],
-    }
+@app.get("/api/grupos/{grupo_id}/horario")
+async def get_horario_grupo(grupo_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Horario de un grupo con su cuadrícula por día y hora (desde su snapshot)"""
+    contenido = await db.run_sync(leer_snapshot, SNAPSHOT_GRUPO, grupo_id)
+    if contenido is not None:
+        return respuesta_snapshot(contenido)
+
+    filas = await db.run_sync(asignaciones_de_grupo, grupo_id)
+
+    if filas:
+        grupo = {"id": grupo_id, "nombre": filas[0].grupo}
+    else:
+        # Sin asignaciones: distinguir grupo sin horario de grupo inexistente
+        g = await db.get(Grupo, grupo_id)
+        if not g:
+            raise HTTPException(status_code=404, detail="Grupo no encontrado")
+        grupo = {"id": g.id, "nombre": g.nombre}
+
+    return vista_grupo(grupo, filas)
+
+
+@app.get("/api/maestros/{maestro_id}/horario")
+async def get_horario_maestro(maestro_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Horario de un maestro (todos sus grupos) con su cuadrícula (desde su snapshot)"""
+    contenido = await db.run_sync(leer_snapshot, SNAPSHOT_MAESTRO, maestro_id)
+    if contenido is not None:
+        return respuesta_snapshot(contenido)
+
+    filas = await db.run_sync(asignaciones_de_maestro, maestro_id)
+
+    if filas:
+        maestro = {"id": maestro_id, "nombre": filas[0].maestro}
+    else:
+        m = await db.get(Maestro, maestro_id)
+        if not m:
+            raise HTTPException(status_code=404, detail="Maestro no encontrado")
+        maestro = {"id": m.id, "nombre": m.nombre}
+
+    return vista_maestro(maestro, filas)
 
 
 if __name__ == "__main__":
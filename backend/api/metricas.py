@@ -0,0 +1,336 @@
+"""
+Métricas de la API en el formato de texto de Prometheus (GET /metrics).
+
+Contadores e histogramas en memoria del proceso, con etiquetas. La
+generación de horarios mide cada fase con Fases (que también regresa los
+tiempos en la respuesta) y suma los contadores del motor.
+
+MedicionPeticiones mide cada petición HTTP: tiempo total, consultas SQL
+y tiempo en la base (con eventos del engine de SQLAlchemy, sin DB_ECHO),
+los manda en Server-Timing y los guarda en histogramas por ruta
+(ver metricas_por_ruta y GET /api/admin/rutas).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Límites (segundos) de los histogramas de tiempo
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Límites de los histogramas de consultas SQL por petición
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_lock = threading.Lock()
+_registro = {}  # nombre -> métrica, en orden de creación
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas: tuple) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas) + "}"
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.valores = {}  # etiquetas (tupla ordenada) -> valor
+
+    def inc(self, valor: float = 1, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with _lock:
+            self.valores[clave] = self.valores.get(clave, 0) + valor
+
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for clave, valor in self.valores.items():
+            lineas.append(f"{self.nombre}{_etiquetas(clave)} {valor}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, buckets: tuple = BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        # etiquetas -> {"buckets": [conteo acumulado por límite], "suma", "total", "maximo"}
+        self.valores = {}
+
+    def observar(self, valor: float, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with _lock:
+            datos = self.valores.get(clave)
+            if datos is None:
+                datos = {"buckets": [0] * len(self.buckets), "suma": 0, "total": 0, "maximo": valor}
+                self.valores[clave] = datos
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos["buckets"][i] += 1
+            datos["suma"] += valor
+            datos["total"] += 1
+            datos["maximo"] = max(datos["maximo"], valor)
+
+    def percentil(self, datos: dict, p: float) -> float:
+        """Estimación: límite del primer bucket que alcanza el percentil (o el máximo)"""
+        objetivo = datos["total"] * p / 100
+        for limite, conteo in zip(self.buckets, datos["buckets"]):
+            if conteo >= objetivo:
+                return min(limite, datos["maximo"])
+        return datos["maximo"]
+
+    def estadisticas(self) -> dict:
+        """{etiquetas: {"total", "promedio", "p50", "p95", "maximo"}}"""
+        with _lock:
+            return {
+                clave: {
+                    "total": datos["total"],
+                    "promedio": datos["suma"] / datos["total"],
+                    "p50": self.percentil(datos, 50),
+                    "p95": self.percentil(datos, 95),
+                    "maximo": datos["maximo"],
+                }
+                for clave, datos in self.valores.items()
+            }
+
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for clave, datos in self.valores.items():
+            for limite, conteo in zip(self.buckets, datos["buckets"]):
+                lineas.append(
+                    f"{self.nombre}_bucket{_etiquetas(clave + (('le', limite),))} {conteo}"
+                )
+            lineas.append(
+                f"{self.nombre}_bucket{_etiquetas(clave + (('le', '+Inf'),))} {datos['total']}"
+            )
+            lineas.append(f"{self.nombre}_sum{_etiquetas(clave)} {datos['suma']}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(clave)} {datos['total']}")
+        return lineas
+
+
+def contador(nombre: str, ayuda: str) -> Contador:
+    """Registra (o regresa, si ya existe) un contador"""
+    with _lock:
+        return _registro.setdefault(nombre, Contador(nombre, ayuda))
+
+
+def histograma(nombre: str, ayuda: str, buckets: tuple = BUCKETS_SEGUNDOS) -> Histograma:
+    """Registra (o regresa, si ya existe) un histograma"""
+    with _lock:
+        return _registro.setdefault(nombre, Histograma(nombre, ayuda, buckets))
+
+
+def exportar() -> str:
+    """Todas las métricas en el formato de texto de Prometheus"""
+    with _lock:
+        lineas = [linea for metrica in _registro.values() for linea in metrica.exportar()]
+    return "\n".join(lineas) + "\n"
+
+
+# ========== GENERACIÓN DE HORARIOS ==========
+
+GENERACIONES = contador(
+    "horarios_generaciones_total", "Generaciones de horarios terminadas por tipo"
+)
+GENERACION_SEGUNDOS = histograma(
+    "horarios_generacion_segundos", "Duración total de una generación de horarios"
+)
+FASE_SEGUNDOS = histograma(
+    "horarios_generacion_fase_segundos", "Duración de cada fase de una generación de horarios"
+)
+HORAS_REQUERIDAS = contador(
+    "horarios_horas_requeridas_total", "Horas semanales que pedían los grupos generados"
+)
+HORAS_COLOCADAS = contador(
+    "horarios_horas_colocadas_total", "Horas semanales colocadas en los grupos generados"
+)
+EVENTOS_MOTOR = contador(
+    "horarios_motor_eventos_total",
+    "Contadores internos del motor (candidatos, sesiones y rechazos por motivo)",
+)
+
+
+class Fases:
+    """
+    Spans de tiempo de una generación:
+
+        fases = Fases("completa")
+        with fases.medir("borrado"):
+            ...
+        fases.terminar(resumen_del_motor)  # contadores del motor y total
+        respuesta["metricas"] = fases.resumen()
+    """
+
+    def __init__(self, tipo: str):
+        self.tipo = tipo
+        self.spans = []
+        self.inicio = time.perf_counter()
+
+    @contextmanager
+    def medir(self, fase: str, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            self.spans.append({"fase": fase, **etiquetas, "ms": round(segundos * 1000, 3)})
+            # Las etiquetas por span (cuatrimestre, grupo...) solo van en la
+            # respuesta: en Prometheus multiplicarían las series
+            FASE_SEGUNDOS.observar(segundos, tipo=self.tipo, fase=fase)
+
+    def terminar(
+        self, resumen: Optional[dict] = None, horas_requeridas: int = 0, horas_colocadas: int = 0
+    ):
+        """Registra el total, las horas y los contadores del motor"""
+        self.total_ms = round((time.perf_counter() - self.inicio) * 1000, 3)
+        self.contadores = (resumen or {}).get("contadores") or {}
+        self.horas_requeridas = horas_requeridas
+        self.horas_colocadas = horas_colocadas
+
+        GENERACIONES.inc(tipo=self.tipo)
+        GENERACION_SEGUNDOS.observar(self.total_ms / 1000, tipo=self.tipo)
+        HORAS_REQUERIDAS.inc(horas_requeridas, tipo=self.tipo)
+        HORAS_COLOCADAS.inc(horas_colocadas, tipo=self.tipo)
+        for evento, valor in self.contadores.items():
+            EVENTOS_MOTOR.inc(valor, evento=evento)
+
+    def resumen(self) -> dict:
+        """Datos para la respuesta: total, spans, horas y contadores del motor"""
+        return {
+            "total_ms": self.total_ms,
+            "fases": self.spans,
+            "horas_requeridas": self.horas_requeridas,
+            "horas_colocadas": self.horas_colocadas,
+            "motor": self.contadores,
+        }
+
+
+# ========== PETICIONES HTTP ==========
+
+PETICIONES = contador("http_peticiones_total", "Peticiones HTTP por ruta y código de estado")
+PETICION_SEGUNDOS = histograma("http_peticion_segundos", "Duración de cada petición HTTP")
+PETICION_CONSULTAS = histograma(
+    "http_peticion_consultas_sql", "Consultas SQL emitidas por petición", BUCKETS_CONSULTAS
+)
+PETICION_DB_SEGUNDOS = histograma(
+    "http_peticion_db_segundos", "Tiempo en la base de datos por petición"
+)
+
+# Medición de la petición en curso: {"consultas": int, "db_segundos": float}.
+# Es un dict mutable para que lo actualicen también los endpoints síncronos
+# (corren en el threadpool con una copia del contexto).
+_medicion = ContextVar("medicion_peticion", default=None)
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    context._inicio_medicion = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion.get()
+    inicio = getattr(context, "_inicio_medicion", None)
+    if medicion is not None and inicio is not None:
+        medicion["consultas"] += 1
+        medicion["db_segundos"] += time.perf_counter() - inicio
+
+
+def medir_sql():
+    """
+    Cuenta las consultas de todos los engines (también el síncrono del
+    motor asíncrono) para la petición en curso
+    """
+    if not event.contains(Engine, "before_cursor_execute", _antes_de_consulta):
+        event.listen(Engine, "before_cursor_execute", _antes_de_consulta)
+        event.listen(Engine, "after_cursor_execute", _despues_de_consulta)
+
+
+def server_timing(total_segundos: float, medicion: dict) -> str:
+    return (
+        f"app;dur={total_segundos * 1000:.2f}, "
+        f"db;dur={medicion['db_segundos'] * 1000:.2f};desc=\"{medicion['consultas']} consultas\""
+    )
+
+
+class MedicionPeticiones:
+    """
+    Middleware ASGI: mide cada petición, agrega Server-Timing (tiempo hasta
+    los encabezados y tiempo/consultas en la base) y registra los
+    histogramas por ruta (la plantilla, p. ej. /api/horarios/{horario_id}).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = {"consultas": 0, "db_segundos": 0.0}
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                encabezado = server_timing(time.perf_counter() - inicio, medicion)
+                mensaje = {
+                    **mensaje,
+                    "headers": [*mensaje.get("headers", []), (b"server-timing", encabezado.encode())],
+                }
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token)
+            segundos = time.perf_counter() - inicio
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            etiquetas = {"metodo": scope["method"], "ruta": ruta}
+            PETICIONES.inc(estado=estado, **etiquetas)
+            PETICION_SEGUNDOS.observar(segundos, **etiquetas)
+            PETICION_CONSULTAS.observar(medicion["consultas"], **etiquetas)
+            PETICION_DB_SEGUNDOS.observar(medicion["db_segundos"], **etiquetas)
+
+
+def metricas_por_ruta() -> list:
+    """
+    Resumen de los histogramas por ruta, las de más consultas primero (un
+    N+1 aparece como un promedio o un máximo de consultas alto)
+    """
+    tiempos = PETICION_SEGUNDOS.estadisticas()
+    consultas = PETICION_CONSULTAS.estadisticas()
+    db = PETICION_DB_SEGUNDOS.estadisticas()
+
+    rutas = []
+    for clave, t in tiempos.items():
+        etiquetas = dict(clave)
+        c = consultas.get(clave)
+        d = db.get(clave)
+        rutas.append(
+            {
+                "metodo": etiquetas["metodo"],
+                "ruta": etiquetas["ruta"],
+                "peticiones": t["total"],
+                "ms_promedio": round(t["promedio"] * 1000, 3),
+                "ms_p50": round(t["p50"] * 1000, 3),
+                "ms_p95": round(t["p95"] * 1000, 3),
+                "ms_max": round(t["maximo"] * 1000, 3),
+                "consultas_promedio": round(c["promedio"], 2) if c else 0,
+                "consultas_p95": c["p95"] if c else 0,
+                "consultas_max": c["maximo"] if c else 0,
+                "db_ms_promedio": round(d["promedio"] * 1000, 3) if d else 0,
+            }
+        )
+    rutas.sort(key=lambda r: (-r["consultas_promedio"], -r["ms_promedio"]))
+    return rutas
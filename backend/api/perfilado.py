@@ -0,0 +1,276 @@
+"""
+Perfilado de una generación de horarios (POST /api/generar-horario?profile=true
+o desde la terminal).
+
+Usa cProfile (determinista) para el código Python. Las funciones del motor
+Cython solo aparecen si el módulo se compiló en modo de perfilado:
+
+    cd backend/scheduler && SCHEDULER_PROFILE=1 python setup.py build_ext --inplace --force
+
+Cada perfil se guarda en DIRECTORIO_PERFILES como <id>.prof (pstats, para
+snakeviz o `python -m pstats`) y <id>.collapsed (pilas colapsadas para
+flamegraph.pl o speedscope), y se descarga con GET /api/perfiles/{id}.{formato}.
+Solo se conservan los últimos MAX_PERFILES_GUARDADOS perfiles.
+
+Desde la terminal (genera y guarda en la base de DATABASE_URL, igual que
+el endpoint), o solo el motor con una institución sintética:
+
+    cd backend
+    python -m api.perfilado --plan-id 5 --maestros 96-135 --semilla 1
+    python -m api.perfilado --escala mediana
+"""
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+DIRECTORIO_PERFILES = os.getenv(
+    "PERFILES_DIR", os.path.join(tempfile.gettempdir(), "horarios_perfiles")
+)
+
+# Formatos que se pueden descargar
+FORMATOS_PERFIL = {
+    "prof": "application/octet-stream",
+    "collapsed": "text/plain; charset=utf-8",
+}
+
+# Perfiles que se conservan en DIRECTORIO_PERFILES (los más viejos se borran)
+MAX_PERFILES_GUARDADOS = 50
+
+# Funciones que se regresan en el resumen del perfil
+MAX_FUNCIONES_RESUMEN = 20
+
+# Profundidad máxima de las pilas colapsadas y fracción mínima del tiempo
+# total para seguir una rama (el grafo de llamadas de SQLAlchemy tiene
+# demasiados caminos para recorrerlos todos)
+MAX_PROFUNDIDAD = 64
+FRACCION_MINIMA_RAMA = 1e-4
+
+
+def nombre_funcion(funcion: tuple) -> str:
+    archivo, linea, nombre = funcion
+    if archivo == "~":
+        # Funciones de C, p. ej. <built-in method time.perf_counter>
+        return nombre
+    return f"{nombre} ({os.path.basename(archivo)}:{linea})"
+
+
+def pilas_colapsadas(stats: pstats.Stats) -> list:
+    """
+    Pilas "raiz;...;funcion microsegundos" a partir del grafo de llamadas
+    de cProfile. cProfile no guarda las pilas completas, así que el tiempo
+    de cada función se reparte entre sus llamadores en proporción al tiempo
+    de cada llamada (aproximado si una función se llama desde varios lados).
+    Las ramas con menos de FRACCION_MINIMA_RAMA del tiempo total se omiten.
+    """
+    llamadas = {}
+    for funcion, (_, _, _, _, llamadores) in stats.stats.items():
+        for llamador, arista in llamadores.items():
+            llamadas.setdefault(llamador, []).append((funcion, arista[3]))
+
+    totales = {}
+    minimo = stats.total_tt * FRACCION_MINIMA_RAMA
+
+    def recorrer(funcion, pila, factor):
+        propio = stats.stats[funcion][2]
+        if propio * factor > 0:
+            clave = ";".join(nombre_funcion(f) for f in pila)
+            totales[clave] = totales.get(clave, 0) + propio * factor
+        if len(pila) >= MAX_PROFUNDIDAD:
+            return
+        for hijo, acumulado_arista in llamadas.get(funcion, []):
+            acumulado_hijo = stats.stats[hijo][3]
+            if hijo in pila or acumulado_hijo <= 0 or factor * acumulado_arista < minimo:
+                continue
+            recorrer(hijo, pila + [hijo], factor * acumulado_arista / acumulado_hijo)
+
+    for funcion, datos in stats.stats.items():
+        if not datos[4]:
+            recorrer(funcion, [funcion], 1.0)
+
+    return [
+        f"{pila} {round(segundos * 1e6)}"
+        for pila, segundos in sorted(totales.items())
+        if round(segundos * 1e6) > 0
+    ]
+
+
+def resumen_funciones(stats: pstats.Stats, limite: int = MAX_FUNCIONES_RESUMEN) -> list:
+    """Las funciones con más tiempo acumulado"""
+    filas = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "funcion": nombre_funcion(funcion),
+            "llamadas": llamadas,
+            "propio_ms": round(propio * 1000, 3),
+            "acumulado_ms": round(acumulado * 1000, 3),
+        }
+        for funcion, (_, llamadas, propio, acumulado, _) in filas[:limite]
+    ]
+
+
+def motor_instrumentado(stats: pstats.Stats) -> bool:
+    """Si el perfil incluye funciones del motor (compilado con SCHEDULER_PROFILE=1)"""
+    return any(archivo.endswith(".pyx") for archivo, _, _ in stats.stats)
+
+
+def ruta_perfil(perfil_id: str, formato: str) -> str:
+    return os.path.join(DIRECTORIO_PERFILES, f"{perfil_id}.{formato}")
+
+
+def _descartar_viejos():
+    """Borra los perfiles más viejos si hay más de MAX_PERFILES_GUARDADOS"""
+    fechas = {}
+    for nombre in os.listdir(DIRECTORIO_PERFILES):
+        perfil_id, _, formato = nombre.partition(".")
+        if formato not in FORMATOS_PERFIL or not perfil_id.isalnum():
+            continue
+        try:
+            fecha = os.path.getmtime(os.path.join(DIRECTORIO_PERFILES, nombre))
+        except OSError:
+            continue
+        fechas[perfil_id] = max(fecha, fechas.get(perfil_id, fecha))
+
+    viejos = sorted(fechas, key=fechas.get)[: max(len(fechas) - MAX_PERFILES_GUARDADOS, 0)]
+    for perfil_id in viejos:
+        for formato in FORMATOS_PERFIL:
+            try:
+                os.remove(ruta_perfil(perfil_id, formato))
+            except OSError:
+                pass
+
+
+def perfilar(funcion: Callable, *args, **kwargs) -> tuple:
+    """
+    Corre funcion(*args, **kwargs) con cProfile y guarda el perfil. Regresa
+    (resultado, perfil); perfil trae el id, las urls de descarga y las
+    funciones más costosas. Solo se perfila el hilo actual.
+    """
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        resultado = funcion(*args, **kwargs)
+    finally:
+        perfilador.disable()
+
+    perfil_id = uuid.uuid4().hex
+    os.makedirs(DIRECTORIO_PERFILES, exist_ok=True)
+    stats = pstats.Stats(perfilador, stream=io.StringIO())
+    stats.dump_stats(ruta_perfil(perfil_id, "prof"))
+    with open(ruta_perfil(perfil_id, "collapsed"), "w", encoding="utf-8") as f:
+        f.write("\n".join(pilas_colapsadas(stats)) + "\n")
+    _descartar_viejos()
+
+    perfil = {
+        "id": perfil_id,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "total_ms": round(stats.total_tt * 1000, 3),
+        "motor_instrumentado": motor_instrumentado(stats),
+        "urls": {
+            formato: f"/api/perfiles/{perfil_id}.{formato}" for formato in FORMATOS_PERFIL
+        },
+        "funciones": resumen_funciones(stats),
+    }
+    return resultado, perfil
+
+
+def archivo_perfil(perfil_id: str, formato: str) -> Optional[str]:
+    """Ruta del archivo de un perfil guardado, o None si no existe"""
+    # El id es un uuid en hexadecimal: no se aceptan rutas
+    if formato not in FORMATOS_PERFIL or not perfil_id.isalnum():
+        return None
+    ruta = ruta_perfil(perfil_id, formato)
+    return ruta if os.path.isfile(ruta) else None
+
+
+def perfilar_sintetico(args) -> tuple:
+    """Solo el motor con una institución de benchmarks.datos_sinteticos"""
+    from benchmarks.datos_sinteticos import ESCALAS, generar_institucion
+    from api.generacion import generar_mejor_horario
+
+    escala = ESCALAS[args.escala]
+    datos = generar_institucion(
+        escala["maestros"], escala["grupos"], escala["materias"], semilla=args.semilla or 1
+    )
+    return perfilar(
+        generar_mejor_horario,
+        datos["maestros"],
+        datos["cuatrimestres"],
+        7,
+        14,
+        reinicios=args.reinicios,
+        opciones={"modo": args.modo, "optimizar_iteraciones": args.optimizar},
+        semilla=args.semilla,
+    )
+
+
+def perfilar_plan(args) -> tuple:
+    """La generación completa de un plan (carga, motor, guardado) en la base"""
+    from api.main import GenerarHorarioRequest, ejecutar_generacion
+    from database.connection import SessionLocal
+
+    maestro_ids = []
+    for parte in args.maestros.split(","):
+        inicio, _, fin = parte.partition("-")
+        maestro_ids.extend(range(int(inicio), int(fin or inicio) + 1))
+
+    request = GenerarHorarioRequest(
+        plan_id=args.plan_id,
+        maestro_ids=maestro_ids,
+        grupos_generar=args.grupos,
+        turno=args.turno,
+        modo=args.modo,
+        optimizar_iteraciones=args.optimizar,
+        reinicios=args.reinicios,
+        semilla=args.semilla,
+    )
+    db = SessionLocal()
+    try:
+        return perfilar(ejecutar_generacion, request, db)
+    finally:
+        db.close()
+
+
+def main():
+    from benchmarks.datos_sinteticos import ESCALAS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--plan-id", type=int, help="Plan de estudios de la base de datos")
+    fuente.add_argument(
+        "--escala", choices=list(ESCALAS), help="Institución sintética (solo el motor)"
+    )
+    parser.add_argument("--maestros", default="", help="Ids de maestros, p. ej. 96-135,140")
+    parser.add_argument("--grupos", type=int, default=2, help="Grupos por cuatrimestre")
+    parser.add_argument("--turno", default="matutino")
+    parser.add_argument("--modo", choices=["voraz", "exacto"], default="voraz")
+    parser.add_argument("--optimizar", type=int, default=0, help="Iteraciones de búsqueda local")
+    parser.add_argument("--reinicios", type=int, default=1)
+    parser.add_argument("--semilla", type=int)
+    args = parser.parse_args()
+
+    if args.plan_id is not None:
+        if not args.maestros:
+            parser.error("--plan-id necesita --maestros")
+        _, perfil = perfilar_plan(args)
+    else:
+        _, perfil = perfilar_sintetico(args)
+
+    print(f"{'acumulado ms':>12} {'propio ms':>10} {'llamadas':>9}  funcion")
+    for f in perfil["funciones"]:
+        print(f"{f['acumulado_ms']:>12.2f} {f['propio_ms']:>10.2f} {f['llamadas']:>9}  {f['funcion']}")
+    if not perfil["motor_instrumentado"]:
+        print("\nEl motor no está compilado con SCHEDULER_PROFILE=1: sus funciones no aparecen")
+    for formato in FORMATOS_PERFIL:
+        print(f"\n{formato}: {ruta_perfil(perfil['id'], formato)}", end="")
+    print()
+
+
+if __name__ == "__main__":
+    main()
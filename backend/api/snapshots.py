@@ -0,0 +1,256 @@
+"""
+Vistas de horarios y sus snapshots materializados.
+
+Un horario no cambia después de generarse, así que al guardarlo se
+precalcula el JSON de cada vista (el horario completo, el de cada grupo y
+el de cada maestro) y se guarda en snapshots_horario. Los endpoints de
+consulta regresan ese JSON tal cual, sin JOIN ni búsqueda de nombres; si
+falta el snapshot (horarios anteriores) arman la vista con
+database.consultas.
+
+Una generación completa reconstruye todos (reconstruir_snapshots); un
+cambio a un maestro o una materia solo vuelve a calcular las vistas donde
+aparece (vistas_afectadas + refrescar_snapshots).
+"""
+
+import json
+from collections import defaultdict
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from database.consultas import asignaciones_de_vistas, todas_las_asignaciones
+from database.models import Asignacion, HorarioGenerado, SnapshotHorario
+
+# Tipos de snapshot (referencia_id es el id del horario, grupo o maestro)
+SNAPSHOT_HORARIO = "horario"
+SNAPSHOT_GRUPO = "grupo"
+SNAPSHOT_MAESTRO = "maestro"
+
+# Nombres de los días (indice = dia_semana)
+DIAS = ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes", "Sabado"]
+
+
+def asignacion_json(f) -> dict:
+    """Una asignación en el formato de /api/horarios/{id}"""
+    return {
+        "id": f.id,
+        "maestro": f.maestro,
+        "materia": f.materia,
+        "grupo": f.grupo,
+        "dia": DIAS[f.dia_semana],
+        "hora_inicio": f"{f.hora_inicio}:00",
+        "hora_fin": f"{f.hora_fin}:00",
+    }
+
+
+def armar_horario(filas, columna: str) -> dict:
+    """
+    Arma la vista de un horario individual a partir de las filas de
+    database.consultas (ya ordenadas por día y hora):
+    - asignaciones: mismo formato que /api/horarios/{id}
+    - cuadricula: una fila por hora con una celda por día (None si está libre);
+      cada celda trae la materia y `columna` ("maestro" o "grupo")
+    """
+    asignaciones = [asignacion_json(f) for f in filas]
+
+    cuadricula = []
+    if filas:
+        hora_min = min(f.hora_inicio for f in filas)
+        hora_max = max(f.hora_fin for f in filas)
+        cuadricula = [
+            {"hora_inicio": f"{h}:00", "hora_fin": f"{h + 1}:00", "dias": [None] * len(DIAS)}
+            for h in range(hora_min, hora_max)
+        ]
+        for f in filas:
+            for h in range(f.hora_inicio, f.hora_fin):
+                cuadricula[h - hora_min]["dias"][f.dia_semana] = {
+                    "asignacion_id": f.id,
+                    "materia": f.materia,
+                    columna: getattr(f, columna),
+                }
+
+    return {
+        "dias": DIAS,
+        "total_horas": sum(f.hora_fin - f.hora_inicio for f in filas),
+        "asignaciones": asignaciones,
+        "cuadricula": cuadricula,
+    }
+
+
+def vista_horario(horario, filas) -> dict:
+    """Respuesta de /api/horarios/{id} (filas en orden de id)"""
+    return {
+        "id": horario.id,
+        "fecha_generacion": horario.fecha_generacion,
+        "estado": horario.estado,
+        "turno": horario.turno or "matutino",
+        "asignaciones": [asignacion_json(f) for f in filas],
+    }
+
+
+def vista_grupo(grupo: dict, filas) -> dict:
+    """Respuesta de /api/grupos/{id}/horario (filas ordenadas por día y hora)"""
+    return {
+        "id": filas[0].horario_id if filas else None,
+        "grupo": grupo,
+        "fecha_generacion": filas[0].fecha_generacion if filas else None,
+        "estado": filas[0].estado if filas else None,
+        "turno": filas[0].turno if filas else None,
+        **armar_horario(filas, "maestro"),
+    }
+
+
+def vista_maestro(maestro: dict, filas) -> dict:
+    """Respuesta de /api/maestros/{id}/horario (filas ordenadas por día y hora)"""
+    return {
+        "maestro": maestro,
+        **armar_horario(filas, "grupo"),
+    }
+
+
+def serializar(datos) -> str:
+    """JSON compacto, igual al que regresaría FastAPI"""
+    return json.dumps(jsonable_encoder(datos), ensure_ascii=False, separators=(",", ":"))
+
+
+def borrar_snapshots(db: Session):
+    db.execute(delete(SnapshotHorario))
+
+
+def armar_snapshots(filas, horarios, grupo_ids=None, maestro_ids=None) -> list:
+    """
+    Filas para snapshots_horario: una por horario de `horarios` y una por
+    grupo y por maestro de `filas` (solo los de grupo_ids / maestro_ids si
+    se dan). `filas` va ordenado por día y hora.
+    """
+    por_horario = defaultdict(list)
+    por_grupo = defaultdict(list)
+    por_maestro = defaultdict(list)
+    for f in filas:
+        por_horario[f.horario_id].append(f)
+        por_grupo[f.grupo_id].append(f)
+        por_maestro[f.maestro_id].append(f)
+
+    snapshots = [
+        {
+            "tipo": SNAPSHOT_HORARIO,
+            "referencia_id": h.id,
+            "contenido": serializar(
+                vista_horario(h, sorted(por_horario.get(h.id, []), key=lambda f: f.id))
+            ),
+        }
+        for h in horarios
+    ]
+    snapshots += [
+        {
+            "tipo": SNAPSHOT_GRUPO,
+            "referencia_id": grupo_id,
+            "contenido": serializar(
+                vista_grupo({"id": grupo_id, "nombre": fs[0].grupo}, fs)
+            ),
+        }
+        for grupo_id, fs in por_grupo.items()
+        if grupo_ids is None or grupo_id in grupo_ids
+    ]
+    snapshots += [
+        {
+            "tipo": SNAPSHOT_MAESTRO,
+            "referencia_id": maestro_id,
+            "contenido": serializar(
+                vista_maestro({"id": maestro_id, "nombre": fs[0].maestro}, fs)
+            ),
+        }
+        for maestro_id, fs in por_maestro.items()
+        if maestro_ids is None or maestro_id in maestro_ids
+    ]
+    return snapshots
+
+
+def _consulta_horarios():
+    return select(
+        HorarioGenerado.id,
+        HorarioGenerado.fecha_generacion,
+        HorarioGenerado.estado,
+        HorarioGenerado.turno,
+    )
+
+
+def reconstruir_snapshots(db: Session) -> int:
+    """
+    Vuelve a calcular todos los snapshots a partir de las asignaciones
+    actuales (una consulta) y regresa cuántos se guardaron. Va dentro de la
+    transacción de quien llama; es para la generación completa (para un
+    cambio puntual ver refrescar_snapshots).
+    """
+    db.flush()
+    filas = todas_las_asignaciones(db)
+    horarios = db.execute(_consulta_horarios()).all()
+    snapshots = armar_snapshots(filas, horarios)
+
+    borrar_snapshots(db)
+    if snapshots:
+        db.execute(insert(SnapshotHorario), snapshots)
+    return len(snapshots)
+
+
+def vistas_afectadas(db: Session, *condiciones) -> dict:
+    """
+    Horarios, grupos y maestros de las asignaciones que cumplen `condiciones`
+    (p. ej. Asignacion.maestro_id == 3), para refrescar_snapshots(**vistas).
+    Se consulta antes de borrar: después ya no hay asignaciones que buscar.
+    """
+    filas = db.execute(
+        select(Asignacion.horario_id, Asignacion.grupo_id, Asignacion.maestro_id)
+        .where(*condiciones)
+        .distinct()
+    ).all()
+    return {
+        "horario_ids": {f.horario_id for f in filas},
+        "grupo_ids": {f.grupo_id for f in filas},
+        "maestro_ids": {f.maestro_id for f in filas},
+    }
+
+
+def refrescar_snapshots(
+    db: Session, horario_ids=(), grupo_ids=(), maestro_ids=()
+) -> int:
+    """
+    Vuelve a calcular solo los snapshots de esos horarios, grupos y maestros
+    (los que ya no tienen asignaciones quedan sin snapshot) y regresa
+    cuántos se guardaron. Va dentro de la transacción de quien llama.
+    """
+    horario_ids, grupo_ids, maestro_ids = set(horario_ids), set(grupo_ids), set(maestro_ids)
+    if not (horario_ids or grupo_ids or maestro_ids):
+        return 0
+
+    db.flush()
+    filas = asignaciones_de_vistas(db, horario_ids, grupo_ids, maestro_ids)
+    horarios = db.execute(_consulta_horarios().where(HorarioGenerado.id.in_(horario_ids))).all()
+    snapshots = armar_snapshots(filas, horarios, grupo_ids, maestro_ids)
+
+    for tipo, ids in (
+        (SNAPSHOT_HORARIO, horario_ids),
+        (SNAPSHOT_GRUPO, grupo_ids),
+        (SNAPSHOT_MAESTRO, maestro_ids),
+    ):
+        if ids:
+            db.execute(
+                delete(SnapshotHorario).where(
+                    SnapshotHorario.tipo == tipo, SnapshotHorario.referencia_id.in_(ids)
+                )
+            )
+    if snapshots:
+        db.execute(insert(SnapshotHorario), snapshots)
+    return len(snapshots)
+
+
+def leer_snapshot(db: Session, tipo: str, referencia_id: int) -> Optional[str]:
+    """JSON guardado de una vista, o None si no hay snapshot"""
+    return db.scalar(
+        select(SnapshotHorario.contenido).where(
+            SnapshotHorario.tipo == tipo, SnapshotHorario.referencia_id == referencia_id
+        )
+    )
@@ -0,0 +1,6 @@
+"""
+Benchmarks del backend.
+
+Se corren desde backend/ como módulos, p. ej.:
+    python -m benchmarks.consultas_horarios
+"""
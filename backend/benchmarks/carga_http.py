@@ -0,0 +1,427 @@
+"""
+Prueba de carga de la API (api.main:app) contra una base local: muchos
+lectores concurrentes de /api/horarios/{id}, /api/maestros y /api/grupos
+(y de los horarios por grupo y por maestro) más generaciones y cargas de
+CSV de vez en cuando. Reporta throughput y latencia p50/p95/p99 por endpoint.
+
+La base se llena con una institución sintética (benchmarks.datos_sinteticos)
+y un horario generado por la misma API. Por defecto es un SQLite temporal
+(en modo WAL, como cualquier SQLite en archivo de database.connection);
+con --database-url se usa otra base DESECHABLE (sus tablas se borran):
+
+    cd backend
+    python -m benchmarks.carga_http --escala docentes --peticiones 2000 --concurrencia 50
+    python -m benchmarks.carga_http --uvicorn --salida carga.json
+    python -m benchmarks.carga_http --database-url mysql+pymysql://root:@localhost/horarios_carga
+
+Sin --uvicorn la app corre en este mismo proceso (httpx.ASGITransport);
+con --uvicorn se levanta un servidor uvicorn aparte con la misma base.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.datos_sinteticos import ESCALAS, generar_institucion
+
+# Peso de cada tipo de petición en la mezcla
+MEZCLA = {
+    "GET /api/horarios/{id}": 35,
+    "GET /api/maestros": 20,
+    "GET /api/grupos": 20,
+    "GET /api/grupos/{id}/horario": 10,
+    "GET /api/maestros/{id}/horario": 10,
+    "GET /api/planes-estudios": 5,
+}
+ESCRITURAS = {
+    "POST /api/generar-horario": 1,
+    "POST /api/maestros/upload-csv": 1,
+}
+# Maestros nuevos en cada CSV de la prueba
+MAESTROS_POR_CSV = 50
+
+
+def sembrar(engine, datos: dict):
+    """Borra las tablas y carga planes, materias y maestros de `datos`"""
+    from sqlalchemy import insert
+
+    from database.connection import Base
+    from database.models import (
+        DisponibilidadMaestro,
+        Maestro,
+        MaestroMateria,
+        Materia,
+        PlanEstudios,
+    )
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    planes = sorted({c["plan"] for c in datos["cuatrimestres"]})
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(PlanEstudios),
+            [
+                {"id": p, "nombre": f"PLAN{p}", "total_cuatrimestres": 10}
+                for p in planes
+            ],
+        )
+        conn.execute(
+            insert(Materia),
+            [
+                {
+                    "id": m["id"],
+                    "nombre": m["nombre"],
+                    "horas_semanales": m["horas_semanales"],
+                    "cuatrimestre": c["cuatrimestre"],
+                    "plan_estudios_id": c["plan"],
+                }
+                for c in datos["cuatrimestres"]
+                for m in c["materias"]
+            ],
+        )
+        conn.execute(
+            insert(Maestro),
+            [
+                {
+                    "id": m["id"],
+                    "nombre": m["nombre"],
+                    "email": f"maestro{m['id']}@carga.test",
+                    "horas_max_semana": m["horas_max_semana"],
+                }
+                for m in datos["maestros"]
+            ],
+        )
+        conn.execute(
+            insert(MaestroMateria),
+            [
+                {"maestro_id": m["id"], "materia_id": materia_id}
+                for m in datos["maestros"]
+                for materia_id in m["materias_ids"]
+            ],
+        )
+        conn.execute(
+            insert(DisponibilidadMaestro),
+            [
+                {"maestro_id": m["id"], "dia_semana": dia, "hora_inicio": 7, "hora_fin": 22}
+                for m in datos["maestros"]
+                for dia in m["dias_disponibles"]
+            ],
+        )
+
+
+def modo_diario(engine) -> str:
+    """journal_mode de SQLite ("" con otras bases)"""
+    from sqlalchemy import text
+
+    if engine.dialect.name != "sqlite":
+        return ""
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA journal_mode")).scalar().lower()
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[k]
+
+
+class Carga:
+    """Estado compartido de la prueba: ids conocidos y mediciones"""
+
+    def __init__(self, cliente: httpx.AsyncClient, args, materias: list, maestro_ids: list):
+        self.cliente = cliente
+        self.args = args
+        self.azar = random.Random(args.semilla)
+        self.materias = materias
+        self.maestro_ids = maestro_ids
+        self.horario_ids = []
+        self.grupo_ids = []
+        self.csv_subidos = 0
+        self.mediciones = {}
+        self.tipos = dict(MEZCLA)
+        if not args.sin_escrituras:
+            self.tipos.update(ESCRITURAS)
+
+    async def refrescar_ids(self):
+        """Ids de horarios y grupos actuales (cambian con cada generación)"""
+        horarios = (await self.cliente.get("/api/horarios")).json()["horarios"]
+        grupos = (await self.cliente.get("/api/grupos")).json()["grupos"]
+        self.horario_ids = [h["id"] for h in horarios] or [1]
+        self.grupo_ids = [g["id"] for g in grupos] or [1]
+
+    def generacion(self) -> dict:
+        return {
+            "plan_id": 1,
+            "maestro_ids": self.maestro_ids,
+            "grupos_generar": self.args.grupos_por_cuatrimestre,
+            "semilla": self.azar.randint(1, 10**6),
+        }
+
+    def csv_maestros(self) -> bytes:
+        self.csv_subidos += 1
+        salida = io.StringIO()
+        escritor = csv.writer(salida)
+        escritor.writerow(["nombre", "email", "horas_max_semana", "materias", "dias_disponibles"])
+        for i in range(MAESTROS_POR_CSV):
+            escritor.writerow(
+                [
+                    f"Maestro CSV {self.csv_subidos}-{i}",
+                    f"csv{self.csv_subidos}-{i}@carga.test",
+                    15,
+                    "|".join(self.azar.sample(self.materias, min(3, len(self.materias)))),
+                    "0|1|2|3|4",
+                ]
+            )
+        return salida.getvalue().encode("utf-8")
+
+    async def peticion(self, tipo: str):
+        c = self.cliente
+        inicio = time.perf_counter()
+        try:
+            if tipo == "GET /api/horarios/{id}":
+                r = await c.get(f"/api/horarios/{self.azar.choice(self.horario_ids)}")
+            elif tipo == "GET /api/maestros":
+                r = await c.get("/api/maestros")
+            elif tipo == "GET /api/grupos":
+                r = await c.get("/api/grupos")
+            elif tipo == "GET /api/grupos/{id}/horario":
+                r = await c.get(f"/api/grupos/{self.azar.choice(self.grupo_ids)}/horario")
+            elif tipo == "GET /api/maestros/{id}/horario":
+                r = await c.get(f"/api/maestros/{self.azar.choice(self.maestro_ids)}/horario")
+            elif tipo == "GET /api/planes-estudios":
+                r = await c.get("/api/planes-estudios")
+            elif tipo == "POST /api/generar-horario":
+                r = await c.post("/api/generar-horario", json=self.generacion())
+            else:
+                r = await c.post(
+                    "/api/maestros/upload-csv",
+                    files={"file": ("maestros.csv", self.csv_maestros(), "text/csv")},
+                )
+            estado = r.status_code
+            cache = r.headers.get("x-cache")
+            detalle = r.text if estado >= 500 else None
+        except httpx.HTTPError as e:
+            estado = type(e).__name__
+            cache = None
+            detalle = str(e)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        m = self.mediciones.setdefault(
+            tipo, {"ms": [], "estados": {}, "hits": 0, "ejemplo_error": None}
+        )
+        m["ms"].append(ms)
+        m["estados"][str(estado)] = m["estados"].get(str(estado), 0) + 1
+        if cache == "HIT":
+            m["hits"] += 1
+        if detalle and m["ejemplo_error"] is None:
+            m["ejemplo_error"] = detalle[:300]
+        if tipo == "POST /api/generar-horario" and estado == 200:
+            await self.refrescar_ids()
+
+    async def correr(self) -> float:
+        """Lanza las peticiones con `concurrencia` clientes; regresa los segundos"""
+        tipos = list(self.tipos)
+        pesos = [self.tipos[t] for t in tipos]
+        cola = self.azar.choices(tipos, weights=pesos, k=self.args.peticiones)
+
+        async def trabajador():
+            while cola:
+                await self.peticion(cola.pop())
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(self.args.concurrencia)))
+        return time.perf_counter() - inicio
+
+
+def reporte(mediciones: dict, segundos: float) -> dict:
+    endpoints = {}
+    for tipo, m in sorted(mediciones.items()):
+        ms = sorted(m["ms"])
+        errores = sum(n for e, n in m["estados"].items() if not e.isdigit() or int(e) >= 500)
+        endpoints[tipo] = {
+            "peticiones": len(ms),
+            "errores": errores,
+            "estados": m["estados"],
+            "cache_hits": m["hits"],
+            "p50_ms": round(percentil(ms, 50), 3),
+            "p95_ms": round(percentil(ms, 95), 3),
+            "p99_ms": round(percentil(ms, 99), 3),
+            "max_ms": round(ms[-1], 3),
+            "promedio_ms": round(sum(ms) / len(ms), 3),
+            "ejemplo_error": m["ejemplo_error"],
+        }
+    total = sum(e["peticiones"] for e in endpoints.values())
+    todas = sorted(v for m in mediciones.values() for v in m["ms"])
+    return {
+        "segundos": round(segundos, 3),
+        "peticiones": total,
+        "peticiones_por_segundo": round(total / segundos, 1) if segundos else 0,
+        "errores": sum(e["errores"] for e in endpoints.values()),
+        "p50_ms": round(percentil(todas, 50), 3),
+        "p95_ms": round(percentil(todas, 95), 3),
+        "p99_ms": round(percentil(todas, 99), 3),
+        "endpoints": endpoints,
+    }
+
+
+def imprimir(resultado: dict):
+    print(
+        f"{'endpoint':<32} {'n':>6} {'err':>4} {'hits':>5}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for tipo, e in resultado["endpoints"].items():
+        print(
+            f"{tipo:<32} {e['peticiones']:>6} {e['errores']:>4} {e['cache_hits']:>5}"
+            f" {e['p50_ms']:>8.2f} {e['p95_ms']:>8.2f} {e['p99_ms']:>8.2f} {e['max_ms']:>8.2f}"
+        )
+    for tipo, e in resultado["endpoints"].items():
+        if e["ejemplo_error"]:
+            print(f"  {tipo}: {e['ejemplo_error'][:120]}")
+    print(
+        f"\n{resultado['peticiones']} peticiones en {resultado['segundos']:.2f} s"
+        f" = {resultado['peticiones_por_segundo']} pet/s"
+        f" | p50 {resultado['p50_ms']:.2f} ms p95 {resultado['p95_ms']:.2f} ms"
+        f" p99 {resultado['p99_ms']:.2f} ms | errores {resultado['errores']}"
+    )
+
+
+def levantar_uvicorn(puerto: int) -> subprocess.Popen:
+    """Servidor uvicorn con la misma base (DATABASE_URL ya está en el entorno)"""
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{puerto}/", timeout=1)
+            return proceso
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise SystemExit("uvicorn no respondió")
+
+
+async def ejecutar(args, datos: dict) -> dict:
+    materias = [m["nombre"] for c in datos["cuatrimestres"] for m in c["materias"]]
+    maestro_ids = [m["id"] for m in datos["maestros"]]
+    limites = httpx.Limits(max_connections=args.concurrencia)
+
+    proceso = None
+    if args.uvicorn:
+        proceso = levantar_uvicorn(args.puerto)
+        cliente = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.puerto}", limits=limites, timeout=120
+        )
+    else:
+        import api.main
+
+        cliente = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.main.app),
+            base_url="http://carga", limits=limites, timeout=120,
+        )
+
+    try:
+        async with cliente:
+            carga = Carga(cliente, args, materias, maestro_ids)
+            inicio = time.perf_counter()
+            r = await cliente.post("/api/generar-horario", json=carga.generacion())
+            if r.status_code != 200:
+                raise SystemExit(f"No se pudo generar el horario inicial: {r.text}")
+            print(
+                f"Horario inicial: {r.json()['total_asignaciones']} asignaciones"
+                f" en {len(r.json()['horarios'])} grupos ({time.perf_counter() - inicio:.2f} s)"
+            )
+            await carga.refrescar_ids()
+            segundos = await carga.correr()
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+        else:
+            from database.connection import cerrar_async_engine
+
+            await cerrar_async_engine()
+
+    return reporte(carga.mediciones, segundos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escala", choices=list(ESCALAS), default="docentes")
+    parser.add_argument("--grupos-por-cuatrimestre", type=int, default=4)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-escrituras", action="store_true", help="Solo lecturas")
+    parser.add_argument("--database-url", help="Base desechable (por defecto un SQLite temporal)")
+    parser.add_argument("--uvicorn", action="store_true", help="Probar contra un servidor uvicorn")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--salida", help="Archivo JSON con los resultados")
+    args = parser.parse_args()
+
+    # La URL tiene que estar antes de importar database.connection
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.gettempdir(), "horarios_carga.db"
+    )
+    os.environ["ASYNC_DATABASE_URL"] = ""
+    from database.connection import engine
+
+    escala = ESCALAS[args.escala]
+    datos = generar_institucion(
+        escala["maestros"], escala["grupos"], escala["materias"], semilla=args.semilla
+    )
+    sembrar(engine, datos)
+    diario = modo_diario(engine)
+    engine.dispose()
+    # Sin WAL cada escritura bloquea a los lectores (y falla con "database is
+    # locked"): el reporte mediría los candados de SQLite, no la API
+    if diario and diario != "wal" and not args.sin_escrituras:
+        parser.error(
+            f"SQLite en modo {diario}: las escrituras concurrentes se bloquean;"
+            " usa un archivo SQLite (WAL), otra base o --sin-escrituras"
+        )
+
+    resultado = asyncio.run(ejecutar(args, datos))
+    imprimir(resultado)
+
+    if args.salida:
+        from benchmarks.motor_horarios import commit_actual
+
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "commit": commit_actual(),
+                    "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "plataforma": platform.platform(),
+                    "base": engine.dialect.name + (f" ({diario})" if diario else ""),
+                    "parametros": {
+                        k: v for k, v in vars(args).items() if k not in ("salida", "database_url")
+                    },
+                    "resultado": resultado,
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"\nResultados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
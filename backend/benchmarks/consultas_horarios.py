@@ -0,0 +1,217 @@
+"""
+Compara las consultas de lectura de horarios antes y después de quitar el
+N+1 de GET /api/horarios y GET /api/horarios/{id}.
+
+Las versiones "anteriores" son copia de los endpoints originales (un .get()
+por maestro, materia y grupo de cada asignación, y len(h.asignaciones) para
+contar). Las "actuales" usan database.consultas. Todo corre sobre SQLite en
+memoria con datos sintéticos, así que no hace falta MySQL:
+
+    cd backend
+    python -m benchmarks.consultas_horarios --horarios 20 --asignaciones 500
+"""
+
+import argparse
+import time
+import warnings
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.exc import LegacyAPIWarning
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.connection import Base
+from database.consultas import asignaciones_de_horario, horarios_con_conteo
+from database.models import (
+    Asignacion,
+    Grupo,
+    HorarioGenerado,
+    Maestro,
+    Materia,
+)
+
+DIAS = ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes", "Sabado"]
+
+
+# ========== VERSIONES ANTERIORES (N+1) ==========
+
+
+def horarios_anterior(db) -> list:
+    """GET /api/horarios original: carga las asignaciones de cada horario para contarlas"""
+    horarios = (
+        db.query(HorarioGenerado)
+        .order_by(HorarioGenerado.fecha_generacion.desc())
+        .all()
+    )
+    return [
+        {
+            "id": h.id,
+            "fecha_generacion": h.fecha_generacion,
+            "estado": h.estado,
+            "turno": h.turno,
+            "total_asignaciones": len(h.asignaciones),
+        }
+        for h in horarios
+    ]
+
+
+def horario_anterior(db, horario_id: int) -> list:
+    """GET /api/horarios/{id} original: 3 consultas extra por asignación"""
+    asignaciones = (
+        db.query(Asignacion).filter(Asignacion.horario_id == horario_id).all()
+    )
+    return [
+        {
+            "id": a.id,
+            "maestro": db.query(Maestro).get(a.maestro_id).nombre,
+            "materia": db.query(Materia).get(a.materia_id).nombre,
+            "grupo": db.query(Grupo).get(a.grupo_id).nombre,
+            "dia": DIAS[a.dia_semana],
+            "hora_inicio": f"{a.hora_inicio}:00",
+            "hora_fin": f"{a.hora_fin}:00",
+        }
+        for a in asignaciones
+    ]
+
+
+# ========== VERSIONES ACTUALES ==========
+
+
+def horarios_actual(db) -> list:
+    return [
+        {
+            "id": h.id,
+            "fecha_generacion": h.fecha_generacion,
+            "estado": h.estado,
+            "turno": h.turno,
+            "total_asignaciones": h.total_asignaciones,
+        }
+        for h in horarios_con_conteo(db)
+    ]
+
+
+def horario_actual(db, horario_id: int) -> list:
+    return [
+        {
+            "id": a.id,
+            "maestro": a.maestro,
+            "materia": a.materia,
+            "grupo": a.grupo,
+            "dia": DIAS[a.dia_semana],
+            "hora_inicio": f"{a.hora_inicio}:00",
+            "hora_fin": f"{a.hora_fin}:00",
+        }
+        for a in asignaciones_de_horario(db, horario_id)
+    ]
+
+
+# ========== DATOS Y MEDICIÓN ==========
+
+
+def crear_base(num_horarios: int, asignaciones_por_horario: int):
+    """Base SQLite en memoria con maestros, materias, grupos y horarios sintéticos"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+
+    num_maestros, num_materias, num_grupos = 60, 80, 40
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Maestro),
+            [
+                {"nombre": f"Maestro {i}", "email": f"maestro{i}@upv.edu.mx"}
+                for i in range(1, num_maestros + 1)
+            ],
+        )
+        conn.execute(
+            insert(Materia),
+            [
+                {"nombre": f"Materia {i}", "horas_semanales": 5, "cuatrimestre": 1}
+                for i in range(1, num_materias + 1)
+            ],
+        )
+        conn.execute(
+            insert(Grupo),
+            [{"nombre": f"Grupo {i}", "semestre": 1} for i in range(1, num_grupos + 1)],
+        )
+        conn.execute(
+            insert(HorarioGenerado),
+            [{"estado": "generado", "turno": "matutino"} for _ in range(num_horarios)],
+        )
+        conn.execute(
+            insert(Asignacion),
+            [
+                {
+                    "horario_id": h,
+                    "maestro_id": i % num_maestros + 1,
+                    "materia_id": i % num_materias + 1,
+                    "grupo_id": i % num_grupos + 1,
+                    "dia_semana": i % 5,
+                    "hora_inicio": 7 + i % 8,
+                    "hora_fin": 8 + i % 8,
+                }
+                for h in range(1, num_horarios + 1)
+                for i in range(asignaciones_por_horario)
+            ],
+        )
+    return engine
+
+
+def medir(engine, funcion, *args, repeticiones: int = 5) -> dict:
+    """Mejor tiempo de `repeticiones` corridas (sesión nueva cada vez) y consultas emitidas"""
+    consultas = [0]
+
+    def contar(*_):
+        consultas[0] += 1
+
+    event.listen(engine, "before_cursor_execute", contar)
+    Sesion = sessionmaker(bind=engine)
+    tiempos = []
+    try:
+        for _ in range(repeticiones):
+            consultas[0] = 0
+            with Sesion() as db:
+                inicio = time.perf_counter()
+                resultado = funcion(db, *args)
+                tiempos.append(time.perf_counter() - inicio)
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    return {"ms": min(tiempos) * 1000, "consultas": consultas[0], "resultado": resultado}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--horarios", type=int, default=20)
+    parser.add_argument("--asignaciones", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    # Las versiones anteriores usan Query.get(), tal como estaban
+    warnings.filterwarnings("ignore", category=LegacyAPIWarning)
+
+    engine = crear_base(args.horarios, args.asignaciones)
+    casos = [
+        ("GET /api/horarios", horarios_anterior, horarios_actual, ()),
+        ("GET /api/horarios/{id}", horario_anterior, horario_actual, (1,)),
+    ]
+
+    print(
+        f"{args.horarios} horarios x {args.asignaciones} asignaciones "
+        f"(mejor de {args.repeticiones})"
+    )
+    for nombre, anterior, actual, extra in casos:
+        antes = medir(engine, anterior, *extra, repeticiones=args.repeticiones)
+        ahora = medir(engine, actual, *extra, repeticiones=args.repeticiones)
+        if antes["resultado"] != ahora["resultado"]:
+            raise SystemExit(f"{nombre}: las dos versiones no regresan lo mismo")
+        print(
+            f"{nombre:<24} anterior {antes['ms']:9.2f} ms {antes['consultas']:6d} consultas"
+            f" | actual {ahora['ms']:9.2f} ms {ahora['consultas']:3d} consultas"
+            f" | x{antes['ms'] / ahora['ms']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Instituciones sintéticas para los benchmarks: maestros, planes de
+estudio, materias, grupos y disponibilidad en el formato que recibe
+SchedulerEngine.generar_horario_plan (sin base de datos).
+
+Las escalas van del tamaño de database/docentes.csv (40 maestros, un plan)
+hasta 5,000 maestros y 1,000 grupos. Con la misma semilla se generan
+exactamente los mismos datos.
+"""
+
+import random
+
+# Cuatrimestres con clases de cada plan (sin las estadías 6 y 10)
+CUATRIMESTRES_PLAN = [1, 2, 3, 4, 5, 7, 8, 9]
+
+# Escalas predefinidas: maestros, grupos y materias por cuatrimestre
+ESCALAS = {
+    "docentes": {"maestros": 40, "grupos": 16, "materias": 7},
+    "mediana": {"maestros": 500, "grupos": 100, "materias": 7},
+    "grande": {"maestros": 2000, "grupos": 400, "materias": 7},
+    "maxima": {"maestros": 5000, "grupos": 1000, "materias": 7},
+}
+
+HORAS_MATERIA = (3, 4, 5)
+HORAS_MAX_SEMANA = (12, 20)
+DIAS_DISPONIBLES = (3, 5)  # mínimo y máximo de días por maestro
+MATERIAS_POR_MAESTRO = (2, 8)
+
+
+def generar_institucion(
+    maestros: int, grupos: int, materias: int = 7, semilla: int = 1
+) -> dict:
+    """
+    Regresa {"maestros": maestros_data, "cuatrimestres": cuatrimestres_data,
+    "horas_requeridas": int}; cada cuatrimestre indica además su "plan"
+    (1, 2, ...), que el motor ignora. Los grupos se reparten en planes de
+    len(CUATRIMESTRES_PLAN) cuatrimestres; cada materia tiene al menos un
+    maestro que puede impartirla y las horas de cada maestro se reparten
+    para que la capacidad total alcance (si hay maestros suficientes).
+    """
+    azar = random.Random(semilla)
+
+    # Grupos por (plan, cuatrimestre): llenar un plan antes de abrir otro,
+    # con hasta 4 grupos por cuatrimestre
+    grupos_por_cuatrimestre = max(1, min(4, grupos // len(CUATRIMESTRES_PLAN)))
+    cuatrimestres = []
+    restantes = grupos
+    plan = 0
+    while restantes > 0:
+        plan += 1
+        for cuatrimestre in CUATRIMESTRES_PLAN:
+            if restantes <= 0:
+                break
+            cuantos = min(grupos_por_cuatrimestre, restantes)
+            cuatrimestres.append({"plan": plan, "cuatrimestre": cuatrimestre, "grupos": cuantos})
+            restantes -= cuantos
+
+    # Materias de cada cuatrimestre (ids consecutivos) y grupos
+    materia_id = 0
+    grupo_id = 0
+    cuatrimestres_data = []
+    for c in cuatrimestres:
+        materias_data = []
+        for _ in range(materias):
+            materia_id += 1
+            materias_data.append(
+                {
+                    "id": materia_id,
+                    "nombre": f"P{c['plan']} MATERIA {materia_id}",
+                    "horas_semanales": azar.choice(HORAS_MATERIA),
+                }
+            )
+        grupos_data = []
+        for n in range(1, c["grupos"] + 1):
+            grupo_id += 1
+            grupos_data.append({"id": grupo_id, "nombre": f"P{c['plan']} {c['cuatrimestre']}-{n}"})
+        cuatrimestres_data.append(
+            {
+                "plan": c["plan"],
+                "cuatrimestre": c["cuatrimestre"],
+                "materias": materias_data,
+                "grupos": grupos_data,
+            }
+        )
+
+    # Horas que pide cada materia (por todos sus grupos)
+    demanda = {
+        m["id"]: m["horas_semanales"] * len(c["grupos"])
+        for c in cuatrimestres_data
+        for m in c["materias"]
+    }
+    todas = list(demanda)
+
+    maestros_data = []
+    for i in range(1, maestros + 1):
+        dias = sorted(azar.sample(range(5), azar.randint(*DIAS_DISPONIBLES)))
+        maestros_data.append(
+            {
+                "id": i,
+                "nombre": f"Maestro {i}",
+                "horas_max_semana": azar.randint(*HORAS_MAX_SEMANA),
+                "materias_ids": azar.sample(
+                    todas, min(len(todas), azar.randint(*MATERIAS_POR_MAESTRO))
+                ),
+                "dias_disponibles": dias,
+            }
+        )
+
+    # Cada materia con al menos un maestro, y más mientras su demanda pase la
+    # capacidad de los que la pueden dar
+    if maestros_data:
+        capacidad = {}
+        for m in maestros_data:
+            for materia in m["materias_ids"]:
+                capacidad[materia] = capacidad.get(materia, 0) + m["horas_max_semana"]
+        for materia in todas:
+            while capacidad.get(materia, 0) < demanda[materia]:
+                maestro = azar.choice(maestros_data)
+                if materia in maestro["materias_ids"]:
+                    if len(maestros_data) == 1:
+                        break
+                    continue
+                maestro["materias_ids"].append(materia)
+                capacidad[materia] = capacidad.get(materia, 0) + maestro["horas_max_semana"]
+
+    return {
+        "maestros": maestros_data,
+        "cuatrimestres": cuatrimestres_data,
+        "horas_requeridas": sum(demanda.values()),
+    }
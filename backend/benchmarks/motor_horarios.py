@@ -0,0 +1,321 @@
+"""
+Mide SchedulerEngine con instituciones sintéticas (benchmarks.datos_sinteticos):
+tiempo total y por fase de generar_horario_plan y calidad del horario
+(horas colocadas, empalmes, huecos). No necesita MySQL, solo el módulo
+Cython compilado:
+
+    cd backend
+    python -m benchmarks.motor_horarios --escala docentes mediana --salida base.json
+    python -m benchmarks.motor_horarios --escala docentes mediana --comparar base.json
+
+El JSON de --salida guarda el commit, los parámetros y los resultados de cada
+escala; --comparar imprime la diferencia contra un JSON anterior.
+
+--casos corre además casos chicos con resultado conocido (CASOS_REGRESION)
+y termina con error si alguno falla.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.datos_sinteticos import ESCALAS, generar_institucion
+
+# El módulo compilado vive en backend/scheduler (igual que en api/generacion.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scheduler"))
+
+# Rango de horas del turno matutino (ver rango_turno en api/main.py)
+HORA_MIN, HORA_MAX = 7, 14
+
+
+def calidad(asignaciones: list, datos: dict) -> dict:
+    """
+    Métricas calculadas sobre el resultado (sin confiar en el resumen del
+    motor): fracción de horas_semanales colocadas, empalmes de maestros y de
+    grupos, maestros sobre su máximo o fuera de sus días y huecos por grupo.
+    """
+    horas = {}
+    por_materia = {}
+    for c in datos["cuatrimestres"]:
+        for m in c["materias"]:
+            for g in c["grupos"]:
+                horas[(g["id"], m["id"])] = m["horas_semanales"]
+    maestros = {m["id"]: m for m in datos["maestros"]}
+
+    celdas_maestro = Counter()
+    celdas_grupo = Counter()
+    horas_maestro = Counter()
+    fuera_de_dia = 0
+    slots_grupo = {}
+    for a in asignaciones:
+        clave = (a["grupo_id"], a["materia_id"])
+        duracion = a["hora_fin"] - a["hora_inicio"]
+        por_materia[clave] = por_materia.get(clave, 0) + duracion
+        horas_maestro[a["maestro_id"]] += duracion
+        if a["dia_semana"] not in maestros[a["maestro_id"]]["dias_disponibles"]:
+            fuera_de_dia += 1
+        for hora in range(a["hora_inicio"], a["hora_fin"]):
+            celdas_maestro[(a["maestro_id"], a["dia_semana"], hora)] += 1
+            celdas_grupo[(a["grupo_id"], a["dia_semana"], hora)] += 1
+            slots_grupo.setdefault((a["grupo_id"], a["dia_semana"]), set()).add(hora)
+
+    requeridas = sum(horas.values())
+    colocadas = sum(min(por_materia.get(k, 0), v) for k, v in horas.items())
+    huecos = sum(max(s) - min(s) + 1 - len(s) for s in slots_grupo.values())
+    return {
+        "horas_requeridas": requeridas,
+        "horas_colocadas": colocadas,
+        "fraccion_colocada": round(colocadas / requeridas, 4) if requeridas else 1.0,
+        "empalmes_maestro": sum(n - 1 for n in celdas_maestro.values() if n > 1),
+        "empalmes_grupo": sum(n - 1 for n in celdas_grupo.values() if n > 1),
+        "maestros_sobre_maximo": sum(
+            1 for t, h in horas_maestro.items() if h > maestros[t]["horas_max_semana"]
+        ),
+        "asignaciones_fuera_de_dia": fuera_de_dia,
+        "huecos": huecos,
+        "huecos_por_grupo": round(huecos / max(len({g for g, _ in slots_grupo}), 1), 3),
+    }
+
+
+def correr(datos: dict, semilla: int, opciones: dict) -> dict:
+    """Una generación completa con tiempos por fase"""
+    import scheduler
+    from api.generacion import desempaquetar
+
+    total_materias = sum(len(c["materias"]) for c in datos["cuatrimestres"])
+    total_grupos = sum(len(c["grupos"]) for c in datos["cuatrimestres"])
+
+    inicio = time.perf_counter()
+    engine = scheduler.SchedulerEngine(
+        len(datos["maestros"]), total_materias, total_grupos, HORA_MIN, HORA_MAX, semilla=semilla
+    )
+    creado = time.perf_counter()
+    buffer = engine.generar_horario_plan(
+        datos["maestros"], datos["cuatrimestres"], empaquetado=True, **opciones
+    )
+    generado = time.perf_counter()
+    asignaciones = desempaquetar(buffer)
+    fin = time.perf_counter()
+
+    resumen = engine.resumen_generacion()
+    optimizacion = resumen["optimizacion"] or {}
+    return {
+        "asignaciones": asignaciones,
+        "resumen": resumen,
+        "fases_ms": {
+            "crear_motor": (creado - inicio) * 1000,
+            "generar": (generado - creado) * 1000,
+            # Del reloj del motor: búsqueda y búsqueda local
+            "motor_busqueda": (resumen["segundos"] - optimizacion.get("segundos", 0)) * 1000,
+            "motor_optimizacion": optimizacion.get("segundos", 0) * 1000,
+            "desempaquetar": (fin - generado) * 1000,
+        },
+        "total_ms": (fin - inicio) * 1000,
+    }
+
+
+def medir_escala(nombre: str, escala: dict, args) -> dict:
+    """Mejor tiempo de `repeticiones` corridas (misma semilla) y calidad del resultado"""
+    datos = generar_institucion(
+        escala["maestros"], escala["grupos"], escala["materias"], semilla=args.semilla
+    )
+    opciones = {
+        "modo": args.modo,
+        "max_nodos": args.max_nodos,
+        "max_segundos": args.max_segundos,
+        "optimizar_iteraciones": args.optimizar,
+        "optimizar_segundos": args.optimizar_segundos,
+    }
+
+    corridas = [correr(datos, args.semilla, opciones) for _ in range(args.repeticiones)]
+    mejor = min(corridas, key=lambda c: c["total_ms"])
+    return {
+        "escala": nombre,
+        **escala,
+        "total_ms": round(mejor["total_ms"], 3),
+        "total_ms_corridas": [round(c["total_ms"], 3) for c in corridas],
+        "fases_ms": {k: round(v, 3) for k, v in mejor["fases_ms"].items()},
+        "asignaciones": len(mejor["asignaciones"]),
+        "calidad": calidad(mejor["asignaciones"], datos),
+        "costo": mejor["resumen"]["costo"],
+        "contadores": mejor["resumen"].get("contadores"),
+        "estado": mejor["resumen"]["estado"],
+    }
+
+
+def caso_un_dia() -> dict:
+    """Un maestro que solo trabaja el lunes y una materia de 4 horas: cabe en un día"""
+    return {
+        "maestros": [
+            {
+                "id": 1,
+                "nombre": "Maestro 1",
+                "horas_max_semana": 20,
+                "materias_ids": [1],
+                "dias_disponibles": [0],
+            }
+        ],
+        "cuatrimestres": [
+            {
+                "cuatrimestre": 1,
+                "materias": [{"id": 1, "nombre": "MATERIA 1", "horas_semanales": 4}],
+                "grupos": [{"id": 1, "nombre": "1-1"}],
+            }
+        ],
+    }
+
+
+def caso_lunes_saturado() -> dict:
+    """Tres grupos con una materia de 3 horas y un maestro que solo da el lunes (7 slots)"""
+    datos = caso_un_dia()
+    datos["cuatrimestres"][0]["materias"][0]["horas_semanales"] = 3
+    datos["cuatrimestres"][0]["grupos"] = [{"id": g, "nombre": f"1-{g}"} for g in (1, 2, 3)]
+    return datos
+
+
+def caso_docentes() -> dict:
+    """La escala docentes con semilla 1 (antes la búsqueda se atoraba en 421/434 horas)"""
+    escala = ESCALAS["docentes"]
+    return generar_institucion(escala["maestros"], escala["grupos"], escala["materias"], semilla=1)
+
+
+# Casos con resultado conocido: nombre -> (datos, modo, estado esperado)
+CASOS_REGRESION = {
+    "un_dia_4_horas_voraz": (caso_un_dia, "voraz", None),
+    "un_dia_4_horas_exacto": (caso_un_dia, "exacto", "completo"),
+    "lunes_saturado_exacto": (caso_lunes_saturado, "exacto", "imposible"),
+    "docentes_semilla_1_exacto": (caso_docentes, "exacto", "completo"),
+}
+
+
+def verificar_casos() -> list:
+    """Corre CASOS_REGRESION; regresa los nombres de los que fallan"""
+    fallas = []
+    for nombre, (datos_caso, modo, estado) in CASOS_REGRESION.items():
+        datos = datos_caso()
+        resultado = correr(datos, 1, {"modo": modo})
+        q = calidad(resultado["asignaciones"], datos)
+        resumen = resultado["resumen"]
+        correcto = (
+            resumen["estado"] == estado
+            and (estado == "imposible" or q["horas_colocadas"] == q["horas_requeridas"])
+            and q["empalmes_maestro"] + q["empalmes_grupo"] == 0
+            and q["maestros_sobre_maximo"] == 0
+            and q["asignaciones_fuera_de_dia"] == 0
+        )
+        print(
+            f"{'ok   ' if correcto else 'FALLA'} {nombre}: estado {resumen['estado']},"
+            f" {q['horas_colocadas']}/{q['horas_requeridas']} horas"
+        )
+        if not correcto:
+            fallas.append(nombre)
+    return fallas
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def imprimir(resultados: list):
+    print(
+        f"{'escala':<10} {'maestros':>8} {'grupos':>6} {'total ms':>10} {'motor ms':>10}"
+        f" {'colocadas':>9} {'empalmes':>8} {'huecos/g':>8}"
+    )
+    for r in resultados:
+        q = r["calidad"]
+        print(
+            f"{r['escala']:<10} {r['maestros']:>8} {r['grupos']:>6} {r['total_ms']:>10.2f}"
+            f" {r['fases_ms']['motor_busqueda']:>10.2f} {q['fraccion_colocada']:>9.2%}"
+            f" {q['empalmes_maestro'] + q['empalmes_grupo']:>8} {q['huecos_por_grupo']:>8.2f}"
+        )
+
+
+def comparar(anterior: dict, resultados: list):
+    """Diferencias contra un JSON de --salida anterior (mismas escalas)"""
+    previos = {r["escala"]: r for r in anterior["resultados"]}
+    print(f"\nContra {anterior.get('commit') or 'anterior'} ({anterior.get('fecha', '')}):")
+    for r in resultados:
+        p = previos.get(r["escala"])
+        if p is None:
+            continue
+        print(
+            f"{r['escala']:<10} tiempo x{r['total_ms'] / max(p['total_ms'], 1e-9):.2f}"
+            f" | colocadas {r['calidad']['fraccion_colocada'] - p['calidad']['fraccion_colocada']:+.2%}"
+            f" | huecos {r['calidad']['huecos'] - p['calidad']['huecos']:+d}"
+            f" | empalmes {r['calidad']['empalmes_maestro'] - p['calidad']['empalmes_maestro']:+d}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escala", nargs="+", choices=list(ESCALAS), default=["docentes", "mediana"])
+    parser.add_argument("--maestros", type=int, help="Escala propia (con --grupos)")
+    parser.add_argument("--grupos", type=int)
+    parser.add_argument("--materias", type=int, default=7, help="Materias por cuatrimestre")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--modo", choices=["voraz", "exacto"], default="voraz")
+    parser.add_argument("--max-nodos", type=int, default=200000)
+    parser.add_argument("--max-segundos", type=float, default=5.0)
+    parser.add_argument("--optimizar", type=int, default=0, help="Iteraciones de búsqueda local")
+    parser.add_argument("--optimizar-segundos", type=float, default=1.0)
+    parser.add_argument("--salida", help="Archivo JSON con los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--casos", action="store_true", help="Verificar CASOS_REGRESION")
+    args = parser.parse_args()
+
+    try:
+        import scheduler  # noqa: F401
+    except ImportError:
+        raise SystemExit(
+            "El módulo Cython no está compilado. Ejecuta: cd backend/scheduler && python setup.py build_ext --inplace"
+        )
+
+    if args.casos:
+        fallas = verificar_casos()
+        if fallas:
+            raise SystemExit(f"Casos con falla: {', '.join(fallas)}")
+        print()
+
+    escalas = {nombre: ESCALAS[nombre] for nombre in args.escala}
+    if args.maestros and args.grupos:
+        escalas = {
+            "propia": {"maestros": args.maestros, "grupos": args.grupos, "materias": args.materias}
+        }
+
+    resultados = [medir_escala(nombre, escala, args) for nombre, escala in escalas.items()]
+    imprimir(resultados)
+
+    reporte = {
+        "commit": commit_actual(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            k: v for k, v in vars(args).items() if k not in ("salida", "comparar", "casos")
+        },
+        "resultados": resultados,
+    }
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), resultados)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
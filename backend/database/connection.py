@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,11 +17,126 @@ DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_NAME = os.getenv("DB_NAME", "horarios_universidad")
 
-# URL de conexión MySQL
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# URL de conexión: DATABASE_URL tiene prioridad sobre las variables DB_*
+# (p. ej. sqlite:///horarios.db, o sqlite:// para una base en memoria)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+)
+
+
+def _env_bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None or valor == "":
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+# Log de cada sentencia SQL (solo para depurar: es síncrono y va en cada petición)
+DB_ECHO = _env_bool("DB_ECHO", False)
+
+# Pool de conexiones (MySQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos esperando una conexión libre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # menor que wait_timeout de MySQL
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# Milisegundos que una conexión de SQLite (archivo) espera a que se libere
+# el candado de escritura antes de fallar con "database is locked"
+DB_SQLITE_BUSY_TIMEOUT = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "30000"))
+
+
+# Driver asíncrono que corresponde a cada base (para get_async_db)
+DRIVERS_ASYNC = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+# URL asíncrona explícita; si no se da se deriva de DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+
+# Base SQLite en memoria con nombre y caché compartida, para que el motor
+# síncrono y el asíncrono vean la misma base
+SQLITE_MEMORIA = "file:horarios_memoria?mode=memory&cache=shared&uri=true"
+
+
+def _opciones_engine(url: str) -> tuple:
+    """URL final y argumentos de create_engine según la base"""
+    url_bd = make_url(url)
+
+    if url_bd.get_backend_name() == "sqlite":
+        opciones = {"echo": DB_ECHO, "connect_args": {"check_same_thread": False}}
+        if url_bd.database in (None, "", ":memory:"):
+            # En memoria: una sola conexión que la mantiene viva
+            url = f"{url_bd.drivername}:///{SQLITE_MEMORIA}"
+            opciones["poolclass"] = StaticPool
+        return url, opciones
+
+    return url, {
+        "echo": DB_ECHO,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _sqlite_en_archivo(url_bd) -> bool:
+    """Si la URL de SQLite es un archivo (no una base en memoria)"""
+    return url_bd.database not in (None, "", ":memory:") and url_bd.query.get("mode") != "memory"
+
+
+def _activar_llaves_foraneas(motor):
+    """
+    SQLite no aplica ON DELETE CASCADE si no se activa por conexión. En un
+    archivo además se usa WAL (los lectores no bloquean a quien escribe ni
+    al revés) y un busy_timeout para que las escrituras concurrentes esperen
+    su turno en lugar de fallar.
+    """
+    if motor.dialect.name != "sqlite":
+        return
+    en_archivo = _sqlite_en_archivo(motor.url)
+
+    @event.listens_for(motor, "connect")
+    def activar(conexion, _):
+        cursor = conexion.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if en_archivo:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA busy_timeout={DB_SQLITE_BUSY_TIMEOUT}")
+        cursor.close()
+
+
+def crear_engine(url: str = DATABASE_URL):
+    """Motor de base de datos según la URL (MySQL con pool o SQLite local)"""
+    url, opciones = _opciones_engine(url)
+    motor = create_engine(url, **opciones)
+    _activar_llaves_foraneas(motor)
+    return motor
+
+
+def url_async(url: str = DATABASE_URL) -> str:
+    """URL con el driver asíncrono equivalente (mysql+aiomysql, sqlite+aiosqlite)"""
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    url_bd = make_url(url)
+    driver = DRIVERS_ASYNC.get(url_bd.get_backend_name())
+    if driver is None:
+        raise ValueError(
+            f"No hay driver asíncrono para {url_bd.get_backend_name()}; "
+            "define ASYNC_DATABASE_URL"
+        )
+    return url_bd.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def crear_async_engine(url: Optional[str] = None):
+    """Motor asíncrono con la misma configuración de pool que el síncrono"""
+    url, opciones = _opciones_engine(url or url_async())
+    motor = create_async_engine(url, **opciones)
+    _activar_llaves_foraneas(motor.sync_engine)
+    return motor
+
 
 # Motor de base de datos
-engine = create_engine(DATABASE_URL, echo=True)
+engine = crear_engine()
 
 # Sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -32,3 +151,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Motor asíncrono: se crea al primer uso para que el driver async solo se
+# necesite si se usan los endpoints asíncronos
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def obtener_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = crear_async_engine()
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+# Dependencia para obtener sesión asíncrona de BD
+async def get_async_db():
+    obtener_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+async def cerrar_async_engine():
+    """Cierra las conexiones del motor asíncrono (al apagar la API)"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _AsyncSessionLocal = None
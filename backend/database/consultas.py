@@ -0,0 +1,230 @@
+"""
+Consultas de lectura (horarios, maestros y planes de estudio).
+
+Cada función resuelve su vista con una sola consulta (JOIN o proyección de
+columnas) en lugar de recorrer relaciones del ORM fila por fila.
+"""
+
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from .models import (
+    Asignacion,
+    DisponibilidadMaestro,
+    Grupo,
+    HorarioGenerado,
+    Maestro,
+    MaestroMateria,
+    Materia,
+    PlanEstudios,
+)
+
+
+def _consulta_asignaciones():
+    """SELECT de asignaciones con los nombres de maestro, materia y grupo"""
+    return (
+        select(
+            Asignacion.id,
+            Asignacion.horario_id,
+            Asignacion.maestro_id,
+            Asignacion.materia_id,
+            Asignacion.grupo_id,
+            Asignacion.dia_semana,
+            Asignacion.hora_inicio,
+            Asignacion.hora_fin,
+            Maestro.nombre.label("maestro"),
+            Materia.nombre.label("materia"),
+            Grupo.nombre.label("grupo"),
+            HorarioGenerado.fecha_generacion,
+            HorarioGenerado.estado,
+            HorarioGenerado.turno,
+        )
+        .join(Maestro, Maestro.id == Asignacion.maestro_id)
+        .join(Materia, Materia.id == Asignacion.materia_id)
+        .join(Grupo, Grupo.id == Asignacion.grupo_id)
+        .join(HorarioGenerado, HorarioGenerado.id == Asignacion.horario_id)
+    )
+
+
+def asignaciones_de_grupo(db: Session, grupo_id: int) -> list:
+    """Asignaciones de un grupo ordenadas por día y hora (idx_asignacion_grupo_dia_hora)"""
+    consulta = (
+        _consulta_asignaciones()
+        .where(Asignacion.grupo_id == grupo_id)
+        .order_by(Asignacion.dia_semana, Asignacion.hora_inicio)
+    )
+    return db.execute(consulta).all()
+
+
+def asignaciones_de_maestro(db: Session, maestro_id: int) -> list:
+    """Asignaciones de un maestro ordenadas por día y hora (idx_asignacion_maestro_dia_hora)"""
+    consulta = (
+        _consulta_asignaciones()
+        .where(Asignacion.maestro_id == maestro_id)
+        .order_by(Asignacion.dia_semana, Asignacion.hora_inicio)
+    )
+    return db.execute(consulta).all()
+
+
+def todas_las_asignaciones(db: Session) -> list:
+    """Todas las asignaciones con sus nombres, ordenadas por día y hora"""
+    consulta = _consulta_asignaciones().order_by(
+        Asignacion.dia_semana, Asignacion.hora_inicio, Asignacion.id
+    )
+    return db.execute(consulta).all()
+
+
+def asignaciones_de_vistas(db: Session, horario_ids, grupo_ids, maestro_ids) -> list:
+    """
+    Asignaciones de cualquiera de esos horarios, grupos o maestros con sus
+    nombres, ordenadas por día y hora (para refrescar sus snapshots)
+    """
+    consulta = (
+        _consulta_asignaciones()
+        .where(
+            or_(
+                Asignacion.horario_id.in_(horario_ids),
+                Asignacion.grupo_id.in_(grupo_ids),
+                Asignacion.maestro_id.in_(maestro_ids),
+            )
+        )
+        .order_by(Asignacion.dia_semana, Asignacion.hora_inicio, Asignacion.id)
+    )
+    return db.execute(consulta).all()
+
+
+def asignaciones_de_horario(db: Session, horario_id: int) -> list:
+    """Asignaciones de un horario generado con sus nombres, en una sola consulta"""
+    consulta = (
+        _consulta_asignaciones()
+        .where(Asignacion.horario_id == horario_id)
+        .order_by(Asignacion.id)
+    )
+    return db.execute(consulta).all()
+
+
+def horarios_con_conteo(db: Session) -> list:
+    """
+    Horarios generados con su número de asignaciones, del más reciente al más
+    viejo. El conteo sale de un COUNT ... GROUP BY horario_id en lugar de
+    cargar las asignaciones de cada horario.
+    """
+    conteos = (
+        select(Asignacion.horario_id, func.count().label("total"))
+        .group_by(Asignacion.horario_id)
+        .subquery()
+    )
+    consulta = (
+        select(
+            HorarioGenerado.id,
+            HorarioGenerado.fecha_generacion,
+            HorarioGenerado.estado,
+            HorarioGenerado.turno,
+            func.coalesce(conteos.c.total, 0).label("total_asignaciones"),
+        )
+        .outerjoin(conteos, conteos.c.horario_id == HorarioGenerado.id)
+        .order_by(HorarioGenerado.fecha_generacion.desc())
+    )
+    return db.execute(consulta).all()
+
+
+# ========== LISTADOS (proyecciones de columnas, sin cargar objetos ORM) ==========
+
+
+def listar_maestros(db: Session, limit: Optional[int] = None, cursor: Optional[int] = None) -> list:
+    """
+    Columnas de los maestros ordenados por id. Con `cursor` empieza después
+    de ese id (paginación por llave, sin OFFSET).
+    """
+    consulta = select(
+        Maestro.id,
+        Maestro.nombre,
+        Maestro.email,
+        Maestro.numero,
+        Maestro.horas_max_semana,
+    ).order_by(Maestro.id)
+    if cursor is not None:
+        consulta = consulta.where(Maestro.id > cursor)
+    if limit is not None:
+        consulta = consulta.limit(limit)
+    return db.execute(consulta).all()
+
+
+def materias_de_maestros(db: Session, maestro_ids: Optional[list] = None) -> dict:
+    """{maestro_id: [{"id", "nombre"}, ...]} en una consulta (todos si maestro_ids es None)"""
+    consulta = (
+        select(MaestroMateria.maestro_id, Materia.id, Materia.nombre)
+        .join(Materia, Materia.id == MaestroMateria.materia_id)
+        .order_by(MaestroMateria.id)
+    )
+    if maestro_ids is not None:
+        consulta = consulta.where(MaestroMateria.maestro_id.in_(maestro_ids))
+
+    resultado = defaultdict(list)
+    for maestro_id, materia_id, nombre in db.execute(consulta):
+        resultado[maestro_id].append({"id": materia_id, "nombre": nombre})
+    return resultado
+
+
+def dias_de_maestros(db: Session, maestro_ids: Optional[list] = None) -> dict:
+    """{maestro_id: [dia_semana, ...]} en una consulta (todos si maestro_ids es None)"""
+    consulta = select(
+        DisponibilidadMaestro.maestro_id, DisponibilidadMaestro.dia_semana
+    ).order_by(DisponibilidadMaestro.id)
+    if maestro_ids is not None:
+        consulta = consulta.where(DisponibilidadMaestro.maestro_id.in_(maestro_ids))
+
+    resultado = defaultdict(list)
+    for maestro_id, dia in db.execute(consulta):
+        resultado[maestro_id].append(dia)
+    return resultado
+
+
+def listar_planes(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[int] = None,
+    plan_id: Optional[int] = None,
+) -> list:
+    """Columnas de los planes de estudio ordenados por id (o solo `plan_id`)"""
+    consulta = select(
+        PlanEstudios.id,
+        PlanEstudios.nombre,
+        PlanEstudios.descripcion,
+        PlanEstudios.total_cuatrimestres,
+    ).order_by(PlanEstudios.id)
+    if plan_id is not None:
+        consulta = consulta.where(PlanEstudios.id == plan_id)
+    if cursor is not None:
+        consulta = consulta.where(PlanEstudios.id > cursor)
+    if limit is not None:
+        consulta = consulta.limit(limit)
+    return db.execute(consulta).all()
+
+
+def materias_de_planes(db: Session, plan_ids: Optional[list] = None) -> dict:
+    """
+    {plan_id: {cuatrimestre: [{"id", "nombre", "horas_semanales"}, ...]}}
+    en una consulta (todos los planes si plan_ids es None)
+    """
+    consulta = select(
+        Materia.plan_estudios_id,
+        Materia.cuatrimestre,
+        Materia.id,
+        Materia.nombre,
+        Materia.horas_semanales,
+    ).order_by(Materia.id)
+    if plan_ids is not None:
+        consulta = consulta.where(Materia.plan_estudios_id.in_(plan_ids))
+    else:
+        consulta = consulta.where(Materia.plan_estudios_id.is_not(None))
+
+    resultado = defaultdict(dict)
+    for plan_id, cuatrimestre, materia_id, nombre, horas in db.execute(consulta):
+        resultado[plan_id].setdefault(cuatrimestre, []).append(
+            {"id": materia_id, "nombre": nombre, "horas_semanales": horas}
+        )
+    return resultado
@@ -0,0 +1,43 @@
+"""
+Ajustes de esquema para bases de datos ya creadas.
+
+Base.metadata.create_all solo crea tablas que no existen; las columnas
+(nullable) y los índices que se agregan después a los modelos hay que
+crearlos aparte en las tablas viejas.
+"""
+
+from sqlalchemy import inspect, text
+
+from .connection import Base
+
+
+def asegurar_esquema(engine):
+    """
+    Crea las columnas nullable y los índices declarados en los modelos que
+    aún no existan en la BD (las columnas nuevas quedan en NULL y sin llave
+    foránea)
+    """
+    inspector = inspect(engine)
+    tablas = set(inspector.get_table_names())
+    creados = []
+
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas:
+            continue
+        columnas = {columna["name"] for columna in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name not in columnas and columna.nullable:
+                tipo = columna.type.compile(dialect=engine.dialect)
+                with engine.begin() as conexion:
+                    conexion.execute(
+                        text(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}")
+                    )
+                creados.append(f"{tabla.name}.{columna.name}")
+
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                indice.create(bind=engine)
+                creados.append(indice.name)
+
+    return creados
@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, TIMESTAMP, Text
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Enum,
+    TIMESTAMP,
+    Text,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .connection import Base
@@ -60,10 +70,18 @@ class Materia(Base):
 
 class Grupo(Base):
     __tablename__ = "grupos"
+    __table_args__ = (
+        # Grupos de un plan (regeneración incremental)
+        Index("idx_grupo_plan", "plan_estudios_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String(50), nullable=False)
     semestre = Column(Integer, nullable=False)
+    # Plan para el que se generó (NULL en grupos creados a mano o anteriores)
+    plan_estudios_id = Column(
+        Integer, ForeignKey("planes_estudios.id", ondelete="SET NULL"), nullable=True
+    )
     creado_en = Column(TIMESTAMP, server_default=func.now())
 
     asignaciones = relationship("Asignacion", back_populates="grupo")
@@ -114,6 +132,11 @@ class HorarioGenerado(Base):
 
 class Asignacion(Base):
     __tablename__ = "asignaciones"
+    __table_args__ = (
+        # Horario de un grupo / de un maestro ya ordenado por día y hora
+        Index("idx_asignacion_grupo_dia_hora", "grupo_id", "dia_semana", "hora_inicio"),
+        Index("idx_asignacion_maestro_dia_hora", "maestro_id", "dia_semana", "hora_inicio"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     horario_id = Column(
@@ -136,3 +159,18 @@ class Asignacion(Base):
     maestro = relationship("Maestro", back_populates="asignaciones")
     materia = relationship("Materia", back_populates="asignaciones")
     grupo = relationship("Grupo", back_populates="asignaciones")
+
+
+class SnapshotHorario(Base):
+    """JSON precalculado de una vista de horario (ver api/snapshots.py)"""
+
+    __tablename__ = "snapshots_horario"
+    __table_args__ = (
+        UniqueConstraint("tipo", "referencia_id", name="uq_snapshot_tipo_referencia"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(Enum("horario", "grupo", "maestro"), nullable=False)
+    referencia_id = Column(Integer, nullable=False)  # id del horario, grupo o maestro
+    contenido = Column(Text(16777215), nullable=False)  # MEDIUMTEXT en MySQL
+    creado_en = Column(TIMESTAMP, server_default=func.now())
@@ -1,17 +1,96 @@
 # scheduler.pyx - Motor de generación de horarios en Cython
 # cython: language_level=3
 
-from libc.stdlib cimport malloc, free, rand, srand
-from libc.string cimport memset
+from libc.stdlib cimport malloc, realloc, free, qsort
+from libc.string cimport memset, memcpy
 from libc.time cimport time
-import random
+from libc.math cimport exp, pow
+from cpython.bytes cimport PyBytes_FromStringAndSize
+import array
 
 # Constantes
 DEF MAX_MATERIAS = 10          # Máximo de materias diferentes por grupo
 DEF MAX_HORAS_DIA = 8          # Máximo de horas de clase por día
 DEF DIAS_SEMANA = 5            # Lunes a Viernes (sin Sábado)
+DEF MAX_SLOTS = 32             # Máximo de horas (slots) en un día de trabajo
 
-# Estructura para representar una asignación
+# Operaciones de bits (una instrucción en GCC/Clang/MSVC)
+cdef extern from *:
+    """
+    #if defined(_MSC_VER)
+    #include <intrin.h>
+    static __inline int sched_popcount(unsigned int x) { return (int)__popcnt(x); }
+    static __inline int sched_clz(unsigned int x) { unsigned long i; _BitScanReverse(&i, x); return 31 - (int)i; }
+    static __inline int sched_ctz(unsigned int x) { unsigned long i; _BitScanForward(&i, x); return (int)i; }
+    #elif defined(__GNUC__) || defined(__clang__)
+    #define sched_popcount(x) __builtin_popcount(x)
+    #define sched_clz(x) __builtin_clz(x)
+    #define sched_ctz(x) __builtin_ctz(x)
+    #else
+    static int sched_popcount(unsigned int x) { int n = 0; while (x) { x &= x - 1; n++; } return n; }
+    static int sched_clz(unsigned int x) { int n = 0; while (!(x & 0x80000000u)) { x <<= 1; n++; } return n; }
+    static int sched_ctz(unsigned int x) { int n = 0; while (!(x & 1u)) { x >>= 1; n++; } return n; }
+    #endif
+    """
+    int sched_popcount(unsigned int x) nogil
+    int sched_clz(unsigned int x) nogil      # x != 0
+    int sched_ctz(unsigned int x) nogil      # x != 0
+
+# Reloj de pared monotónico en segundos (clock() mide el CPU de todo el
+# proceso, que también gastan los otros hilos de la API)
+cdef extern from *:
+    """
+    #if defined(_WIN32)
+    #ifndef NOMINMAX
+    #define NOMINMAX
+    #endif
+    #define WIN32_LEAN_AND_MEAN
+    #include <windows.h>
+    static double sched_reloj(void) {
+        LARGE_INTEGER frecuencia, contador;
+        QueryPerformanceFrequency(&frecuencia);
+        QueryPerformanceCounter(&contador);
+        return (double)contador.QuadPart / (double)frecuencia.QuadPart;
+    }
+    #else
+    #include <time.h>
+    static double sched_reloj(void) {
+        struct timespec t;
+        clock_gettime(CLOCK_MONOTONIC, &t);
+        return (double)t.tv_sec + (double)t.tv_nsec * 1e-9;
+    }
+    #endif
+    """
+    double sched_reloj() nogil
+
+# Enteros por asignación en el buffer empaquetado
+CAMPOS_ASIGNACION = 6
+
+# Contadores de la pasada voraz (índices de SchedulerEngine.contadores)
+DEF CONTADOR_CANDIDATOS = 0        # maestros candidatos revisados para una materia
+DEF CONTADOR_SIN_MAESTRO = 1       # materias de un grupo sin maestro disponible
+DEF CONTADOR_INTENTOS = 2          # sesiones con maestro que se intentaron colocar
+DEF CONTADOR_COLOCADAS = 3         # sesiones colocadas
+DEF CONTADOR_FIN_TURNO = 4         # sesiones que ya no cupieron en el turno del día
+DEF CONTADOR_DIA_NO_DISPONIBLE = 5 # rechazos: el maestro no trabaja ese día
+DEF CONTADOR_TOPE_SEMANAL = 6      # rechazos: el maestro llegó a su máximo semanal
+DEF CONTADOR_MAESTRO_OCUPADO = 7   # rechazos: el maestro ya tiene clase a esa hora
+DEF CONTADOR_GRUPO_OCUPADO = 8     # rechazos: el grupo ya tiene clase a esa hora
+DEF NUM_CONTADORES = 9
+
+NOMBRES_CONTADORES = [
+    'candidatos_revisados',
+    'materias_sin_maestro',
+    'sesiones_intentadas',
+    'sesiones_colocadas',
+    'fin_de_turno',
+    'dia_no_disponible',
+    'tope_semanal',
+    'maestro_ocupado',
+    'grupo_ocupado',
+]
+
+# Estructura para representar una asignación (registro de salida empaquetado)
 cdef struct Asignacion:
     int maestro_id
     int materia_id
@@ -20,326 +99,2067 @@ cdef struct Asignacion:
     int hora_inicio     # 7-21
     int hora_fin
 
+# Estructuras de entrada ya convertidas a C (una sola vez por llamada)
+cdef struct MaestroC:
+    int id
+    int idx             # índice compacto en las matrices de ocupación
+    int horas_max       # horas máximas por semana
+    unsigned int dias   # máscara de días disponibles (bit 0 = Lunes)
+    int marca           # último grupo que lo tiene asignado (una materia por grupo)
+
+cdef struct MateriaC:
+    int id
+    int horas           # horas semanales (créditos)
+    int inicio          # primer candidato en PlanC.candidatos
+    int num_candidatos
+
+cdef struct GrupoC:
+    int id
+    int idx             # índice compacto en las matrices de ocupación
+    int primera_materia # materias de su cuatrimestre en PlanC.materias
+    int num_materias
+
+# Par (id de la base, índice en PlanC.maestros), ordenado por id
+cdef struct ParIdC:
+    int id
+    int indice
+
+cdef struct PlanC:
+    MaestroC* maestros
+    int num_maestros
+    ParIdC* maestros_por_id  # para buscar un maestro por id sin el GIL
+    MateriaC* materias
+    int num_materias
+    int* candidatos     # maestros (índice en PlanC.maestros) que pueden dar cada materia
+    int num_candidatos
+    GrupoC* grupos
+    int num_grupos
+
+# Sesión de una materia dentro de un día
+cdef struct Sesion:
+    int materia         # índice de la materia dentro de su grupo
+    int duracion
+
+# Modos de generación
+DEF MODO_VORAZ = 0             # Una pasada voraz (rápida, puede dejar horas sin cubrir)
+DEF MODO_EXACTO = 1            # Búsqueda con retroceso: cubre todas las horas o prueba que no se puede
+
+# Resultado del modo exacto
+DEF SOLVER_COMPLETO = 0        # Todas las materias de todos los grupos con sus horas semanales
+DEF SOLVER_IMPOSIBLE = 1       # Probado: no existe horario que cubra todas las horas
+DEF SOLVER_AGOTADO = 2         # Se acabó el presupuesto de nodos/tiempo sin decidir
+DEF SOLVER_FALLA = 3           # (interno) la rama actual ya no tiene solución
+DEF SOLVER_SIGUE = 4           # (interno) la rama sigue abierta
+
+ESTADOS_SOLVER = ('completo', 'imposible', 'presupuesto_agotado')
+
+# Una materia de un grupo que hay que cubrir (variable del modo exacto)
+cdef struct UnidadC:
+    int grupo           # índice en PlanC.grupos
+    int materia         # índice en PlanC.materias
+    int restantes       # horas que faltan por colocar
+    int maestro         # índice en PlanC.maestros o -1 si aún no se elige
+    int colocadas_dia[DIAS_SEMANA]  # horas ya colocadas por día (para repartirlas)
+    int ultima          # última hora colocada (dia * MAX_SLOTS + slot) o -1
+
+# Un valor posible para una unidad: una hora con un maestro en un día/slot
+cdef struct ValorC:
+    int maestro
+    int dia
+    int slot
+    long long prioridad # menor = se intenta primero
+
+# Un nivel de la búsqueda (pila explícita, sin recursión)
+cdef struct NivelC:
+    int unidad
+    int inicio          # primer valor en SolverC.valores
+    int num_valores
+    int siguiente       # próximo valor a intentar
+    bint aplicado       # si `valor` está colocado ahora
+    bint fijo_maestro   # si al colocar `valor` se eligió el maestro de la unidad
+    int ultima          # `ultima` de la unidad antes de colocar `valor`
+    ValorC valor
+
+cdef struct ColocacionC:
+    int unidad
+    ValorC valor
+
+cdef struct SolverC:
+    UnidadC* unidades
+    int num_unidades
+    int* primera_unidad # [grupo] -> primera unidad del grupo (num_grupos + 1 entradas)
+    int* comprometidas  # [maestro] -> horas pendientes de unidades que ya lo eligieron
+    NivelC* niveles
+    ValorC* valores
+    int capacidad_valores
+    ColocacionC* mejor  # colocaciones de la rama más profunda vista
+    int num_mejor
+    int horas_requeridas
+    long long nodos
+    long long max_nodos
+    double max_segundos
+    double inicio       # sched_reloj() al empezar
+
+# Red de flujo en listas de adyacencia; cada arista va seguida de su reversa
+cdef struct RedFlujo:
+    int num_nodos
+    int num_aristas
+    int* cabeza         # [nodo] -> primera arista (-1 si no tiene)
+    int* siguiente      # [arista] -> siguiente arista del mismo nodo
+    int* destino
+    int* capacidad      # capacidad residual
+    int* nivel          # [nodo] -> distancia BFS desde la fuente
+    int* actual         # [nodo] -> próxima arista por explorar en el DFS
+    int* cola
+
+# Pesos de las penalizaciones suaves de la búsqueda local
+DEF PESO_FALTANTE = 100        # Hora requerida sin colocar
+DEF PESO_HUECO = 10            # Hora libre entre dos clases de un grupo en el día
+DEF PESO_REPETIDA = 8          # Hora de una materia de más en un mismo día
+DEF PESO_PARTIDA = 6           # Materia partida en dos bloques el mismo día
+DEF PESO_CARGA = 1             # (horas del maestro en el día)^2: reparte la carga en la semana
+
+# Enfriamiento del recocido simulado
+DEF TEMPERATURA_INICIAL = 10.0
+DEF TEMPERATURA_FINAL = 0.1
+
+# Estado de la búsqueda local (usa las unidades de SolverC)
+cdef struct MejoraC:
+    int* celdas         # [(grupo * DIAS_SEMANA + dia) * num_slots + slot] -> unidad o -1
+    unsigned int* mascaras  # [unidad * DIAS_SEMANA + dia] -> slots de la unidad en el día
+    int* mejor_celdas   # copia de `celdas` en el mejor costo visto
+    int* mejor_maestros # [unidad] -> maestro en el mejor costo visto
+    int num_celdas
+    int faltantes       # horas requeridas sin colocar
+    long long costo
+    long long mejor_costo
+    long long costo_inicial
+    long long iteraciones
+    long long aceptadas
+
 # Clase principal del motor de scheduling
 cdef class SchedulerEngine:
     cdef int num_maestros
     cdef int num_materias
     cdef int num_grupos
-    cdef int[5][14][100] ocupacion_maestros  # [dia][hora_slot][maestro_id] = 1 si ocupado
-    cdef int[5][14][100] ocupacion_grupos    # [dia][hora_slot][grupo_id] = 1 si ocupado
-    cdef int[100] horas_maestro_semana       # [maestro_id] = horas totales usadas en la semana
     cdef int hora_min
     cdef int hora_max
+    cdef int num_slots                          # hora_max - hora_min
+    
+    # Los ids de la base de datos se traducen a índices compactos (0, 1, 2...)
+    # para que las matrices de ocupación midan lo que mide la entrada real
+    cdef dict indice_maestros                   # maestro_id -> índice compacto
+    cdef dict indice_grupos                     # grupo_id -> índice compacto
+    cdef int capacidad_maestros                 # filas reservadas en memoria
+    cdef int capacidad_grupos
+    cdef unsigned int* ocupacion_maestros       # [indice * DIAS_SEMANA + dia] = máscara de slots ocupados (bit = slot)
+    cdef unsigned int* ocupacion_grupos         # [indice * DIAS_SEMANA + dia] = máscara de slots ocupados
+    cdef int* horas_maestro_semana              # [indice] = horas totales usadas en la semana
+    
+    # Resultado de la última generación (buffer empaquetado)
+    cdef Asignacion* asignaciones
+    cdef int num_asignaciones
+    cdef dict resumen                           # datos de la última generación (ver resumen_generacion)
+    cdef unsigned long long estado_aleatorio    # generador propio (xorshift64*), nada global
+    cdef readonly object semilla                # semilla con la que se inició el generador
+    cdef long long contadores[NUM_CONTADORES]   # ver NOMBRES_CONTADORES
+
+    def __cinit__(self):
+        self.ocupacion_maestros = NULL
+        self.ocupacion_grupos = NULL
+        self.horas_maestro_semana = NULL
+        self.asignaciones = NULL
+        self.num_asignaciones = 0
+        self.resumen = {}
+        memset(self.contadores, 0, sizeof(self.contadores))
 
-    def __init__(self, int maestros, int materias, int grupos, int hora_min=7, int hora_max=15):
-        """Inicializa el motor de scheduling"""
+    def __init__(self, int maestros, int materias, int grupos, int hora_min=7, int hora_max=15,
+                 object semilla=None):
+        """
+        Inicializa el motor de scheduling. `semilla` fija el generador
+        aleatorio del motor: con la misma semilla y la misma entrada se obtiene
+        el mismo horario (por defecto se toma de la hora).
+        """
+        if hora_max <= hora_min or hora_max - hora_min > MAX_SLOTS:
+            raise ValueError(f"Rango de horas inválido: {hora_min}-{hora_max}")
+        
         self.num_maestros = maestros
         self.num_materias = materias
         self.num_grupos = grupos
         self.hora_min = hora_min
         self.hora_max = hora_max
-
-        # Inicializar matrices en 0
-        memset(self.ocupacion_maestros, 0, sizeof(self.ocupacion_maestros))
-        memset(self.ocupacion_grupos, 0, sizeof(self.ocupacion_grupos))
-        memset(self.horas_maestro_semana, 0, sizeof(self.horas_maestro_semana))
+        self.num_slots = hora_max - hora_min
+        
+        self.indice_maestros = {}
+        self.indice_grupos = {}
+        
+        # Reservar matrices en 0 del tamaño de la entrada (crecen si hace falta)
+        self.capacidad_maestros = 0
+        self.capacidad_grupos = 0
+        self.reservar_maestros(max(maestros, 1))
+        self.reservar_grupos(max(grupos, 1))
 
         # Inicializar semilla random
-        srand(time(NULL))
+        self.reiniciar_generador(semilla)
+    
+    def __dealloc__(self):
+        free(self.ocupacion_maestros)
+        free(self.ocupacion_grupos)
+        free(self.horas_maestro_semana)
+        free(self.asignaciones)
+    
+    cpdef reiniciar_generador(self, object semilla=None):
+        """
+        Reinicia el generador aleatorio del motor. Cada motor tiene el suyo, de
+        modo que dos generaciones al mismo tiempo no se afectan entre sí.
+        Sin semilla se elige una a partir de la hora (queda en `self.semilla`).
+        """
+        if semilla is None:
+            semilla = (<long long>time(NULL) ^ id(self)) & 0xFFFFFFFF
+        self.semilla = int(semilla)
+        self.estado_aleatorio = sembrar(<unsigned long long>(self.semilla & 0xFFFFFFFFFFFFFFFF))
     
-    cdef bint validar_disponibilidad_maestro(self, int maestro_id, int dia, int hora_inicio, int hora_fin):
+    cdef int reservar_maestros(self, int capacidad) except -1:
+        """Amplía las matrices de maestros a `capacidad` filas (nuevas en 0)"""
+        cdef int fila = DIAS_SEMANA
+        cdef unsigned int* ocupacion
+        cdef int* horas
+        if capacidad <= self.capacidad_maestros:
+            return 0
+        
+        ocupacion = <unsigned int*>realloc(self.ocupacion_maestros, capacidad * fila * sizeof(unsigned int))
+        if ocupacion == NULL:
+            raise MemoryError()
+        self.ocupacion_maestros = ocupacion
+        horas = <int*>realloc(self.horas_maestro_semana, capacidad * sizeof(int))
+        if horas == NULL:
+            raise MemoryError()
+        self.horas_maestro_semana = horas
+        
+        memset(self.ocupacion_maestros + self.capacidad_maestros * fila, 0,
+               (capacidad - self.capacidad_maestros) * fila * sizeof(unsigned int))
+        memset(self.horas_maestro_semana + self.capacidad_maestros, 0,
+               (capacidad - self.capacidad_maestros) * sizeof(int))
+        self.capacidad_maestros = capacidad
+        return 0
+    
+    cdef int reservar_grupos(self, int capacidad) except -1:
+        """Amplía la matriz de grupos a `capacidad` filas (nuevas en 0)"""
+        cdef int fila = DIAS_SEMANA
+        cdef unsigned int* ocupacion
+        if capacidad <= self.capacidad_grupos:
+            return 0
+        
+        ocupacion = <unsigned int*>realloc(self.ocupacion_grupos, capacidad * fila * sizeof(unsigned int))
+        if ocupacion == NULL:
+            raise MemoryError()
+        self.ocupacion_grupos = ocupacion
+        
+        memset(self.ocupacion_grupos + self.capacidad_grupos * fila, 0,
+               (capacidad - self.capacidad_grupos) * fila * sizeof(unsigned int))
+        self.capacidad_grupos = capacidad
+        return 0
+    
+    cdef int indice_maestro(self, int maestro_id) except -1:
+        """Obtiene (o crea) el índice compacto de un maestro"""
+        indice = self.indice_maestros.get(maestro_id)
+        if indice is None:
+            indice = len(self.indice_maestros)
+            if indice >= self.capacidad_maestros:
+                self.reservar_maestros(2 * self.capacidad_maestros)
+            self.indice_maestros[maestro_id] = indice
+        return indice
+    
+    cdef int indice_grupo(self, int grupo_id) except -1:
+        """Obtiene (o crea) el índice compacto de un grupo"""
+        indice = self.indice_grupos.get(grupo_id)
+        if indice is None:
+            indice = len(self.indice_grupos)
+            if indice >= self.capacidad_grupos:
+                self.reservar_grupos(2 * self.capacidad_grupos)
+            self.indice_grupos[grupo_id] = indice
+        return indice
+    
+    cdef inline unsigned int mascara_bloque(self, int hora_inicio, int hora_fin) noexcept nogil:
+        """Máscara con los slots de [hora_inicio, hora_fin) dentro del turno"""
+        cdef int inicio = hora_inicio - self.hora_min
+        cdef int fin = hora_fin - self.hora_min
+        if inicio < 0:
+            inicio = 0
+        if fin > self.num_slots:
+            fin = self.num_slots
+        if fin <= inicio:
+            return 0
+        return (0xFFFFFFFFu >> (32 - (fin - inicio))) << inicio
+    
+    cdef bint validar_disponibilidad_maestro(self, int maestro_idx, int dia, int hora_inicio, int hora_fin) noexcept nogil:
         """Valida que el maestro esté disponible en el horario (no empalmes)"""
-        cdef int hora
-        for hora in range(hora_inicio, hora_fin):
-            if hora - self.hora_min >= 0 and hora - self.hora_min < 14:
-                if self.ocupacion_maestros[dia][hora - self.hora_min][maestro_id] == 1:
-                    return False
-        return True
+        return (self.ocupacion_maestros[maestro_idx * DIAS_SEMANA + dia]
+                & self.mascara_bloque(hora_inicio, hora_fin)) == 0
     
-    cdef bint validar_disponibilidad_grupo(self, int grupo_id, int dia, int hora_inicio, int hora_fin):
+    cdef bint validar_disponibilidad_grupo(self, int grupo_idx, int dia, int hora_inicio, int hora_fin) noexcept nogil:
         """Valida que el grupo esté disponible en el horario (no empalmes)"""
-        cdef int hora
-        for hora in range(hora_inicio, hora_fin):
-            if hora - self.hora_min >= 0 and hora - self.hora_min < 14:
-                if self.ocupacion_grupos[dia][hora - self.hora_min][grupo_id] == 1:
-                    return False
-        return True
+        return (self.ocupacion_grupos[grupo_idx * DIAS_SEMANA + dia]
+                & self.mascara_bloque(hora_inicio, hora_fin)) == 0
     
-    cdef int contar_horas_grupo_dia(self, int grupo_id, int dia):
+    cdef int contar_horas_grupo_dia(self, int grupo_idx, int dia) noexcept nogil:
         """Cuenta cuántas horas tiene el grupo asignadas en un día"""
-        cdef int contador = 0
-        cdef int hora
-        for hora in range(14):  # 14 slots posibles
-            if self.ocupacion_grupos[dia][hora][grupo_id] == 1:
-                contador += 1
-        return contador
+        return sched_popcount(self.ocupacion_grupos[grupo_idx * DIAS_SEMANA + dia])
     
-    cdef int obtener_siguiente_hora_libre(self, int grupo_id, int dia):
+    cdef int obtener_siguiente_hora_libre(self, int grupo_idx, int dia) noexcept nogil:
         """Obtiene la siguiente hora libre continua para el grupo en ese día"""
-        cdef int hora
-        cdef int primera_ocupada = -1
-        cdef int ultima_ocupada = -1
-        
-        # Encontrar primera y última hora ocupada
-        for hora in range(14):
-            if self.ocupacion_grupos[dia][hora][grupo_id] == 1:
-                if primera_ocupada == -1:
-                    primera_ocupada = hora
-                ultima_ocupada = hora
+        cdef unsigned int ocupados = self.ocupacion_grupos[grupo_idx * DIAS_SEMANA + dia]
         
         # Si no hay horas ocupadas, empezar desde el inicio
-        if primera_ocupada == -1:
+        if ocupados == 0:
             return self.hora_min
         
-        # Retornar la siguiente hora después de la última ocupada
-        return self.hora_min + ultima_ocupada + 1
+        # Retornar la siguiente hora después de la última ocupada (bit más alto)
+        return self.hora_min + 32 - sched_clz(ocupados)
     
-    cdef void marcar_ocupado(self, int maestro_id, int grupo_id, int dia, int hora_inicio, int hora_fin):
+    cdef void marcar_ocupado(self, int maestro_idx, int grupo_idx, int dia, int hora_inicio, int hora_fin) noexcept nogil:
         """Marca las horas como ocupadas para maestro y grupo"""
-        cdef int hora
-        cdef int duracion = hora_fin - hora_inicio
-        for hora in range(hora_inicio, hora_fin):
-            if hora - self.hora_min >= 0 and hora - self.hora_min < 14:
-                self.ocupacion_maestros[dia][hora - self.hora_min][maestro_id] = 1
-                self.ocupacion_grupos[dia][hora - self.hora_min][grupo_id] = 1
+        cdef unsigned int mascara = self.mascara_bloque(hora_inicio, hora_fin)
+        self.ocupacion_maestros[maestro_idx * DIAS_SEMANA + dia] |= mascara
+        self.ocupacion_grupos[grupo_idx * DIAS_SEMANA + dia] |= mascara
         # Actualizar contador de horas semanales del maestro
-        if maestro_id < 100:
-            self.horas_maestro_semana[maestro_id] += duracion
+        self.horas_maestro_semana[maestro_idx] += hora_fin - hora_inicio
     
-    cpdef list generar_horario(self, list maestros_data, list materias_data, list grupos_data):
+    cdef int preparar_plan(self, PlanC* plan, list maestros_data, list cuatrimestres_data) except -1:
         """
-        Genera el horario completo distribuyendo materias de forma inteligente:
-        - Máximo 7 materias diferentes por grupo
-        - Distribuye las horas de cada materia en DIFERENTES días (no todo en un día)
-        - Cada día tiene múltiples materias (similar a un horario universitario real)
-        - Un maestro solo puede dar UNA materia a cada grupo
-        - Sin empalmes de horarios
-        - Bloques de 1 hora para mejor distribución
-        
-        Args:
-            maestros_data: Lista de diccionarios con info de maestros
-            materias_data: Lista de diccionarios con info de materias
-            grupos_data: Lista de diccionarios con info de grupos
-        
-        Returns:
-            Lista de asignaciones generadas
+        Convierte la entrada a arreglos C. Es la única parte de la generación
+        que toca objetos Python; todo lo demás corre sin el GIL.
         """
-        cdef list asignaciones = []
-        cdef int max_horas_dia = MAX_HORAS_DIA
-        cdef int max_materias = MAX_MATERIAS
+        cdef int i, j, k, n, dia
+        cdef int total_materias = 0
+        cdef int total_candidatos = 0
+        cdef int total_grupos = 0
+        cdef int primera
+        cdef MaestroC* maestro
+        cdef MateriaC* materia
+        cdef GrupoC* grupo
         
-        # Usar todas las materias (hasta el máximo)
-        materias_a_usar = materias_data[:max_materias] if len(materias_data) > max_materias else materias_data
+        memset(plan, 0, sizeof(PlanC))
+        
+        # Maestros e índice materia_id -> maestros que pueden impartirla
+        plan.num_maestros = len(maestros_data)
+        plan.maestros = <MaestroC*>malloc(max(plan.num_maestros, 1) * sizeof(MaestroC))
+        if plan.maestros == NULL:
+            raise MemoryError()
         
-        # Crear índice de maestros por materia
         maestros_por_materia = {}
-        for maestro in maestros_data:
-            materias_maestro = maestro.get('materias_ids', [])
-            for materia_id in materias_maestro:
+        for i in range(plan.num_maestros):
+            maestro_data = maestros_data[i]
+            maestro = &plan.maestros[i]
+            maestro.id = maestro_data['id']
+            maestro.idx = self.indice_maestro(maestro.id)
+            maestro.horas_max = maestro_data.get('horas_max_semana', 15)  # 15 horas máximo por semana
+            maestro.dias = 0
+            for dia in maestro_data.get('dias_disponibles', [0, 1, 2, 3, 4]):
+                if 0 <= dia < DIAS_SEMANA:
+                    maestro.dias |= 1u << dia
+            maestro.marca = -1
+            for materia_id in maestro_data.get('materias_ids', []):
                 if materia_id not in maestros_por_materia:
                     maestros_por_materia[materia_id] = []
-                maestros_por_materia[materia_id].append(maestro)
+                maestros_por_materia[materia_id].append(i)
         
-        # Mezclar para distribuir carga
-        for materia_id in maestros_por_materia:
-            random.shuffle(maestros_por_materia[materia_id])
+        plan.maestros_por_id = <ParIdC*>malloc(max(plan.num_maestros, 1) * sizeof(ParIdC))
+        if plan.maestros_por_id == NULL:
+            raise MemoryError()
+        for i in range(plan.num_maestros):
+            plan.maestros_por_id[i].id = plan.maestros[i].id
+            plan.maestros_por_id[i].indice = i
+        qsort(plan.maestros_por_id, plan.num_maestros, sizeof(ParIdC), comparar_pares_id)
         
-        # Para cada grupo
-        for grupo in grupos_data:
-            grupo_id = grupo['id']
-            
-            # Diccionario para trackear qué maestro da qué materia a este grupo
-            maestro_por_materia_grupo = {}  # materia_id -> maestro
-            materias_maestro_grupo = {}     # maestro_id -> materia_id (un maestro solo da una materia)
-            
-            # Primero, asignar un maestro a cada materia
-            for materia in materias_a_usar:
-                materia_id = materia['id']
-                
-                if materia_id not in maestros_por_materia:
-                    continue
-                
-                # Buscar un maestro que no esté dando otra materia a este grupo
-                for m in maestros_por_materia[materia_id]:
-                    if m['id'] not in materias_maestro_grupo:
-                        maestro_por_materia_grupo[materia_id] = m
-                        materias_maestro_grupo[m['id']] = materia_id
-                        break
+        # Medir materias (hasta el máximo por cuatrimestre), candidatos y grupos
+        for cuatrimestre in cuatrimestres_data:
+            for materia_data in cuatrimestre['materias'][:MAX_MATERIAS]:
+                total_materias += 1
+                total_candidatos += len(maestros_por_materia.get(materia_data['id'], ()))
+            total_grupos += len(cuatrimestre['grupos'])
+        
+        plan.materias = <MateriaC*>malloc(max(total_materias, 1) * sizeof(MateriaC))
+        plan.candidatos = <int*>malloc(max(total_candidatos, 1) * sizeof(int))
+        plan.grupos = <GrupoC*>malloc(max(total_grupos, 1) * sizeof(GrupoC))
+        if plan.materias == NULL or plan.candidatos == NULL or plan.grupos == NULL:
+            raise MemoryError()
+        
+        k = 0
+        n = 0
+        j = 0
+        for cuatrimestre in cuatrimestres_data:
+            primera = k
+            for materia_data in cuatrimestre['materias'][:MAX_MATERIAS]:
+                materia = &plan.materias[k]
+                materia.id = materia_data['id']
+                materia.horas = materia_data['horas_semanales']  # Los creditos equivalen a horas semanales
+                materia.inicio = n
+                for i in maestros_por_materia.get(materia.id, ()):
+                    plan.candidatos[n] = i
+                    n += 1
+                materia.num_candidatos = n - materia.inicio
+                k += 1
             
-            # Crear lista de materias con sus horas semanales (creditos = horas)
-            materias_con_horas = []
-            for materia in materias_a_usar:
-                materia_id = materia['id']
-                if materia_id not in maestro_por_materia_grupo:
+            for grupo_data in cuatrimestre['grupos']:
+                grupo = &plan.grupos[j]
+                grupo.id = grupo_data['id']
+                grupo.idx = self.indice_grupo(grupo.id)
+                grupo.primera_materia = primera
+                grupo.num_materias = k - primera
+                j += 1
+        
+        plan.num_materias = k
+        plan.num_candidatos = n
+        plan.num_grupos = j
+        return 0
+    
+    cdef int generar_plan_c(self, PlanC* plan, Asignacion* salida) noexcept nogil:
+        """Genera todos los grupos del plan; regresa cuántas asignaciones escribió"""
+        cdef int g
+        cdef int total = 0
+        
+        mezclar_candidatos(plan, &self.estado_aleatorio)
+        
+        for g in range(plan.num_grupos):
+            total += self.generar_grupo_c(plan, g, salida + total)
+        return total
+    
+    cdef int generar_grupo_c(self, PlanC* plan, int g, Asignacion* salida) noexcept nogil:
+        """
+        Genera el horario de un grupo y escribe sus asignaciones en `salida`
+        (a lo más DIAS_SEMANA * num_slots). Regresa cuántas escribió.
+        """
+        cdef GrupoC* grupo = &plan.grupos[g]
+        cdef MateriaC* materia
+        cdef MaestroC* maestro
+        cdef int maestro_de[MAX_MATERIAS]       # materia del grupo -> maestro (índice en plan) o -1
+        cdef int orden[MAX_MATERIAS]            # materias con maestro, más horas primero
+        cdef int num_orden = 0
+        cdef Sesion sesiones[DIAS_SEMANA][MAX_SLOTS]
+        cdef int num_sesiones[DIAS_SEMANA]
+        cdef int horas_por_dia[DIAS_SEMANA]
+        cdef int materia_doble_dia[DIAS_SEMANA]  # Qué materia tiene 2 horas ese día (-1 = ninguna)
+        cdef int horas_disponibles_dia = self.num_slots
+        cdef int k, c, i, d, dia, pos, mejor, mejor_horas_libres, horas_libres
+        cdef int horas_restantes, mejor_dia, menor_carga, duracion, hora_actual, hora_fin
+        cdef unsigned int dias_asignados
+        cdef bint ya_en_dia, agregada
+        cdef Sesion sesion
+        cdef int escritas = 0
+        
+        # Primero, asignar un maestro a cada materia: uno que no esté dando
+        # otra materia a este grupo, prefiriendo al que tenga más horas libres
+        # en la semana (la ocupación se comparte con los demás grupos)
+        for k in range(grupo.num_materias):
+            materia = &plan.materias[grupo.primera_materia + k]
+            mejor = -1
+            mejor_horas_libres = -1
+            for c in range(materia.inicio, materia.inicio + materia.num_candidatos):
+                i = plan.candidatos[c]
+                maestro = &plan.maestros[i]
+                self.contadores[CONTADOR_CANDIDATOS] += 1
+                if maestro.marca == g:
                     continue
-                # Los creditos equivalen a horas semanales
-                horas_semanales = materia['horas_semanales']
-                materias_con_horas.append({
-                    'id': materia_id,
-                    'horas': horas_semanales,
-                    'horas_asignadas': 0  # Para tracking
-                })
-            
-            # ESTRATEGIA REALISTA (como horario universitario real):
-            # - Horario de 7am a 2pm = 7 horas por día (o vespertino 2pm a 10pm = 8 horas)
-            # - Cada materia se repite en múltiples días según sus créditos
-            # - Distribuir las horas para cumplir exactamente los créditos semanales
-            # - Lunes a Sábado disponibles
-            
-            # Calcular horas totales disponibles por semana (7 horas x 6 días = 42)
-            horas_disponibles_dia = self.hora_max - self.hora_min
+                horas_libres = maestro.horas_max - self.horas_maestro_semana[maestro.idx]
+                if horas_libres > mejor_horas_libres:
+                    mejor = i
+                    mejor_horas_libres = horas_libres
             
-            # Calcular total de horas de todas las materias
-            total_horas_materias = 0
-            for m in materias_con_horas:
-                total_horas_materias += m['horas']
+            maestro_de[k] = mejor
+            if mejor == -1:
+                self.contadores[CONTADOR_SIN_MAESTRO] += 1
+                continue
+            plan.maestros[mejor].marca = g
             
-            # Crear sesiones: distribuir materias en los días
-            # Primero asignar 1 hora por día a cada materia (hasta completar sus horas)
-            sesiones_por_dia = [[] for _ in range(DIAS_SEMANA)]  # Lista de (materia_id, duracion)
-            horas_por_dia = [0] * DIAS_SEMANA
-            materia_doble_dia = [-1] * DIAS_SEMANA  # Qué materia tiene 2 horas ese día (-1 = ninguna)
-            
-            # Ordenar materias por horas (más horas primero)
-            for i in range(len(materias_con_horas)):
-                for j in range(i + 1, len(materias_con_horas)):
-                    if materias_con_horas[j]['horas'] > materias_con_horas[i]['horas']:
-                        materias_con_horas[i], materias_con_horas[j] = materias_con_horas[j], materias_con_horas[i]
+            # Ordenar materias por horas (más horas primero, inserción estable)
+            pos = num_orden
+            while pos > 0 and plan.materias[grupo.primera_materia + orden[pos - 1]].horas < materia.horas:
+                orden[pos] = orden[pos - 1]
+                pos -= 1
+            orden[pos] = k
+            num_orden += 1
+        
+        # ESTRATEGIA REALISTA (como horario universitario real):
+        # - Horario de 7am a 2pm = 7 horas por día (o vespertino 2pm a 10pm = 8 horas)
+        # - Cada materia se repite en múltiples días según sus créditos
+        # - Distribuir las horas para cumplir exactamente los créditos semanales
+        for d in range(DIAS_SEMANA):
+            num_sesiones[d] = 0
+            horas_por_dia[d] = 0
+            materia_doble_dia[d] = -1
+        
+        # Primera pasada: asignar 1 hora por día a cada materia
+        for i in range(num_orden):
+            k = orden[i]
+            horas_restantes = plan.materias[grupo.primera_materia + k].horas
+            dias_asignados = 0
             
-            # Primera pasada: asignar 1 hora por día a cada materia
-            for materia_info in materias_con_horas:
-                materia_id = materia_info['id']
-                horas_restantes = materia_info['horas']
-                dias_asignados = set()
+            while horas_restantes > 0:
+                mejor_dia = -1
+                menor_carga = horas_disponibles_dia + 1
                 
-                while horas_restantes > 0:
-                    mejor_dia = -1
-                    menor_carga = horas_disponibles_dia + 1
-                    
-                    # Buscar día sin esta materia y con menos carga
+                # Buscar día sin esta materia y con menos carga
+                for d in range(DIAS_SEMANA):
+                    if not (dias_asignados & (1u << d)) and horas_por_dia[d] < horas_disponibles_dia:
+                        if horas_por_dia[d] < menor_carga:
+                            menor_carga = horas_por_dia[d]
+                            mejor_dia = d
+                
+                # Si todos los días tienen esta materia, permitir repetir
+                if mejor_dia == -1:
                     for d in range(DIAS_SEMANA):
-                        if d not in dias_asignados and horas_por_dia[d] < horas_disponibles_dia:
+                        if horas_por_dia[d] < horas_disponibles_dia:
                             if horas_por_dia[d] < menor_carga:
                                 menor_carga = horas_por_dia[d]
                                 mejor_dia = d
-                    
-                    # Si todos los días tienen esta materia, permitir repetir
-                    if mejor_dia == -1:
-                        for d in range(DIAS_SEMANA):
-                            if horas_por_dia[d] < horas_disponibles_dia:
-                                if horas_por_dia[d] < menor_carga:
-                                    menor_carga = horas_por_dia[d]
-                                    mejor_dia = d
-                    
-                    if mejor_dia != -1:
-                        sesiones_por_dia[mejor_dia].append((materia_id, 1))
-                        horas_por_dia[mejor_dia] += 1
-                        dias_asignados.add(mejor_dia)
-                        horas_restantes -= 1
-                    else:
+                
+                if mejor_dia == -1:
+                    break
+                
+                sesiones[mejor_dia][num_sesiones[mejor_dia]].materia = k
+                sesiones[mejor_dia][num_sesiones[mejor_dia]].duracion = 1
+                num_sesiones[mejor_dia] += 1
+                horas_por_dia[mejor_dia] += 1
+                dias_asignados |= 1u << mejor_dia
+                horas_restantes -= 1
+        
+        # Segunda pasada: si algún día no se llena, agregar más sesiones
+        # Primero convertir UNA materia a 2 horas, luego agregar materias extra
+        for dia in range(DIAS_SEMANA):
+            # Paso 1: Convertir una materia a 2 horas si es necesario
+            if horas_por_dia[dia] < horas_disponibles_dia and materia_doble_dia[dia] == -1:
+                for i in range(num_sesiones[dia]):
+                    if sesiones[dia][i].duracion == 1:
+                        sesiones[dia][i].duracion = 2
+                        horas_por_dia[dia] += 1
+                        materia_doble_dia[dia] = sesiones[dia][i].materia
                         break
             
-            # Segunda pasada: si algún día no llega a 7 horas, agregar más sesiones
-            # Primero convertir UNA materia a 2 horas, luego agregar materias extra
-            for dia in range(DIAS_SEMANA):
-                # Paso 1: Convertir una materia a 2 horas si es necesario
-                if horas_por_dia[dia] < horas_disponibles_dia and materia_doble_dia[dia] == -1:
-                    for idx in range(len(sesiones_por_dia[dia])):
-                        mid, dur = sesiones_por_dia[dia][idx]
-                        if dur == 1:
-                            sesiones_por_dia[dia][idx] = (mid, 2)
-                            horas_por_dia[dia] += 1
-                            materia_doble_dia[dia] = mid
-                            break
+            # Paso 2: Agregar más materias hasta llenar el día
+            while horas_por_dia[dia] < horas_disponibles_dia:
+                agregada = False
                 
-                # Paso 2: Agregar más materias hasta llenar el día
-                while horas_por_dia[dia] < horas_disponibles_dia:
-                    agregada = False
-                    
-                    # Primero intentar materias que no estén en este día
-                    for materia_info in materias_con_horas:
-                        mid = materia_info['id']
-                        ya_en_dia = False
-                        for existing_mid, _ in sesiones_por_dia[dia]:
-                            if existing_mid == mid:
-                                ya_en_dia = True
-                                break
-                        
-                        if not ya_en_dia:
-                            sesiones_por_dia[dia].append((mid, 1))
-                            horas_por_dia[dia] += 1
-                            agregada = True
+                # Primero intentar materias que no estén en este día
+                for i in range(num_orden):
+                    k = orden[i]
+                    ya_en_dia = False
+                    for c in range(num_sesiones[dia]):
+                        if sesiones[dia][c].materia == k:
+                            ya_en_dia = True
                             break
                     
-                    # Si todas ya están, repetir cualquier materia
-                    if not agregada:
-                        if len(materias_con_horas) > 0:
-                            # Rotar por las materias para no repetir siempre la misma
-                            idx_materia = horas_por_dia[dia] % len(materias_con_horas)
-                            mid = materias_con_horas[idx_materia]['id']
-                            sesiones_por_dia[dia].append((mid, 1))
-                            horas_por_dia[dia] += 1
-                        else:
-                            break
+                    if not ya_en_dia:
+                        sesiones[dia][num_sesiones[dia]].materia = k
+                        sesiones[dia][num_sesiones[dia]].duracion = 1
+                        num_sesiones[dia] += 1
+                        horas_por_dia[dia] += 1
+                        agregada = True
+                        break
+                
+                # Si todas ya están, repetir cualquier materia
+                if not agregada:
+                    if num_orden == 0:
+                        break
+                    # Rotar por las materias para no repetir siempre la misma
+                    k = orden[horas_por_dia[dia] % num_orden]
+                    sesiones[dia][num_sesiones[dia]].materia = k
+                    sesiones[dia][num_sesiones[dia]].duracion = 1
+                    num_sesiones[dia] += 1
+                    horas_por_dia[dia] += 1
+        
+        # Ahora asignar las sesiones (bloques continuos) por día
+        for dia in range(DIAS_SEMANA):
+            hora_actual = self.hora_min
             
-            # Copiar a bloques_por_dia
-            bloques_por_dia = []
-            for dia in range(DIAS_SEMANA):
-                bloques_por_dia.append(sesiones_por_dia[dia][:])
+            # Mezclar las sesiones del día para variar el orden
+            for i in range(num_sesiones[dia] - 1, 0, -1):
+                c = aleatorio_en(&self.estado_aleatorio, i + 1)
+                sesion = sesiones[dia][i]
+                sesiones[dia][i] = sesiones[dia][c]
+                sesiones[dia][c] = sesion
             
-            # Ahora asignar las sesiones (bloques continuos) por día
-            for dia in range(DIAS_SEMANA):
-                hora_actual = self.hora_min
+            for i in range(num_sesiones[dia]):
+                k = sesiones[dia][i].materia
+                duracion = sesiones[dia][i].duracion
+                if hora_actual + duracion > self.hora_max:
+                    self.contadores[CONTADOR_FIN_TURNO] += num_sesiones[dia] - i
+                    break
                 
-                # Mezclar las sesiones del día para variar el orden
-                sesiones_dia = bloques_por_dia[dia][:]
-                random.shuffle(sesiones_dia)
+                if maestro_de[k] == -1:
+                    continue
+                self.contadores[CONTADOR_INTENTOS] += 1
+                maestro = &plan.maestros[maestro_de[k]]
                 
-                for materia_id, duracion in sesiones_dia:
-                    if hora_actual + duracion > self.hora_max:
-                        break
-                    
-                    maestro = maestro_por_materia_grupo.get(materia_id)
-                    if not maestro:
-                        continue
-                    
-                    maestro_id = maestro['id']
-                    dias_disponibles = maestro.get('dias_disponibles', [0, 1, 2, 3, 4])
-                    horas_max_semana = maestro.get('horas_max_semana', 15)  # 15 horas máximo por semana
-                    
-                    # Verificar si el maestro puede dar clase este día
-                    if dia not in dias_disponibles:
-                        continue
-                    
-                    # Verificar horas máximas semanales del maestro
-                    horas_usadas_semana = 0
-                    if maestro_id < 100:
-                        horas_usadas_semana = self.horas_maestro_semana[maestro_id]
-                    if horas_usadas_semana + duracion > horas_max_semana:
-                        continue
-                    
-                    hora_fin = hora_actual + duracion
-                    
-                    # Verificar disponibilidad del maestro (sin empalmes) para todo el bloque
-                    if not self.validar_disponibilidad_maestro(maestro_id, dia, hora_actual, hora_fin):
-                        continue
-                    
-                    # Verificar disponibilidad del grupo para todo el bloque
-                    if not self.validar_disponibilidad_grupo(grupo_id, dia, hora_actual, hora_fin):
+                # Verificar si el maestro puede dar clase este día
+                if not (maestro.dias & (1u << dia)):
+                    self.contadores[CONTADOR_DIA_NO_DISPONIBLE] += 1
+                    continue
+                
+                # Verificar horas máximas semanales del maestro
+                if self.horas_maestro_semana[maestro.idx] + duracion > maestro.horas_max:
+                    self.contadores[CONTADOR_TOPE_SEMANAL] += 1
+                    continue
+                
+                hora_fin = hora_actual + duracion
+                
+                # Verificar disponibilidad del maestro (sin empalmes) para todo el bloque
+                if not self.validar_disponibilidad_maestro(maestro.idx, dia, hora_actual, hora_fin):
+                    self.contadores[CONTADOR_MAESTRO_OCUPADO] += 1
+                    continue
+                
+                # Verificar disponibilidad del grupo para todo el bloque
+                if not self.validar_disponibilidad_grupo(grupo.idx, dia, hora_actual, hora_fin):
+                    self.contadores[CONTADOR_GRUPO_OCUPADO] += 1
+                    continue
+                
+                # Realizar la asignación del bloque completo
+                self.marcar_ocupado(maestro.idx, grupo.idx, dia, hora_actual, hora_fin)
+                self.contadores[CONTADOR_COLOCADAS] += 1
+                
+                salida[escritas].maestro_id = maestro.id
+                salida[escritas].materia_id = plan.materias[grupo.primera_materia + k].id
+                salida[escritas].grupo_id = grupo.id
+                salida[escritas].dia_semana = dia
+                salida[escritas].hora_inicio = hora_actual
+                salida[escritas].hora_fin = hora_fin
+                escritas += 1
+                
+                hora_actual = hora_fin
+        
+        return escritas
+    
+    # ==================== MODO EXACTO (RETROCESO) ====================
+
+    cdef int preparar_solver(self, PlanC* plan, SolverC* s, long long max_nodos, double max_segundos) except -1:
+        """Crea una unidad (variable) por cada materia de cada grupo"""
+        cdef int g, k, u, horas
+        cdef int total_unidades = 0
+        cdef GrupoC* grupo
+        cdef UnidadC* unidad
+
+        memset(s, 0, sizeof(SolverC))
+        s.max_nodos = max_nodos
+        s.max_segundos = max_segundos
+
+        for g in range(plan.num_grupos):
+            total_unidades += plan.grupos[g].num_materias
+
+        s.unidades = <UnidadC*>malloc(max(total_unidades, 1) * sizeof(UnidadC))
+        s.primera_unidad = <int*>malloc((plan.num_grupos + 1) * sizeof(int))
+        s.comprometidas = <int*>malloc(max(plan.num_maestros, 1) * sizeof(int))
+        if s.unidades == NULL or s.primera_unidad == NULL or s.comprometidas == NULL:
+            raise MemoryError()
+        memset(s.comprometidas, 0, max(plan.num_maestros, 1) * sizeof(int))
+
+        u = 0
+        for g in range(plan.num_grupos):
+            grupo = &plan.grupos[g]
+            s.primera_unidad[g] = u
+            for k in range(grupo.num_materias):
+                horas = max(plan.materias[grupo.primera_materia + k].horas, 0)
+                unidad = &s.unidades[u]
+                unidad.grupo = g
+                unidad.materia = grupo.primera_materia + k
+                unidad.restantes = horas
+                unidad.maestro = -1
+                memset(unidad.colocadas_dia, 0, sizeof(unidad.colocadas_dia))
+                unidad.ultima = -1
+                s.horas_requeridas += horas
+                u += 1
+        s.primera_unidad[plan.num_grupos] = u
+        s.num_unidades = u
+
+        # Cada nivel coloca una hora: la pila nunca pasa de las horas requeridas
+        s.niveles = <NivelC*>malloc(max(s.horas_requeridas, 1) * sizeof(NivelC))
+        s.mejor = <ColocacionC*>malloc(max(s.horas_requeridas, 1) * sizeof(ColocacionC))
+        s.capacidad_valores = 4096
+        s.valores = <ValorC*>malloc(s.capacidad_valores * sizeof(ValorC))
+        if s.niveles == NULL or s.mejor == NULL or s.valores == NULL:
+            raise MemoryError()
+        return 0
+
+    cdef inline unsigned int libres_comunes(self, PlanC* plan, int g, int t, int dia) noexcept nogil:
+        """Slots del día libres para el grupo y el maestro (0 si el maestro no trabaja ese día)"""
+        cdef MaestroC* maestro = &plan.maestros[t]
+        if not (maestro.dias & (1u << dia)):
+            return 0
+        return (~(self.ocupacion_grupos[plan.grupos[g].idx * DIAS_SEMANA + dia]
+                  | self.ocupacion_maestros[maestro.idx * DIAS_SEMANA + dia])
+                & self.mascara_bloque(self.hora_min, self.hora_max))
+
+    cdef inline unsigned int slots_siguientes(self, int ultima, int dia) noexcept nogil:
+        """
+        Slots del día que van después de la hora `ultima` (todos si es -1). Las
+        horas de una unidad se colocan en orden creciente de (día, slot): así
+        la búsqueda no repite el mismo conjunto de horas en otro orden.
+        """
+        cdef int limite = ultima - dia * MAX_SLOTS
+        if limite < 0:
+            return 0xFFFFFFFFu
+        if limite >= MAX_SLOTS - 1:
+            return 0
+        return ~((2u << limite) - 1)
+
+    cdef inline int horas_libres_maestro(self, PlanC* plan, SolverC* s, int t) noexcept nogil:
+        """Horas de la semana que el maestro aún no tiene usadas ni comprometidas"""
+        return (plan.maestros[t].horas_max - self.horas_maestro_semana[plan.maestros[t].idx]
+                - s.comprometidas[t])
+
+    cdef bint maestro_en_grupo(self, SolverC* s, int g, int t) noexcept nogil:
+        """Si el maestro ya da otra materia al grupo (un maestro, una materia por grupo)"""
+        cdef int u
+        for u in range(s.primera_unidad[g], s.primera_unidad[g + 1]):
+            if s.unidades[u].maestro == t:
+                return True
+        return False
+
+    cdef int capacidad_unidad(self, PlanC* plan, SolverC* s, UnidadC* unidad, int t) noexcept nogil:
+        """Cota de horas que la unidad aún puede recibir si las da el maestro t"""
+        cdef int dia
+        cdef int total = 0
+        cdef int libres = self.horas_libres_maestro(plan, s, t)
+        if unidad.maestro == t:
+            libres += unidad.restantes
+        if libres <= 0:
+            return 0
+        for dia in range(DIAS_SEMANA):
+            total += sched_popcount(self.libres_comunes(plan, unidad.grupo, t, dia)
+                                    & self.slots_siguientes(unidad.ultima, dia))
+        return min(total, libres)
+
+    cdef int revisar(self, PlanC* plan, SolverC* s, int* elegida) noexcept nogil:
+        """
+        Verificación hacia adelante sobre las máscaras de ocupación: cada unidad
+        pendiente debe poder recibir sus horas restantes, cada grupo debe tener
+        slots libres para lo que le falta y cada maestro tiempo para lo que ya
+        se comprometió. Elige la unidad más restringida (menor holgura).
+        """
+        cdef int g, u, c, t, dia, capacidad, capacidad_t, holgura, pendientes, libres
+        cdef int menor_holgura = 0x7FFFFFFF
+        cdef bint pendiente = False
+        cdef UnidadC* unidad
+        cdef MateriaC* materia
+        cdef MaestroC* maestro
+
+        elegida[0] = -1
+        for g in range(plan.num_grupos):
+            pendientes = 0
+            for u in range(s.primera_unidad[g], s.primera_unidad[g + 1]):
+                unidad = &s.unidades[u]
+                if unidad.restantes == 0:
+                    continue
+                pendiente = True
+                pendientes += unidad.restantes
+
+                if unidad.maestro >= 0:
+                    capacidad = self.capacidad_unidad(plan, s, unidad, unidad.maestro)
+                else:
+                    capacidad = 0
+                    materia = &plan.materias[unidad.materia]
+                    for c in range(materia.inicio, materia.inicio + materia.num_candidatos):
+                        t = plan.candidatos[c]
+                        if self.maestro_en_grupo(s, g, t):
+                            continue
+                        capacidad_t = self.capacidad_unidad(plan, s, unidad, t)
+                        if capacidad_t > capacidad:
+                            capacidad = capacidad_t
+
+                holgura = capacidad - unidad.restantes
+                if holgura < 0:
+                    return SOLVER_FALLA
+                if holgura < menor_holgura or (holgura == menor_holgura
+                                               and unidad.restantes > s.unidades[elegida[0]].restantes):
+                    menor_holgura = holgura
+                    elegida[0] = u
+
+            if pendientes > 0:
+                libres = 0
+                for dia in range(DIAS_SEMANA):
+                    libres += sched_popcount(~self.ocupacion_grupos[plan.grupos[g].idx * DIAS_SEMANA + dia]
+                                             & self.mascara_bloque(self.hora_min, self.hora_max))
+                if pendientes > libres:
+                    return SOLVER_FALLA
+
+        # Cada maestro debe tener slots libres para las horas que ya se comprometió a dar
+        for t in range(plan.num_maestros):
+            if s.comprometidas[t] == 0:
+                continue
+            maestro = &plan.maestros[t]
+            libres = 0
+            for dia in range(DIAS_SEMANA):
+                if maestro.dias & (1u << dia):
+                    libres += sched_popcount(~self.ocupacion_maestros[maestro.idx * DIAS_SEMANA + dia]
+                                             & self.mascara_bloque(self.hora_min, self.hora_max))
+            if s.comprometidas[t] > libres:
+                return SOLVER_FALLA
+
+        if not pendiente:
+            return SOLVER_COMPLETO
+        return SOLVER_SIGUE
+
+    cdef int generar_valores(self, PlanC* plan, SolverC* s, NivelC* nivel) noexcept nogil:
+        """
+        Llena los valores (maestro, día, slot) del nivel en orden de preferencia:
+        maestros con más horas libres, días donde la materia tiene menos horas,
+        slots pegados a las clases del grupo (sin huecos), días con menos carga.
+        Solo genera horas posteriores a la última de la unidad (slots_siguientes).
+        Regresa -1 si no hay memoria.
+        """
+        cdef UnidadC* unidad = &s.unidades[nivel.unidad]
+        cdef MateriaC* materia = &plan.materias[unidad.materia]
+        cdef int c, t, dia, slot, carga, hueco, abajo, arriba, libres_t, repetidas
+        cdef int primero = materia.inicio
+        cdef int ultimo = materia.inicio + materia.num_candidatos
+        cdef unsigned int libres, ocupados
+        cdef ValorC* valor
+        cdef ValorC* valores
+
+        nivel.num_valores = 0
+        if unidad.maestro >= 0:
+            primero = 0
+            ultimo = 1
+
+        for c in range(primero, ultimo):
+            if unidad.maestro >= 0:
+                t = unidad.maestro
+            else:
+                t = plan.candidatos[c]
+                if self.maestro_en_grupo(s, unidad.grupo, t):
+                    continue
+                if self.capacidad_unidad(plan, s, unidad, t) < unidad.restantes:
+                    continue
+            libres_t = min(max(self.horas_libres_maestro(plan, s, t), 0), 1023)
+
+            # Repartir la materia en la semana es solo una preferencia (el
+            # orden de los valores), nunca una restricción. Como las horas van
+            # en orden, se cuentan también las que ya no cabrán una por día en
+            # los días que le quedan al maestro.
+            for dia in range(DIAS_SEMANA):
+                libres = (self.libres_comunes(plan, unidad.grupo, t, dia)
+                          & self.slots_siguientes(unidad.ultima, dia))
+                if libres == 0:
+                    continue
+                repetidas = (unidad.colocadas_dia[dia]
+                             + max(unidad.restantes - sched_popcount(plan.maestros[t].dias >> dia), 0))
+                ocupados = self.ocupacion_grupos[plan.grupos[unidad.grupo].idx * DIAS_SEMANA + dia]
+                carga = sched_popcount(ocupados)
+
+                while libres:
+                    slot = sched_ctz(libres)
+                    libres &= libres - 1
+
+                    # Distancia a la clase más cercana del grupo ese día (0 = pegada)
+                    if ocupados == 0:
+                        hueco = slot
+                    else:
+                        hueco = MAX_SLOTS
+                        if ocupados & ((1u << slot) - 1):
+                            abajo = slot - (31 - sched_clz(ocupados & ((1u << slot) - 1))) - 1
+                            hueco = abajo
+                        if slot < 31 and (ocupados >> (slot + 1)):
+                            arriba = sched_ctz(ocupados >> (slot + 1))
+                            if arriba < hueco:
+                                hueco = arriba
+
+                    if nivel.inicio + nivel.num_valores >= s.capacidad_valores:
+                        valores = <ValorC*>realloc(s.valores, 2 * s.capacidad_valores * sizeof(ValorC))
+                        if valores == NULL:
+                            return -1
+                        s.valores = valores
+                        s.capacidad_valores *= 2
+
+                    valor = &s.valores[nivel.inicio + nivel.num_valores]
+                    valor.maestro = t
+                    valor.dia = dia
+                    valor.slot = slot
+                    valor.prioridad = ((<long long>(1023 - libres_t) << 44)
+                                       | (<long long>repetidas << 36)
+                                       | (<long long>hueco << 24)
+                                       | (<long long>carga << 8)
+                                       | slot)
+                    nivel.num_valores += 1
+
+        qsort(&s.valores[nivel.inicio], nivel.num_valores, sizeof(ValorC), comparar_valores)
+        return 0
+
+    cdef void aplicar_valor(self, PlanC* plan, SolverC* s, NivelC* nivel) noexcept nogil:
+        """Coloca una hora de la unidad del nivel (y elige su maestro si aún no tenía)"""
+        cdef UnidadC* unidad = &s.unidades[nivel.unidad]
+        cdef MaestroC* maestro = &plan.maestros[nivel.valor.maestro]
+        cdef unsigned int bit = 1u << nivel.valor.slot
+
+        nivel.fijo_maestro = unidad.maestro == -1
+        if nivel.fijo_maestro:
+            unidad.maestro = nivel.valor.maestro
+            s.comprometidas[nivel.valor.maestro] += unidad.restantes
+
+        self.ocupacion_maestros[maestro.idx * DIAS_SEMANA + nivel.valor.dia] |= bit
+        self.ocupacion_grupos[plan.grupos[unidad.grupo].idx * DIAS_SEMANA + nivel.valor.dia] |= bit
+        self.horas_maestro_semana[maestro.idx] += 1
+        s.comprometidas[nivel.valor.maestro] -= 1
+        unidad.restantes -= 1
+        unidad.colocadas_dia[nivel.valor.dia] += 1
+        nivel.ultima = unidad.ultima
+        unidad.ultima = nivel.valor.dia * MAX_SLOTS + nivel.valor.slot
+        nivel.aplicado = True
+
+    cdef void deshacer_valor(self, PlanC* plan, SolverC* s, NivelC* nivel) noexcept nogil:
+        """Quita la hora colocada por aplicar_valor"""
+        cdef UnidadC* unidad = &s.unidades[nivel.unidad]
+        cdef MaestroC* maestro = &plan.maestros[nivel.valor.maestro]
+        cdef unsigned int bit = 1u << nivel.valor.slot
+
+        self.ocupacion_maestros[maestro.idx * DIAS_SEMANA + nivel.valor.dia] &= ~bit
+        self.ocupacion_grupos[plan.grupos[unidad.grupo].idx * DIAS_SEMANA + nivel.valor.dia] &= ~bit
+        self.horas_maestro_semana[maestro.idx] -= 1
+        s.comprometidas[nivel.valor.maestro] += 1
+        unidad.restantes += 1
+        unidad.colocadas_dia[nivel.valor.dia] -= 1
+        unidad.ultima = nivel.ultima
+
+        if nivel.fijo_maestro:
+            s.comprometidas[nivel.valor.maestro] -= unidad.restantes
+            unidad.maestro = -1
+        nivel.aplicado = False
+
+    cdef void guardar_mejor(self, SolverC* s, int colocadas) noexcept nogil:
+        """Guarda las colocaciones de los niveles [0, colocadas) si es la rama más profunda"""
+        cdef int i
+        if colocadas <= s.num_mejor:
+            return
+        for i in range(colocadas):
+            s.mejor[i].unidad = s.niveles[i].unidad
+            s.mejor[i].valor = s.niveles[i].valor
+        s.num_mejor = colocadas
+
+    cdef int buscar(self, PlanC* plan, SolverC* s) noexcept nogil:
+        """
+        Búsqueda en profundidad con pila explícita. Regresa SOLVER_COMPLETO (la
+        solución queda en s.mejor), SOLVER_IMPOSIBLE si se agotaron todas las
+        ramas o SOLVER_AGOTADO si se acabó el presupuesto de nodos/tiempo.
+        """
+        cdef int profundidad = 0
+        cdef int estado, elegida
+        cdef NivelC* nivel
+        cdef NivelC* siguiente
+
+        estado = self.revisar(plan, s, &elegida)
+        if estado == SOLVER_COMPLETO:
+            return SOLVER_COMPLETO
+        if estado == SOLVER_FALLA:
+            return SOLVER_IMPOSIBLE
+
+        nivel = &s.niveles[0]
+        nivel.unidad = elegida
+        nivel.inicio = 0
+        nivel.siguiente = 0
+        nivel.aplicado = False
+        if self.generar_valores(plan, s, nivel) < 0:
+            return SOLVER_AGOTADO
+
+        while True:
+            nivel = &s.niveles[profundidad]
+            if nivel.aplicado:
+                self.guardar_mejor(s, profundidad + 1)
+                self.deshacer_valor(plan, s, nivel)
+
+            # Sin valores por intentar: regresar al nivel anterior
+            if nivel.siguiente >= nivel.num_valores:
+                if profundidad == 0:
+                    return SOLVER_IMPOSIBLE
+                profundidad -= 1
+                continue
+
+            # Presupuesto de nodos y de tiempo (el reloj se consulta cada 1024 nodos)
+            if s.nodos >= s.max_nodos or (
+                (s.nodos & 1023) == 0
+                and sched_reloj() - s.inicio > s.max_segundos
+            ):
+                return SOLVER_AGOTADO
+
+            nivel.valor = s.valores[nivel.inicio + nivel.siguiente]
+            nivel.siguiente += 1
+            self.aplicar_valor(plan, s, nivel)
+            s.nodos += 1
+
+            estado = self.revisar(plan, s, &elegida)
+            if estado == SOLVER_COMPLETO:
+                self.guardar_mejor(s, profundidad + 1)
+                return SOLVER_COMPLETO
+            if estado == SOLVER_FALLA:
+                continue
+
+            profundidad += 1
+            siguiente = &s.niveles[profundidad]
+            siguiente.unidad = elegida
+            siguiente.inicio = nivel.inicio + nivel.num_valores
+            siguiente.siguiente = 0
+            siguiente.aplicado = False
+            if self.generar_valores(plan, s, siguiente) < 0:
+                return SOLVER_AGOTADO
+
+    cdef long long cota_flujo(self, PlanC* plan, SolverC* s) noexcept nogil:
+        """
+        Cota superior de horas cubribles: flujo máximo de unidades a maestros
+        con las horas libres de cada maestro como capacidad (relajación que
+        ignora días y slots). Si es menor que lo requerido, no hay solución.
+        Regresa -1 si no hay memoria para calcularla.
+        """
+        cdef RedFlujo red
+        cdef int u, c, fuente, sumidero, libres
+        cdef int num_aristas = 0
+        cdef long long flujo
+        cdef UnidadC* unidad
+        cdef MateriaC* materia
+
+        for u in range(s.num_unidades):
+            num_aristas += 1 + plan.materias[s.unidades[u].materia].num_candidatos
+        num_aristas += plan.num_maestros
+
+        # Nodos: fuente, unidades, maestros, sumidero
+        fuente = 0
+        sumidero = 1 + s.num_unidades + plan.num_maestros
+        if red_crear(&red, sumidero + 1, num_aristas) < 0:
+            return -1
+
+        for u in range(s.num_unidades):
+            unidad = &s.unidades[u]
+            red_agregar(&red, fuente, 1 + u, unidad.restantes)
+            materia = &plan.materias[unidad.materia]
+            for c in range(materia.inicio, materia.inicio + materia.num_candidatos):
+                red_agregar(&red, 1 + u, 1 + s.num_unidades + plan.candidatos[c], unidad.restantes)
+        for c in range(plan.num_maestros):
+            libres = plan.maestros[c].horas_max - self.horas_maestro_semana[plan.maestros[c].idx]
+            red_agregar(&red, 1 + s.num_unidades + c, sumidero, max(libres, 0))
+
+        flujo = red_flujo_maximo(&red, fuente, sumidero)
+        red_liberar(&red)
+        return flujo
+
+    cdef int escribir_colocaciones(self, PlanC* plan, SolverC* s, int* dueno, int* maestro_slot,
+                                   Asignacion* salida) noexcept nogil:
+        """
+        Convierte las horas de s.mejor en asignaciones. `dueno` y
+        `maestro_slot` son tablas de trabajo de num_grupos * DIAS_SEMANA * num_slots.
+        """
+        cdef int i, celda
+        cdef int num_celdas = plan.num_grupos * DIAS_SEMANA * self.num_slots
+        cdef ColocacionC* colocacion
+
+        for i in range(num_celdas):
+            dueno[i] = -1
+        for i in range(s.num_mejor):
+            colocacion = &s.mejor[i]
+            celda = ((s.unidades[colocacion.unidad].grupo * DIAS_SEMANA + colocacion.valor.dia)
+                     * self.num_slots + colocacion.valor.slot)
+            dueno[celda] = colocacion.unidad
+            maestro_slot[celda] = colocacion.valor.maestro
+        return self.escribir_tabla(plan, s, dueno, maestro_slot, salida)
+
+    cdef int escribir_tabla(self, PlanC* plan, SolverC* s, int* dueno, int* maestro_slot,
+                            Asignacion* salida) noexcept nogil:
+        """
+        Escribe las asignaciones de una tabla [grupo][día][slot] -> unidad,
+        uniendo horas seguidas de la misma materia y maestro en un solo bloque.
+        """
+        cdef int g, dia, slot, fin, base
+        cdef int escritas = 0
+
+        for g in range(plan.num_grupos):
+            for dia in range(DIAS_SEMANA):
+                base = (g * DIAS_SEMANA + dia) * self.num_slots
+                slot = 0
+                while slot < self.num_slots:
+                    if dueno[base + slot] == -1:
+                        slot += 1
                         continue
-                    
-                    # Realizar la asignación del bloque completo
-                    self.marcar_ocupado(maestro_id, grupo_id, dia, hora_actual, hora_fin)
-                    
-                    asignaciones.append({
-                        'maestro_id': maestro_id,
-                        'materia_id': materia_id,
-                        'grupo_id': grupo_id,
-                        'dia_semana': dia,
-                        'hora_inicio': hora_actual,
-                        'hora_fin': hora_fin
-                    })
-                    
-                    hora_actual = hora_fin
+                    fin = slot + 1
+                    while (fin < self.num_slots and dueno[base + fin] == dueno[base + slot]
+                           and maestro_slot[base + fin] == maestro_slot[base + slot]):
+                        fin += 1
+                    salida[escritas].maestro_id = plan.maestros[maestro_slot[base + slot]].id
+                    salida[escritas].materia_id = plan.materias[s.unidades[dueno[base + slot]].materia].id
+                    salida[escritas].grupo_id = plan.grupos[g].id
+                    salida[escritas].dia_semana = dia
+                    salida[escritas].hora_inicio = self.hora_min + slot
+                    salida[escritas].hora_fin = self.hora_min + fin
+                    escritas += 1
+                    slot = fin
+        return escritas
+
+    cdef int horas_cubiertas(self, PlanC* plan, Asignacion* asignaciones, int n) noexcept nogil:
+        """Horas requeridas que quedaron cubiertas (sin contar horas extra de una materia)"""
+        cdef int i, k, g
+        cdef int total = 0
+        cdef int colocadas[MAX_MATERIAS]
+        cdef GrupoC* grupo
+
+        i = 0
+        for g in range(plan.num_grupos):
+            grupo = &plan.grupos[g]
+            for k in range(grupo.num_materias):
+                colocadas[k] = 0
+            # Las asignaciones de cada grupo quedan juntas y en el orden de los grupos
+            while i < n and asignaciones[i].grupo_id == grupo.id:
+                for k in range(grupo.num_materias):
+                    if plan.materias[grupo.primera_materia + k].id == asignaciones[i].materia_id:
+                        colocadas[k] += asignaciones[i].hora_fin - asignaciones[i].hora_inicio
+                        break
+                i += 1
+            for k in range(grupo.num_materias):
+                total += min(colocadas[k], max(plan.materias[grupo.primera_materia + k].horas, 0))
+        return total
+
+    cdef int resolver_plan_c(self, PlanC* plan, SolverC* s, Asignacion* salida, int* num_salida,
+                             unsigned int* respaldo, int* dueno, int* maestro_slot) noexcept nogil:
+        """
+        Modo exacto completo: cota de flujo, búsqueda con retroceso y, si no se
+        llega a una solución, el mejor resultado entre la rama más profunda y
+        la pasada voraz. Regresa el estado del solver.
+        """
+        cdef int estado, num_voraz
+        cdef long long cota
+        cdef int i
+        cdef size_t celdas_maestros = self.capacidad_maestros * DIAS_SEMANA
+        cdef size_t celdas_grupos = self.capacidad_grupos * DIAS_SEMANA
+
+        s.inicio = sched_reloj()
+        mezclar_candidatos(plan, &self.estado_aleatorio)
+
+        # Respaldo de la ocupación para poder comparar contra la pasada voraz
+        memcpy(respaldo, self.ocupacion_maestros, celdas_maestros * sizeof(unsigned int))
+        memcpy(respaldo + celdas_maestros, self.ocupacion_grupos, celdas_grupos * sizeof(unsigned int))
+        memcpy(respaldo + celdas_maestros + celdas_grupos, self.horas_maestro_semana,
+               self.capacidad_maestros * sizeof(int))
+
+        cota = self.cota_flujo(plan, s)
+        if cota >= 0 and cota < s.horas_requeridas:
+            estado = SOLVER_IMPOSIBLE
+        else:
+            estado = self.buscar(plan, s)
+
+        if estado == SOLVER_COMPLETO:
+            num_salida[0] = self.escribir_colocaciones(plan, s, dueno, maestro_slot, salida)
+            return estado
+
+        # Sin solución completa: quedarse con lo que cubra más horas
+        self.restaurar_ocupacion(respaldo)
+        for i in range(plan.num_maestros):
+            plan.maestros[i].marca = -1
+        num_voraz = self.generar_plan_c(plan, salida)
+
+        if s.num_mejor > self.horas_cubiertas(plan, salida, num_voraz):
+            self.restaurar_ocupacion(respaldo)
+            for i in range(s.num_mejor):
+                self.marcar_ocupado(
+                    plan.maestros[s.mejor[i].valor.maestro].idx,
+                    plan.grupos[s.unidades[s.mejor[i].unidad].grupo].idx,
+                    s.mejor[i].valor.dia,
+                    self.hora_min + s.mejor[i].valor.slot,
+                    self.hora_min + s.mejor[i].valor.slot + 1,
+                )
+            num_salida[0] = self.escribir_colocaciones(plan, s, dueno, maestro_slot, salida)
+        else:
+            num_salida[0] = num_voraz
+
+        # Lo que se regresa cubre todo (p. ej. la pasada voraz tras agotar el
+        # presupuesto): no se reporta como imposible ni agotado
+        if self.horas_cubiertas(plan, salida, num_salida[0]) >= s.horas_requeridas:
+            estado = SOLVER_COMPLETO
+        return estado
+
+    cdef void restaurar_ocupacion(self, unsigned int* respaldo) noexcept nogil:
+        """Regresa la ocupación al respaldo tomado en resolver_plan_c"""
+        cdef size_t celdas_maestros = self.capacidad_maestros * DIAS_SEMANA
+        cdef size_t celdas_grupos = self.capacidad_grupos * DIAS_SEMANA
+        memcpy(self.ocupacion_maestros, respaldo, celdas_maestros * sizeof(unsigned int))
+        memcpy(self.ocupacion_grupos, respaldo + celdas_maestros, celdas_grupos * sizeof(unsigned int))
+        memcpy(self.horas_maestro_semana, respaldo + celdas_maestros + celdas_grupos,
+               self.capacidad_maestros * sizeof(int))
+
+    # ==================== BÚSQUEDA LOCAL (RECOCIDO SIMULADO) ====================
+
+    cdef int reservar_mejora(self, PlanC* plan, SolverC* s, MejoraC* m) except -1:
+        """Reserva las tablas de la búsqueda local"""
+        memset(m, 0, sizeof(MejoraC))
+        m.num_celdas = plan.num_grupos * DIAS_SEMANA * self.num_slots
+        m.celdas = <int*>malloc(max(m.num_celdas, 1) * sizeof(int))
+        m.mejor_celdas = <int*>malloc(max(m.num_celdas, 1) * sizeof(int))
+        m.mascaras = <unsigned int*>malloc(max(s.num_unidades, 1) * DIAS_SEMANA * sizeof(unsigned int))
+        m.mejor_maestros = <int*>malloc(max(s.num_unidades, 1) * sizeof(int))
+        if m.celdas == NULL or m.mejor_celdas == NULL or m.mascaras == NULL or m.mejor_maestros == NULL:
+            raise MemoryError()
+        return 0
+
+    cdef void cargar_mejora(self, PlanC* plan, SolverC* s, MejoraC* m,
+                            Asignacion* asignaciones, int n) noexcept nogil:
+        """
+        Pasa las asignaciones generadas a la tabla de celdas (la ocupación del
+        motor ya las incluye) y calcula el costo inicial.
+        """
+        cdef int i, g, k, u, t, dia, hora
+        cdef UnidadC* unidad
+
+        for i in range(m.num_celdas):
+            m.celdas[i] = -1
+        memset(m.mascaras, 0, max(s.num_unidades, 1) * DIAS_SEMANA * sizeof(unsigned int))
+        memset(s.comprometidas, 0, max(plan.num_maestros, 1) * sizeof(int))
+        for u in range(s.num_unidades):
+            unidad = &s.unidades[u]
+            unidad.restantes = max(plan.materias[unidad.materia].horas, 0)
+            unidad.maestro = -1
+            memset(unidad.colocadas_dia, 0, sizeof(unidad.colocadas_dia))
+
+        # Las asignaciones de cada grupo quedan juntas y en el orden de los grupos
+        i = 0
+        for g in range(plan.num_grupos):
+            while i < n and asignaciones[i].grupo_id == plan.grupos[g].id:
+                u = -1
+                for k in range(s.primera_unidad[g], s.primera_unidad[g + 1]):
+                    if plan.materias[s.unidades[k].materia].id == asignaciones[i].materia_id:
+                        u = k
+                        break
+                t = buscar_maestro(plan, asignaciones[i].maestro_id)
+                if u >= 0 and t >= 0:
+                    unidad = &s.unidades[u]
+                    unidad.maestro = t
+                    dia = asignaciones[i].dia_semana
+                    for hora in range(asignaciones[i].hora_inicio, asignaciones[i].hora_fin):
+                        m.celdas[(g * DIAS_SEMANA + dia) * self.num_slots + hora - self.hora_min] = u
+                        m.mascaras[u * DIAS_SEMANA + dia] |= 1u << (hora - self.hora_min)
+                        unidad.colocadas_dia[dia] += 1
+                        unidad.restantes -= 1
+                i += 1
+
+        m.faltantes = 0
+        for u in range(s.num_unidades):
+            if s.unidades[u].restantes > 0:
+                m.faltantes += s.unidades[u].restantes
+        m.costo = self.evaluar_mejora(plan, s, m, NULL)
+        m.costo_inicial = m.costo
+        m.mejor_costo = m.costo
+        self.guardar_mejora(s, m)
+
+    cdef inline long long costo_grupo_dia(self, PlanC* plan, int g, int dia) noexcept nogil:
+        return PESO_HUECO * huecos_mascara(self.ocupacion_grupos[plan.grupos[g].idx * DIAS_SEMANA + dia])
+
+    cdef inline long long costo_unidad_dia(self, PlanC* plan, SolverC* s, MejoraC* m, int u, int dia) noexcept nogil:
+        cdef unsigned int mascara = m.mascaras[u * DIAS_SEMANA + dia]
+        cdef int limite = max(1, (plan.materias[s.unidades[u].materia].horas + DIAS_SEMANA - 1) // DIAS_SEMANA)
+        if mascara == 0:
+            return 0
+        return (PESO_REPETIDA * max(0, sched_popcount(mascara) - limite)
+                + PESO_PARTIDA * (bloques_mascara(mascara) - 1))
+
+    cdef inline long long costo_maestro_dia(self, PlanC* plan, int t, int dia) noexcept nogil:
+        cdef long long horas = sched_popcount(self.ocupacion_maestros[plan.maestros[t].idx * DIAS_SEMANA + dia])
+        return PESO_CARGA * horas * horas
+
+    cdef long long costo_movimiento(self, PlanC* plan, SolverC* s, MejoraC* m, int g, int d1, int d2,
+                                    int u1, int u2, int t1, int t2) noexcept nogil:
+        """
+        Costo de los componentes que toca un movimiento dentro del grupo g entre
+        los días d1 y d2 (unidades y maestros -1 se ignoran). Es O(1): solo lee
+        máscaras de ocupación, así el delta es costo después - costo antes.
+        """
+        cdef long long total = self.costo_grupo_dia(plan, g, d1)
+        if d2 != d1:
+            total += self.costo_grupo_dia(plan, g, d2)
+        if u1 >= 0:
+            total += self.costo_unidad_dia(plan, s, m, u1, d1)
+            if d2 != d1:
+                total += self.costo_unidad_dia(plan, s, m, u1, d2)
+        if u2 >= 0 and u2 != u1:
+            total += self.costo_unidad_dia(plan, s, m, u2, d1)
+            if d2 != d1:
+                total += self.costo_unidad_dia(plan, s, m, u2, d2)
+        if t1 >= 0:
+            total += self.costo_maestro_dia(plan, t1, d1)
+            if d2 != d1:
+                total += self.costo_maestro_dia(plan, t1, d2)
+        if t2 >= 0 and t2 != t1:
+            total += self.costo_maestro_dia(plan, t2, d1)
+            if d2 != d1:
+                total += self.costo_maestro_dia(plan, t2, d2)
+        return total
+
+    cdef long long evaluar_mejora(self, PlanC* plan, SolverC* s, MejoraC* m, long long* conteos) noexcept nogil:
+        """
+        Costo total del horario actual. Si `conteos` no es NULL recibe, en orden,
+        horas faltantes, huecos, horas repetidas, materias partidas y carga.
+        """
+        cdef int u, dia, limite
+        cdef unsigned int mascara
+        cdef long long repetidas = 0
+        cdef long long partidas = 0
+
+        for u in range(s.num_unidades):
+            limite = max(1, (plan.materias[s.unidades[u].materia].horas + DIAS_SEMANA - 1) // DIAS_SEMANA)
+            for dia in range(DIAS_SEMANA):
+                mascara = m.mascaras[u * DIAS_SEMANA + dia]
+                if mascara:
+                    repetidas += max(0, sched_popcount(mascara) - limite)
+                    partidas += bloques_mascara(mascara) - 1
+        return self.costo_total(plan, m.faltantes, repetidas, partidas, conteos)
+
+    cdef long long penalizaciones_c(self, PlanC* plan, Asignacion* asignaciones, int n,
+                                    long long* conteos) noexcept nogil:
+        """
+        Mismo costo que evaluar_mejora pero directo de las asignaciones, sin
+        las tablas de la búsqueda local (cuando no se optimiza)
+        """
+        cdef int i, g, k, dia, hora, limite
+        cdef unsigned int mascara
+        cdef long long faltantes = 0
+        cdef long long repetidas = 0
+        cdef long long partidas = 0
+        cdef unsigned int mascaras[MAX_MATERIAS][DIAS_SEMANA]
+        cdef int colocadas[MAX_MATERIAS]
+        cdef GrupoC* grupo
+
+        # Las asignaciones de cada grupo quedan juntas y en el orden de los grupos
+        i = 0
+        for g in range(plan.num_grupos):
+            grupo = &plan.grupos[g]
+            memset(mascaras, 0, sizeof(mascaras))
+            memset(colocadas, 0, sizeof(colocadas))
+            while i < n and asignaciones[i].grupo_id == grupo.id:
+                for k in range(grupo.num_materias):
+                    if plan.materias[grupo.primera_materia + k].id == asignaciones[i].materia_id:
+                        dia = asignaciones[i].dia_semana
+                        for hora in range(asignaciones[i].hora_inicio, asignaciones[i].hora_fin):
+                            mascaras[k][dia] |= 1u << (hora - self.hora_min)
+                            colocadas[k] += 1
+                        break
+                i += 1
+            for k in range(grupo.num_materias):
+                limite = max(1, (plan.materias[grupo.primera_materia + k].horas + DIAS_SEMANA - 1) // DIAS_SEMANA)
+                faltantes += max(plan.materias[grupo.primera_materia + k].horas - colocadas[k], 0)
+                for dia in range(DIAS_SEMANA):
+                    mascara = mascaras[k][dia]
+                    if mascara:
+                        repetidas += max(0, sched_popcount(mascara) - limite)
+                        partidas += bloques_mascara(mascara) - 1
+        return self.costo_total(plan, faltantes, repetidas, partidas, conteos)
+
+    cdef long long costo_total(self, PlanC* plan, long long faltantes, long long repetidas,
+                               long long partidas, long long* conteos) noexcept nogil:
+        """Suma huecos y carga (de la ocupación) a los demás componentes del costo"""
+        cdef int g, t, dia
+        cdef long long huecos = 0
+        cdef long long carga = 0
+        cdef long long horas
+
+        for g in range(plan.num_grupos):
+            for dia in range(DIAS_SEMANA):
+                huecos += huecos_mascara(self.ocupacion_grupos[plan.grupos[g].idx * DIAS_SEMANA + dia])
+        for t in range(plan.num_maestros):
+            for dia in range(DIAS_SEMANA):
+                horas = sched_popcount(self.ocupacion_maestros[plan.maestros[t].idx * DIAS_SEMANA + dia])
+                carga += horas * horas
+
+        if conteos != NULL:
+            conteos[0] = faltantes
+            conteos[1] = huecos
+            conteos[2] = repetidas
+            conteos[3] = partidas
+            conteos[4] = carga
+
+        return (PESO_FALTANTE * faltantes + PESO_HUECO * huecos + PESO_REPETIDA * repetidas
+                + PESO_PARTIDA * partidas + PESO_CARGA * carga)
+
+    cdef inline void poner_hora(self, PlanC* plan, SolverC* s, MejoraC* m, int u, int g, int dia, int slot) noexcept nogil:
+        """Coloca una hora de la unidad u (con su maestro) en la celda del grupo g"""
+        cdef UnidadC* unidad = &s.unidades[u]
+        cdef MaestroC* maestro = &plan.maestros[unidad.maestro]
+        cdef unsigned int bit = 1u << slot
+        self.ocupacion_maestros[maestro.idx * DIAS_SEMANA + dia] |= bit
+        self.ocupacion_grupos[plan.grupos[g].idx * DIAS_SEMANA + dia] |= bit
+        self.horas_maestro_semana[maestro.idx] += 1
+        m.mascaras[u * DIAS_SEMANA + dia] |= bit
+        m.celdas[(g * DIAS_SEMANA + dia) * self.num_slots + slot] = u
+        unidad.colocadas_dia[dia] += 1
+        unidad.restantes -= 1
+
+    cdef inline void quitar_hora(self, PlanC* plan, SolverC* s, MejoraC* m, int u, int g, int dia, int slot) noexcept nogil:
+        """Quita la hora colocada por poner_hora"""
+        cdef UnidadC* unidad = &s.unidades[u]
+        cdef MaestroC* maestro = &plan.maestros[unidad.maestro]
+        cdef unsigned int bit = 1u << slot
+        self.ocupacion_maestros[maestro.idx * DIAS_SEMANA + dia] &= ~bit
+        self.ocupacion_grupos[plan.grupos[g].idx * DIAS_SEMANA + dia] &= ~bit
+        self.horas_maestro_semana[maestro.idx] -= 1
+        m.mascaras[u * DIAS_SEMANA + dia] &= ~bit
+        m.celdas[(g * DIAS_SEMANA + dia) * self.num_slots + slot] = -1
+        unidad.colocadas_dia[dia] -= 1
+        unidad.restantes += 1
+
+    cdef inline bint celda_libre(self, PlanC* plan, int t, int g, int dia, int slot) noexcept nogil:
+        """Si el maestro trabaja ese día y tanto él como el grupo están libres en el slot"""
+        return (self.libres_comunes(plan, g, t, dia) >> slot) & 1
+
+    cdef inline bint aceptar(self, long long delta, double temperatura) noexcept nogil:
+        """Criterio de Metropolis: siempre si mejora, a veces si empeora"""
+        if delta <= 0:
+            return True
+        return aleatorio_real(&self.estado_aleatorio) < exp(-delta / temperatura)
+
+    cdef void guardar_mejora(self, SolverC* s, MejoraC* m) noexcept nogil:
+        """Copia el horario actual como el mejor visto"""
+        cdef int u
+        memcpy(m.mejor_celdas, m.celdas, m.num_celdas * sizeof(int))
+        for u in range(s.num_unidades):
+            m.mejor_maestros[u] = s.unidades[u].maestro
+        m.mejor_costo = m.costo
+
+    cdef void restaurar_mejora(self, PlanC* plan, SolverC* s, MejoraC* m) noexcept nogil:
+        """Regresa al mejor horario visto (quita todas las horas y pone las guardadas)"""
+        cdef int i, g, dia, slot, u
+        for i in range(m.num_celdas):
+            if m.celdas[i] >= 0:
+                g = i // (DIAS_SEMANA * self.num_slots)
+                dia = (i // self.num_slots) % DIAS_SEMANA
+                self.quitar_hora(plan, s, m, m.celdas[i], g, dia, i % self.num_slots)
+        for u in range(s.num_unidades):
+            s.unidades[u].maestro = m.mejor_maestros[u]
+        m.faltantes = 0
+        for i in range(m.num_celdas):
+            if m.mejor_celdas[i] >= 0:
+                g = i // (DIAS_SEMANA * self.num_slots)
+                dia = (i // self.num_slots) % DIAS_SEMANA
+                self.poner_hora(plan, s, m, m.mejor_celdas[i], g, dia, i % self.num_slots)
+        for u in range(s.num_unidades):
+            if s.unidades[u].restantes > 0:
+                m.faltantes += s.unidades[u].restantes
+        m.costo = m.mejor_costo
+
+    cdef bint intentar_llenar(self, PlanC* plan, SolverC* s, MejoraC* m, double temperatura) noexcept nogil:
+        """Movimiento: colocar una hora faltante de alguna materia"""
+        cdef int inicio, i, u, c, t, dia, slot, g
+        cdef int libres_bits
+        cdef bint nuevo_maestro
+        cdef unsigned int libres
+        cdef long long antes, delta
+        cdef UnidadC* unidad
+        cdef MateriaC* materia
+
+        # Unidad con horas faltantes, empezando en un punto al azar
+        inicio = aleatorio_en(&self.estado_aleatorio, s.num_unidades)
+        u = -1
+        for i in range(s.num_unidades):
+            if s.unidades[(inicio + i) % s.num_unidades].restantes > 0:
+                u = (inicio + i) % s.num_unidades
+                break
+        if u < 0:
+            return False
+        unidad = &s.unidades[u]
+        g = unidad.grupo
+
+        # Maestro: el de la unidad o un candidato al azar que no dé otra materia al grupo
+        nuevo_maestro = unidad.maestro < 0
+        if nuevo_maestro:
+            materia = &plan.materias[unidad.materia]
+            if materia.num_candidatos == 0:
+                return False
+            c = materia.inicio + aleatorio_en(&self.estado_aleatorio, materia.num_candidatos)
+            t = plan.candidatos[c]
+            if self.maestro_en_grupo(s, g, t):
+                return False
+        else:
+            t = unidad.maestro
+        if self.horas_libres_maestro(plan, s, t) <= 0:
+            return False
+
+        # Slot libre al azar en un día al azar
+        dia = aleatorio_en(&self.estado_aleatorio, DIAS_SEMANA)
+        libres = self.libres_comunes(plan, g, t, dia)
+        if libres == 0:
+            return False
+        libres_bits = aleatorio_en(&self.estado_aleatorio, sched_popcount(libres))
+        for i in range(libres_bits):
+            libres &= libres - 1
+        slot = sched_ctz(libres)
+
+        antes = self.costo_movimiento(plan, s, m, g, dia, dia, u, -1, t, -1)
+        unidad.maestro = t
+        self.poner_hora(plan, s, m, u, g, dia, slot)
+        delta = self.costo_movimiento(plan, s, m, g, dia, dia, u, -1, t, -1) - antes - PESO_FALTANTE
+        if not self.aceptar(delta, temperatura):
+            self.quitar_hora(plan, s, m, u, g, dia, slot)
+            if nuevo_maestro:
+                unidad.maestro = -1
+            return False
+        m.faltantes -= 1
+        m.costo += delta
+        return True
+
+    cdef bint intentar_mover(self, PlanC* plan, SolverC* s, MejoraC* m, double temperatura) noexcept nogil:
+        """Movimiento: mover una hora a una celda libre o intercambiar dos horas de un grupo"""
+        cdef int g = aleatorio_en(&self.estado_aleatorio, plan.num_grupos)
+        cdef int d1 = aleatorio_en(&self.estado_aleatorio, DIAS_SEMANA)
+        cdef int s1 = aleatorio_en(&self.estado_aleatorio, self.num_slots)
+        cdef int d2 = aleatorio_en(&self.estado_aleatorio, DIAS_SEMANA)
+        cdef int s2 = aleatorio_en(&self.estado_aleatorio, self.num_slots)
+        cdef int base = g * DIAS_SEMANA * self.num_slots
+        cdef int u1 = m.celdas[base + d1 * self.num_slots + s1]
+        cdef int u2 = m.celdas[base + d2 * self.num_slots + s2]
+        cdef int t1, t2, tmp
+        cdef bint posible
+        cdef long long antes, delta
+
+        if u1 == u2:
+            return False
+        if u1 < 0:
+            # Que la hora que se mueve quede siempre en (d1, s1)
+            d1, d2 = d2, d1
+            s1, s2 = s2, s1
+            tmp = u1
+            u1 = u2
+            u2 = tmp
+        t1 = s.unidades[u1].maestro
+        t2 = s.unidades[u2].maestro if u2 >= 0 else -1
+
+        antes = self.costo_movimiento(plan, s, m, g, d1, d2, u1, u2, t1, t2)
+        self.quitar_hora(plan, s, m, u1, g, d1, s1)
+        if u2 >= 0:
+            self.quitar_hora(plan, s, m, u2, g, d2, s2)
+
+        posible = self.celda_libre(plan, t1, g, d2, s2)
+        if posible and u2 >= 0:
+            posible = self.celda_libre(plan, t2, g, d1, s1)
+        if not posible:
+            self.poner_hora(plan, s, m, u1, g, d1, s1)
+            if u2 >= 0:
+                self.poner_hora(plan, s, m, u2, g, d2, s2)
+            return False
+
+        self.poner_hora(plan, s, m, u1, g, d2, s2)
+        if u2 >= 0:
+            self.poner_hora(plan, s, m, u2, g, d1, s1)
+        delta = self.costo_movimiento(plan, s, m, g, d1, d2, u1, u2, t1, t2) - antes
+        if not self.aceptar(delta, temperatura):
+            self.quitar_hora(plan, s, m, u1, g, d2, s2)
+            if u2 >= 0:
+                self.quitar_hora(plan, s, m, u2, g, d1, s1)
+            self.poner_hora(plan, s, m, u1, g, d1, s1)
+            if u2 >= 0:
+                self.poner_hora(plan, s, m, u2, g, d2, s2)
+            return False
+        m.costo += delta
+        return True
+
+    cdef void optimizar_c(self, PlanC* plan, SolverC* s, MejoraC* m, long long iteraciones,
+                          double max_segundos) noexcept nogil:
+        """
+        Recocido simulado sobre el horario cargado: mueve, intercambia y
+        completa horas mientras baja la temperatura, y al final se queda con el
+        mejor horario visto. Se detiene al llegar a `iteraciones` o `max_segundos`.
+        """
+        cdef long long i
+        cdef bint aceptado
+        cdef double temperatura = TEMPERATURA_INICIAL
+        cdef double enfriamiento
+        cdef double inicio = sched_reloj()
+
+        if iteraciones <= 0 or plan.num_grupos == 0 or s.num_unidades == 0:
+            return
+        enfriamiento = pow(TEMPERATURA_FINAL / TEMPERATURA_INICIAL, 1.0 / iteraciones)
+
+        for i in range(iteraciones):
+            if (i & 255) == 0 and sched_reloj() - inicio > max_segundos:
+                break
+            m.iteraciones += 1
+            if m.faltantes > 0 and aleatorio_en(&self.estado_aleatorio, 4) == 0:
+                aceptado = self.intentar_llenar(plan, s, m, temperatura)
+            else:
+                aceptado = self.intentar_mover(plan, s, m, temperatura)
+            if aceptado:
+                m.aceptadas += 1
+                if m.costo < m.mejor_costo:
+                    self.guardar_mejora(s, m)
+            temperatura *= enfriamiento
+
+        if m.costo > m.mejor_costo:
+            self.restaurar_mejora(plan, s, m)
+
+    cdef int escribir_mejora(self, PlanC* plan, SolverC* s, MejoraC* m, int* maestro_slot,
+                             Asignacion* salida) noexcept nogil:
+        """Escribe el horario de la búsqueda local como asignaciones"""
+        cdef int i
+        for i in range(m.num_celdas):
+            if m.celdas[i] >= 0:
+                maestro_slot[i] = s.unidades[m.celdas[i]].maestro
+        return self.escribir_tabla(plan, s, m.celdas, maestro_slot, salida)
+
+    cpdef int ocupar(self, list asignaciones) except -1:
+        """
+        Marca como ocupadas asignaciones que ya existen (las de los grupos que
+        no se regeneran) para que las siguientes generaciones las respeten:
+        sus maestros no se empalman con ellas ni pasan su máximo semanal.
+        Recibe diccionarios como los de lista_asignaciones; regresa cuántas marcó.
+        """
+        cdef int marcadas = 0
+        cdef int dia
+        for asignacion in asignaciones:
+            dia = asignacion['dia_semana']
+            if dia < 0 or dia >= DIAS_SEMANA:
+                continue
+            self.marcar_ocupado(
+                self.indice_maestro(asignacion['maestro_id']),
+                self.indice_grupo(asignacion['grupo_id']),
+                dia,
+                asignacion['hora_inicio'],
+                asignacion['hora_fin'],
+            )
+            marcadas += 1
+        return marcadas
+
+    cpdef list generar_horario(self, list maestros_data, list materias_data, list grupos_data):
+        """
+        Genera el horario completo distribuyendo materias de forma inteligente:
+        - Máximo 7 materias diferentes por grupo
+        - Distribuye las horas de cada materia en DIFERENTES días (no todo en un día)
+        - Cada día tiene múltiples materias (similar a un horario universitario real)
+        - Un maestro solo puede dar UNA materia a cada grupo
+        - Sin empalmes de horarios
+        - Bloques de 1 hora para mejor distribución
+        
+        Args:
+            maestros_data: Lista de diccionarios con info de maestros
+            materias_data: Lista de diccionarios con info de materias
+            grupos_data: Lista de diccionarios con info de grupos
+        
+        Returns:
+            Lista de asignaciones generadas
+        """
+        return self.generar_horario_plan(
+            maestros_data, [{'materias': materias_data, 'grupos': grupos_data}]
+        )
+    
+    cpdef generar_horario_plan(self, list maestros_data, list cuatrimestres_data, bint empaquetado=False,
+                               str modo='voraz', long long max_nodos=200000, double max_segundos=5.0,
+                               long long optimizar_iteraciones=0, double optimizar_segundos=1.0):
+        """
+        Genera en UNA sola llamada los horarios de todos los grupos de un plan.
+        
+        La ocupación de maestros y sus horas semanales se comparten entre todos
+        los grupos y cuatrimestres, de modo que un maestro nunca queda empalmado
+        entre dos grupos ni excede su máximo de horas en la semana. La entrada
+        se convierte una sola vez a arreglos C y la generación corre sin el GIL.
+        
+        Modos:
+        - 'voraz': una pasada voraz; rápida pero puede dejar horas sin cubrir
+        - 'exacto': búsqueda con retroceso y verificación hacia adelante que
+          cubre todas las horas de todas las materias, o prueba que no existe
+          tal horario. Si se acaba el presupuesto (max_nodos / max_segundos)
+          regresa lo mejor encontrado. Ver resumen_generacion().
+        
+        Con optimizar_iteraciones > 0 el horario generado pasa por una búsqueda
+        local (recocido simulado) que mueve e intercambia horas para reducir
+        huecos, materias repetidas o partidas en un día, carga desigual de los
+        maestros y horas sin cubrir, sin romper ninguna restricción dura.
+        
+        Args:
+            maestros_data: Lista de diccionarios con info de maestros
+            cuatrimestres_data: Lista de diccionarios, uno por cuatrimestre:
+                {'cuatrimestre': int, 'materias': [...], 'grupos': [...]}
+            empaquetado: Si es True regresa el buffer empaquetado (ver
+                asignaciones_empaquetadas) en lugar de la lista de diccionarios
+            modo: 'voraz' o 'exacto'
+            max_nodos: Máximo de horas colocadas por la búsqueda (modo exacto)
+            max_segundos: Tiempo máximo de la búsqueda (modo exacto)
+            optimizar_iteraciones: Movimientos de la búsqueda local (0 = sin ella)
+            optimizar_segundos: Tiempo máximo de la búsqueda local
+        
+        Returns:
+            Lista de asignaciones generadas para todos los grupos
+        """
+        cdef PlanC plan
+        cdef SolverC solver
+        cdef MejoraC mejora
+        cdef Asignacion* salida
+        cdef unsigned int* respaldo = NULL
+        cdef int* dueno = NULL
+        cdef int* maestro_slot = NULL
+        cdef int capacidad, g, k, c, estado = SOLVER_COMPLETO
+        cdef int horas_requeridas = 0
+        cdef int num_salida = 0
+        cdef int modo_c
+        cdef double inicio
+        cdef double inicio_mejora
+        cdef long long conteos[5]
+        cdef long long costo
+        cdef list sin_maestro = []
         
+        if modo == 'voraz':
+            modo_c = MODO_VORAZ
+        elif modo == 'exacto':
+            modo_c = MODO_EXACTO
+        else:
+            raise ValueError(f"Modo de generación inválido: {modo}")
+        
+        memset(&plan, 0, sizeof(PlanC))
+        memset(&solver, 0, sizeof(SolverC))
+        memset(&mejora, 0, sizeof(MejoraC))
+        memset(self.contadores, 0, sizeof(self.contadores))
+        try:
+            self.preparar_plan(&plan, maestros_data, cuatrimestres_data)
+            
+            # Cada grupo escribe a lo más una sesión por slot de la semana
+            capacidad = max(plan.num_grupos * DIAS_SEMANA * self.num_slots, 1)
+            salida = <Asignacion*>malloc(capacidad * sizeof(Asignacion))
+            if salida == NULL:
+                raise MemoryError()
+            free(self.asignaciones)
+            self.asignaciones = salida
+            self.num_asignaciones = 0
+            
+            inicio = sched_reloj()
+            self.preparar_solver(&plan, &solver, max_nodos, max_segundos)
+            if optimizar_iteraciones > 0:
+                self.reservar_mejora(&plan, &solver, &mejora)
+            maestro_slot = <int*>malloc(capacidad * sizeof(int))
+            if maestro_slot == NULL:
+                raise MemoryError()
+            if modo_c == MODO_EXACTO:
+                respaldo = <unsigned int*>malloc(
+                    (2 * self.capacidad_maestros + self.capacidad_grupos) * DIAS_SEMANA * sizeof(unsigned int)
+                )
+                dueno = <int*>malloc(capacidad * sizeof(int))
+                if respaldo == NULL or dueno == NULL:
+                    raise MemoryError()
+                with nogil:
+                    estado = self.resolver_plan_c(&plan, &solver, salida, &num_salida,
+                                                  respaldo, dueno, maestro_slot)
+                self.num_asignaciones = num_salida
+            else:
+                with nogil:
+                    self.num_asignaciones = self.generar_plan_c(&plan, salida)
+            
+            # Búsqueda local sobre lo generado; sin ella las penalizaciones
+            # salen directo de las asignaciones
+            inicio_mejora = sched_reloj()
+            with nogil:
+                if optimizar_iteraciones > 0:
+                    self.cargar_mejora(&plan, &solver, &mejora, salida, self.num_asignaciones)
+                    self.optimizar_c(&plan, &solver, &mejora, optimizar_iteraciones, optimizar_segundos)
+                    self.num_asignaciones = self.escribir_mejora(&plan, &solver, &mejora, maestro_slot, salida)
+                    costo = self.evaluar_mejora(&plan, &solver, &mejora, conteos)
+                else:
+                    costo = self.penalizaciones_c(&plan, salida, self.num_asignaciones, conteos)
+            
+            # Resumen: horas requeridas contra horas cubiertas
+            for g in range(plan.num_grupos):
+                for k in range(plan.grupos[g].num_materias):
+                    c = plan.grupos[g].primera_materia + k
+                    horas_requeridas += max(plan.materias[c].horas, 0)
+                    if plan.materias[c].num_candidatos == 0:
+                        sin_maestro.append({'grupo_id': plan.grupos[g].id, 'materia_id': plan.materias[c].id})
+            self.resumen = {
+                'modo': modo,
+                'semilla': self.semilla,
+                'estado': ESTADOS_SOLVER[estado] if modo_c == MODO_EXACTO else None,
+                'nodos': solver.nodos,
+                'segundos': sched_reloj() - inicio,
+                'horas_requeridas': horas_requeridas,
+                'horas_cubiertas': self.horas_cubiertas(&plan, salida, self.num_asignaciones),
+                'materias_sin_maestro': sin_maestro,
+                'penalizaciones': {
+                    'horas_faltantes': conteos[0],
+                    'huecos': conteos[1],
+                    'horas_repetidas': conteos[2],
+                    'materias_partidas': conteos[3],
+                    'carga_maestros': conteos[4],
+                },
+                'costo': costo,
+                'contadores': self.contadores_generacion(),
+                'optimizacion': {
+                    'iteraciones': mejora.iteraciones,
+                    'aceptadas': mejora.aceptadas,
+                    'costo_inicial': mejora.costo_inicial,
+                    'costo_final': mejora.costo,
+                    'segundos': sched_reloj() - inicio_mejora,
+                } if optimizar_iteraciones > 0 else None,
+            }
+        finally:
+            free(respaldo)
+            free(dueno)
+            free(maestro_slot)
+            liberar_mejora(&mejora)
+            liberar_solver(&solver)
+            liberar_plan(&plan)
+        
+        if empaquetado:
+            return self.asignaciones_empaquetadas()
+        return self.lista_asignaciones()
+    
+    cpdef dict resumen_generacion(self):
+        """
+        Regresa los datos de la última generación: modo, semilla del motor,
+        estado del modo exacto ('completo', 'imposible' o 'presupuesto_agotado'),
+        nodos explorados, segundos, horas requeridas/cubiertas, materias sin maestro candidato,
+        penalizaciones suaves del horario final (horas faltantes, huecos, horas
+        repetidas, materias partidas, carga de maestros), su costo ponderado,
+        los contadores de la pasada voraz (contadores_generacion) y, si hubo
+        búsqueda local, sus iteraciones y costo inicial/final.
+        """
+        return dict(self.resumen)
+    
+    cpdef dict contadores_generacion(self):
+        """
+        Contadores de la pasada voraz de la última generación (también la
+        que usa el modo exacto cuando no llega a una solución): candidatos
+        revisados, materias sin maestro, sesiones intentadas/colocadas y
+        rechazos por motivo. Ver NOMBRES_CONTADORES.
+        """
+        cdef int i
+        return {NOMBRES_CONTADORES[i]: self.contadores[i] for i in range(NUM_CONTADORES)}
+    
+    cpdef object asignaciones_empaquetadas(self):
+        """
+        Regresa las asignaciones de la última generación como un array('i')
+        plano con CAMPOS_ASIGNACION enteros por asignación: maestro_id,
+        materia_id, grupo_id, dia_semana, hora_inicio, hora_fin.
+        """
+        cdef object buffer = array.array('i')
+        buffer.frombytes(PyBytes_FromStringAndSize(
+            <char*>self.asignaciones, self.num_asignaciones * sizeof(Asignacion)
+        ))
+        return buffer
+    
+    cpdef list lista_asignaciones(self):
+        """Regresa las asignaciones de la última generación como diccionarios"""
+        cdef list asignaciones = []
+        cdef int i
+        cdef Asignacion* a
+        for i in range(self.num_asignaciones):
+            a = &self.asignaciones[i]
+            asignaciones.append({
+                'maestro_id': a.maestro_id,
+                'materia_id': a.materia_id,
+                'grupo_id': a.grupo_id,
+                'dia_semana': a.dia_semana,
+                'hora_inicio': a.hora_inicio,
+                'hora_fin': a.hora_fin
+            })
         return asignaciones
+
+
+cdef void mezclar_candidatos(PlanC* plan, unsigned long long* estado) noexcept nogil:
+    """Mezcla los maestros candidatos de cada materia para distribuir carga"""
+    cdef int m, i, j, tmp
+    cdef MateriaC* materia
+    for m in range(plan.num_materias):
+        materia = &plan.materias[m]
+        for i in range(materia.num_candidatos - 1, 0, -1):
+            j = aleatorio_en(estado, i + 1)
+            tmp = plan.candidatos[materia.inicio + i]
+            plan.candidatos[materia.inicio + i] = plan.candidatos[materia.inicio + j]
+            plan.candidatos[materia.inicio + j] = tmp
+
+
+cdef void liberar_plan(PlanC* plan) noexcept nogil:
+    """Libera los arreglos creados por SchedulerEngine.preparar_plan"""
+    free(plan.maestros)
+    free(plan.maestros_por_id)
+    free(plan.materias)
+    free(plan.candidatos)
+    free(plan.grupos)
+    memset(plan, 0, sizeof(PlanC))
+
+
+cdef int comparar_pares_id(const void* a, const void* b) noexcept nogil:
+    """Orden de qsort para ParIdC: por id"""
+    cdef int ia = (<const ParIdC*>a).id
+    cdef int ib = (<const ParIdC*>b).id
+    return (ia > ib) - (ia < ib)
+
+
+cdef int buscar_maestro(PlanC* plan, int maestro_id) noexcept nogil:
+    """Índice en PlanC.maestros del maestro con ese id (búsqueda binaria) o -1"""
+    cdef int bajo = 0
+    cdef int alto = plan.num_maestros - 1
+    cdef int medio
+    while bajo <= alto:
+        medio = (bajo + alto) >> 1
+        if plan.maestros_por_id[medio].id < maestro_id:
+            bajo = medio + 1
+        elif plan.maestros_por_id[medio].id > maestro_id:
+            alto = medio - 1
+        else:
+            return plan.maestros_por_id[medio].indice
+    return -1
+
+
+cdef int comparar_valores(const void* a, const void* b) noexcept nogil:
+    """Orden de qsort para ValorC: menor prioridad primero"""
+    cdef long long pa = (<const ValorC*>a).prioridad
+    cdef long long pb = (<const ValorC*>b).prioridad
+    return (pa > pb) - (pa < pb)
+
+
+cdef void liberar_mejora(MejoraC* m) noexcept nogil:
+    """Libera los arreglos creados por SchedulerEngine.reservar_mejora"""
+    free(m.celdas)
+    free(m.mascaras)
+    free(m.mejor_celdas)
+    free(m.mejor_maestros)
+    memset(m, 0, sizeof(MejoraC))
+
+
+cdef void liberar_solver(SolverC* s) noexcept nogil:
+    """Libera los arreglos creados por SchedulerEngine.preparar_solver"""
+    free(s.unidades)
+    free(s.primera_unidad)
+    free(s.comprometidas)
+    free(s.niveles)
+    free(s.valores)
+    free(s.mejor)
+    memset(s, 0, sizeof(SolverC))
+
+
+
+cdef int red_crear(RedFlujo* red, int num_nodos, int max_aristas) noexcept nogil:
+    """Reserva la red; regresa -1 si no hay memoria"""
+    cdef int i
+    memset(red, 0, sizeof(RedFlujo))
+    red.num_nodos = num_nodos
+    red.cabeza = <int*>malloc(num_nodos * sizeof(int))
+    red.nivel = <int*>malloc(num_nodos * sizeof(int))
+    red.actual = <int*>malloc(num_nodos * sizeof(int))
+    red.cola = <int*>malloc(num_nodos * sizeof(int))
+    red.siguiente = <int*>malloc(max(2 * max_aristas, 1) * sizeof(int))
+    red.destino = <int*>malloc(max(2 * max_aristas, 1) * sizeof(int))
+    red.capacidad = <int*>malloc(max(2 * max_aristas, 1) * sizeof(int))
+    if (red.cabeza == NULL or red.nivel == NULL or red.actual == NULL or red.cola == NULL
+            or red.siguiente == NULL or red.destino == NULL or red.capacidad == NULL):
+        red_liberar(red)
+        return -1
+    for i in range(num_nodos):
+        red.cabeza[i] = -1
+    return 0
+
+
+cdef void red_agregar(RedFlujo* red, int u, int v, int capacidad) noexcept nogil:
+    """Agrega la arista u -> v y su reversa con capacidad 0"""
+    cdef int e = red.num_aristas
+    red.destino[e] = v
+    red.capacidad[e] = capacidad
+    red.siguiente[e] = red.cabeza[u]
+    red.cabeza[u] = e
+    red.destino[e + 1] = u
+    red.capacidad[e + 1] = 0
+    red.siguiente[e + 1] = red.cabeza[v]
+    red.cabeza[v] = e + 1
+    red.num_aristas += 2
+
+
+cdef bint red_niveles(RedFlujo* red, int fuente, int sumidero) noexcept nogil:
+    """BFS de niveles sobre aristas con capacidad; True si el sumidero es alcanzable"""
+    cdef int i, u, e
+    cdef int primero = 0
+    cdef int ultimo = 0
+    for i in range(red.num_nodos):
+        red.nivel[i] = -1
+    red.nivel[fuente] = 0
+    red.cola[ultimo] = fuente
+    ultimo += 1
+    while primero < ultimo:
+        u = red.cola[primero]
+        primero += 1
+        e = red.cabeza[u]
+        while e != -1:
+            if red.capacidad[e] > 0 and red.nivel[red.destino[e]] == -1:
+                red.nivel[red.destino[e]] = red.nivel[u] + 1
+                red.cola[ultimo] = red.destino[e]
+                ultimo += 1
+            e = red.siguiente[e]
+    return red.nivel[sumidero] != -1
+
+
+cdef int red_empujar(RedFlujo* red, int u, int sumidero, int limite) noexcept nogil:
+    """DFS sobre el grafo de niveles; regresa el flujo que logró empujar"""
+    cdef int e, v, empujado
+    if u == sumidero:
+        return limite
+    while red.actual[u] != -1:
+        e = red.actual[u]
+        v = red.destino[e]
+        if red.capacidad[e] > 0 and red.nivel[v] == red.nivel[u] + 1:
+            empujado = red_empujar(red, v, sumidero, min(limite, red.capacidad[e]))
+            if empujado > 0:
+                red.capacidad[e] -= empujado
+                red.capacidad[e ^ 1] += empujado
+                return empujado
+        red.actual[u] = red.siguiente[e]
+    return 0
+
+
+cdef long long red_flujo_maximo(RedFlujo* red, int fuente, int sumidero) noexcept nogil:
+    """Flujo máximo de fuente a sumidero (Dinic)"""
+    cdef long long total = 0
+    cdef int i, empujado
+    while red_niveles(red, fuente, sumidero):
+        for i in range(red.num_nodos):
+            red.actual[i] = red.cabeza[i]
+        empujado = red_empujar(red, fuente, sumidero, 0x7FFFFFFF)
+        while empujado > 0:
+            total += empujado
+            empujado = red_empujar(red, fuente, sumidero, 0x7FFFFFFF)
+    return total
+
+
+cdef void red_liberar(RedFlujo* red) noexcept nogil:
+    """Libera los arreglos de la red"""
+    free(red.cabeza)
+    free(red.siguiente)
+    free(red.destino)
+    free(red.capacidad)
+    free(red.nivel)
+    free(red.actual)
+    free(red.cola)
+    memset(red, 0, sizeof(RedFlujo))
+
+
+cdef inline int huecos_mascara(unsigned int x) noexcept nogil:
+    """Slots libres entre la primera y la última clase del día"""
+    if x == 0:
+        return 0
+    return 32 - sched_clz(x) - sched_ctz(x) - sched_popcount(x)
+
+
+cdef inline int bloques_mascara(unsigned int x) noexcept nogil:
+    """Cantidad de bloques de slots seguidos"""
+    return sched_popcount(x & ~(x << 1))
+
+
+# ==================== NÚMEROS ALEATORIOS (XORSHIFT64*) ====================
+
+cdef inline unsigned long long sembrar(unsigned long long semilla) noexcept nogil:
+    """Estado inicial a partir de una semilla (splitmix64; nunca 0)"""
+    cdef unsigned long long z = semilla + 0x9E3779B97F4A7C15ULL
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL
+    z = z ^ (z >> 31)
+    return z if z != 0 else 1
+
+
+cdef inline unsigned long long xorshift(unsigned long long* estado) noexcept nogil:
+    """Siguiente número de 64 bits del generador"""
+    cdef unsigned long long x = estado[0]
+    x ^= x >> 12
+    x ^= x << 25
+    x ^= x >> 27
+    estado[0] = x
+    return x * 0x2545F4914F6CDD1DULL
+
+
+cdef inline int aleatorio_en(unsigned long long* estado, int n) noexcept nogil:
+    """Entero aleatorio en [0, n)"""
+    return <int>((xorshift(estado) >> 33) % <unsigned long long>n)
+
+
+cdef inline double aleatorio_real(unsigned long long* estado) noexcept nogil:
+    """Real aleatorio en [0, 1)"""
+    return (xorshift(estado) >> 11) * (1.0 / 9007199254740992.0)
@@ -1,12 +1,26 @@
+import os
+
 from setuptools import setup, Extension
 from Cython.Build import cythonize
 
+# SCHEDULER_PROFILE=1 compila el motor en modo de perfilado: sus funciones
+# aparecen en cProfile (ver api/perfilado.py) y se puede usar line_profiler.
+# Es más lento; compilar con --force para regenerar scheduler.c.
+PERFILADO = os.getenv("SCHEDULER_PROFILE", "").lower() in ("1", "true", "si")
+
+directivas = {'language_level': "3"}
+macros = []
+if PERFILADO:
+    directivas.update({'profile': True, 'linetrace': True, 'binding': True})
+    macros = [("CYTHON_TRACE", "1"), ("CYTHON_TRACE_NOGIL", "1")]
+
 # Configurar extensión Cython
 extensions = [
     Extension(
         "scheduler",
         ["scheduler.pyx"],
         language="c",
+        define_macros=macros,
     )
 ]
 
@@ -14,6 +28,7 @@ setup(
     name="scheduler",
     ext_modules=cythonize(
         extensions,
-        compiler_directives={'language_level': "3"}
+        compiler_directives=directivas,
+        force=PERFILADO,
     ),
 )
@@ -801,7 +801,8 @@ CREATE TABLE `grupos` (
   `id` int(11) NOT NULL,
   `nombre` varchar(50) NOT NULL,
   `semestre` int(11) NOT NULL,
-  `creado_en` timestamp NOT NULL DEFAULT current_timestamp()
+  `creado_en` timestamp NOT NULL DEFAULT current_timestamp(),
+  `plan_estudios_id` int(11) DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -1202,6 +1203,20 @@ CREATE TABLE `planes_estudios` (
 INSERT INTO `planes_estudios` (`id`, `nombre`, `descripcion`, `total_cuatrimestres`, `creado_en`) VALUES
 (5, 'ITIID', 'Licenciatura en Ingenieria en Tecnologias de la Informacion e Innovacion Digital', 10, '2025-12-05 03:24:56');
 
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `snapshots_horario`
+--
+
+CREATE TABLE `snapshots_horario` (
+  `id` int(11) NOT NULL,
+  `tipo` enum('horario','grupo','maestro') NOT NULL,
+  `referencia_id` int(11) NOT NULL,
+  `contenido` mediumtext NOT NULL,
+  `creado_en` timestamp NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 --
 -- Indexes for dumped tables
 --
@@ -1214,7 +1229,9 @@ ALTER TABLE `asignaciones`
   ADD KEY `materia_id` (`materia_id`),
   ADD KEY `grupo_id` (`grupo_id`),
   ADD KEY `idx_asignacion_horario` (`horario_id`),
-  ADD KEY `idx_asignacion_maestro` (`maestro_id`);
+  ADD KEY `idx_asignacion_maestro` (`maestro_id`),
+  ADD KEY `idx_asignacion_grupo_dia_hora` (`grupo_id`,`dia_semana`,`hora_inicio`),
+  ADD KEY `idx_asignacion_maestro_dia_hora` (`maestro_id`,`dia_semana`,`hora_inicio`);
 
 --
 -- Indexes for table `disponibilidad_maestros`
@@ -1227,7 +1244,8 @@ ALTER TABLE `disponibilidad_maestros`
 -- Indexes for table `grupos`
 --
 ALTER TABLE `grupos`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_grupo_plan` (`plan_estudios_id`);
 
 --
 -- Indexes for table `horarios_generados`
@@ -1265,6 +1283,13 @@ ALTER TABLE `planes_estudios`
   ADD PRIMARY KEY (`id`),
   ADD KEY `ix_planes_estudios_id` (`id`);
 
+--
+-- Indexes for table `snapshots_horario`
+--
+ALTER TABLE `snapshots_horario`
+  ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `uq_snapshot_tipo_referencia` (`tipo`,`referencia_id`);
+
 --
 -- AUTO_INCREMENT for dumped tables
 --
@@ -1317,6 +1342,12 @@ ALTER TABLE `materias`
 ALTER TABLE `planes_estudios`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=9;
 
+--
+-- AUTO_INCREMENT for table `snapshots_horario`
+--
+ALTER TABLE `snapshots_horario`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
 --
 -- Constraints for dumped tables
 --
@@ -1336,6 +1367,12 @@ ALTER TABLE `asignaciones`
 ALTER TABLE `disponibilidad_maestros`
   ADD CONSTRAINT `disponibilidad_maestros_ibfk_1` FOREIGN KEY (`maestro_id`) REFERENCES `maestros` (`id`) ON DELETE CASCADE;
 
+--
+-- Constraints for table `grupos`
+--
+ALTER TABLE `grupos`
+  ADD CONSTRAINT `fk_grupo_plan` FOREIGN KEY (`plan_estudios_id`) REFERENCES `planes_estudios` (`id`) ON DELETE SET NULL;
+
 --
 -- Constraints for table `maestro_materias`
 --
@@ -25,7 +25,7 @@ function ConsultarHorario() {
       if (response.ok && data.grupos && data.grupos.length > 0) {
         setGrupos(data.grupos);
         // Seleccionar el primer grupo por defecto
-        fetchHorarioPorGrupo(data.grupos[0].id, data.grupos[0].nombre);
+        fetchHorarioPorGrupo(data.grupos[0].id);
         setGrupoSeleccionado(data.grupos[0]);
       }
     } catch (err) {
@@ -35,34 +35,15 @@ function ConsultarHorario() {
     }
   };
 
-  const fetchHorarioPorGrupo = async (grupoId, grupoNombre) => {
+  const fetchHorarioPorGrupo = async (grupoId) => {
     try {
-      // Buscar el horario que contenga asignaciones de este grupo
-      const response = await fetch(`${API_URL}/api/horarios`);
+      // Horario del grupo en una sola petición
+      const response = await fetch(`${API_URL}/api/grupos/${grupoId}/horario`);
       const data = await response.json();
 
-      if (response.ok && data.horarios && data.horarios.length > 0) {
-        // Buscar el horario correspondiente al grupo
-        for (const horario of data.horarios) {
-          const horarioDetalle = await fetch(
-            `${API_URL}/api/horarios/${horario.id}`
-          );
-          const detalleData = await horarioDetalle.json();
-
-          // Verificar si este horario tiene asignaciones del grupo seleccionado
-          if (detalleData.asignaciones && detalleData.asignaciones.length > 0) {
-            // Buscar por nombre del grupo o por ID
-            const tieneGrupo = detalleData.asignaciones.some(
-              (a) =>
-                a.grupo === grupoNombre || a.grupo.includes(grupoId.toString())
-            );
-
-            if (tieneGrupo) {
-              setHorarioGrupo(detalleData);
-              return;
-            }
-          }
-        }
+      if (response.ok && data.asignaciones && data.asignaciones.length > 0) {
+        setHorarioGrupo(data);
+        return;
       }
       setHorarioGrupo(null);
     } catch (err) {
@@ -72,7 +53,7 @@ function ConsultarHorario() {
 
   const handleCambiarGrupo = (grupo) => {
     setGrupoSeleccionado(grupo);
-    fetchHorarioPorGrupo(grupo.id, grupo.nombre);
+    fetchHorarioPorGrupo(grupo.id);
   };
 
   const eliminarTodosHorarios = async () => {